@@ -1,734 +1,40 @@
 import streamlit as st
-import xml.etree.ElementTree as ET
 import pandas as pd
 from PIL import Image
-import base64
-from io import BytesIO
-import re      
-import json    
 import zipfile 
 from datetime import datetime 
 
+from mosaico.biblioteca import EXTENSIONES_TEXTO
+from mosaico.cache import CacheLRU, hash_contenido
+from mosaico.empaquetado import compresion_para, leer_para_descarga, zip_temporal
+from mosaico.imagen import OpcionesImagen, extension_imagen, formatos_disponibles
+from mosaico.instrumentacion import Medidor
+from mosaico.paralelo import procesos_para
+from mosaico.plantilla import PLANTILLA
+from mosaico.reparacion import reparar_en_lote
+from mosaico.resumen import filas_tabla, resumir_en_lote
+from mosaico.reporte import (codificar_puntos, escribir_paquete_teselas, imagen_a_data_uri,
+                             imagen_a_teselas, leer_puntos, logo_data_uri, nombre_limpio_modelo, valores_reporte)
+from mosaico.teselas import tile_sources_dzi, tile_sources_imagen
+
 # =========================================================
 # CONFIGURACIÓN Y CATÁLOGO.
 # =========================================================
 st.set_page_config(page_title="Gestor de Mosaicos Pro", layout="wide")
 
-COLOR_CATALOG = {
-    "plata": "silver", "dorado": "gold", "rosa": "pink",
-    "ab_aguamarina": "aquamarine", "ab_amatista": "mediumpurple",
-    "ab_cristal": "lightcyan", "ab_peridot": "lightgreen",
-    "ab_rose": "lightpink", "ab_zafiro": "deepskyblue",
-    "aguamarina": "turquoise", "amatista": "purple",
-    "black_diamond": "black", "blue_zircon": "darkturquoise",
-    "cristal": "silver", "fuschia": "fuchsia", "fuschua": "fuchsia", "jet": "black",
-    "jonquil": "gold", "opal_blue_zircone": "skyblue",
-    "opal_green": "lightgreen", "peridot": "limegreen",
-    "rose": "pink", "siam": "crimson", "topaz": "orange",
-    "violet": "violet", "zafiro": "royalblue", "sin_color": "gray",
-    "gmb_morado": "#9400D3", "rsb_azul": "#0000FF", "rsb/gbm_subl": "#87CEFA",
-    "amarillo": "#FFFF00", "azul_rey": "#0000CD", "rojo": "#FF0000",
-    "turqueza": "#40E0D0", "turqueza_metalico": "#00CED1", "teal": "#008080",
-    "mauva": "#E0B0FF", "lilac": "#C8A2C8", "azul_purpura": "#8A2BE2",
-    "orquida": "#DA70D6", "purpura": "#800080", "salmon": "#FA8072",
-    "gris": "#808080", "azul_agua": "#00FFFF", "verde_jade": "#00A86B",
-    "morado": "#7A288A", "otro": "#D3D3D3",
-    "vitral": "#9370DB", "ab_tanzanita": "#483D8B",
-    "fuschia_metalico": "#FF1493"
-}
+@st.cache_resource
+def cache_reportes():
+    # Una sola instancia por proceso, compartida entre sesiones y reruns
+    return CacheLRU(max_entradas=16, max_bytes=512 * 1024 * 1024)
 
-def normalizar_color(c):
-    if pd.isna(c) or c == "": return "sin_color"
-    return str(c).lower().strip().replace(" ", "_")
+COLUMNAS_RENDIMIENTO = ["archivo", "etapa", "pared_ms", "cpu_ms", "rss_mb", "rss_delta_mb", "rss_pico_mb", "tracemalloc_pico_mb", "pid"]
 
-def ajustar_color_por_tipo(row):
-    tipo = str(row["tipo"]).lower()
-    color = row["color_norm"]
-    if tipo == "microperla" or tipo == "marquiz": return color if color in COLOR_CATALOG else "otro"
-    if tipo == "dicroico":
-        if color in ["gmb_morado", "rsb_azul", "rsb/gbm_subl"]: return color
-        return "gmb_morado"
-    if tipo == "balin" and color not in ["plata", "dorado"]: return "plata"
-    return color
-
-# =========================================================
-# PLANTILLA MAESTRA HTML (CANVAS ENGINE + CLICK NATIVO)
-# =========================================================
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>__TITULO_FINAL__</title>
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=0, shrink-to-fit=no">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700&display=swap" rel="stylesheet">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/openseadragon/4.1.0/openseadragon.min.js"></script>
-    <style>
-        * { box-sizing: border-box; }
-        html, body { 
-            background-color: #f4f7f6; padding: 0; margin: 0; 
-            font-family: 'Segoe UI', sans-serif; 
-            width: 100%; max-width: 100%; overflow-x: hidden; 
-            touch-action: manipulation; 
-        }
-        
-        .header { background: white; color: black; padding: 25px 15px; text-align: center; border-bottom: 4px solid #1abc9c; width: 100%; }
-        .header h2 { 
-            font-family: 'Montserrat', sans-serif; 
-            letter-spacing: 3px; 
-            text-transform: uppercase;
-            font-weight: 700;
-            margin: 0;
-            font-size: 1.8rem;
-            word-wrap: break-word;
-        }
-        
-        #workspace { 
-            background: #000; position: relative; 
-            width: 100%; max-width: 100%; height: 75vh; 
-            overflow: hidden; display: block; 
-        }
-        #workspace:fullscreen { height: 100vh !important; width: 100vw !important; }
-        
-        #viewer-container { 
-            position: absolute; top: 0; left: 0; 
-            width: 100%; height: 100%; touch-action: none; 
-        }
-        
-        #info-bar {
-            position: absolute; top: 0; left: 0; z-index: 8000;
-            background: #f8f9fa; color: #2c3e50; padding: 12px 10px; text-align: center;
-            font-weight: bold; border-bottom: 3px solid #1abc9c; font-size: 18px;
-            width: 100%; display: block;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.15);
-            overflow-wrap: break-word; word-wrap: break-word;
-            transition: background-color 0.2s ease, color 0.2s ease;
-        }
-
-        .custom-nav { position: absolute; top: 65px; left: 15px; z-index: 9999; display: flex; flex-direction: column; gap: 8px; }
-        .nav-btn { width: 44px; height: 44px; border-radius: 8px; border: 2px solid white; color: white; font-size: 22px; font-weight: bold; display: flex; align-items: center; justify-content: center; cursor: pointer; transition: 0.2s;}
-        .nav-btn:hover { transform: scale(1.1); }
-        .btn-zoom-in { background: #1abc9c !important; }
-        .btn-zoom-out { background: #ffb7c5 !important; color: #333 !important; }
-        .btn-home { background: #3498db !important; }
-        .btn-diagrama { background: #f39c12 !important; font-size: 20px; }
-
-        .btn-fs { position: absolute; top: 65px; right: 15px; z-index: 9999; background: #fff; border: 2px solid #2c3e50; padding: 8px 16px; border-radius: 20px; font-weight: bold; cursor: pointer; }
-
-        #fs-sidebar {
-            position: absolute; top: 0; right: -320px; width: 300px; height: 100%;
-            background: rgba(44, 62, 80, 0.95); backdrop-filter: blur(10px);
-            z-index: 10000; transition: 0.3s ease; padding: 25px; color: white;
-            box-shadow: -5px 0 15px rgba(0,0,0,0.5); overflow-y: auto;
-        }
-        #fs-sidebar.active { right: 0; }
-        
-        #toggle-sidebar-btn {
-            position: absolute; top: 120px; right: 15px; z-index: 9999;
-            background: #1abc9c; color: white; border: 2px solid white;
-            padding: 10px; border-radius: 8px; font-weight: bold; display: none; cursor: pointer;
-            transition: right 0.3s ease;
-        }
-        #fs-sidebar.active ~ #toggle-sidebar-btn { right: 315px; } 
-        #workspace:fullscreen #toggle-sidebar-btn { display: block; }
-
-        .sidebar-section-title { font-size: 12px; font-weight: bold; color: #1abc9c; letter-spacing: 1px; margin-bottom: 15px; border-bottom: 1px solid #3e5871; padding-bottom: 5px; }
-        
-        .diagram-label {
-            background: rgba(255, 255, 255, 0.90);
-            backdrop-filter: blur(4px);
-            padding: 6px 12px;
-            border-radius: 6px;
-            font-size: 12px;
-            font-weight: bold;
-            color: #2c3e50;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.4);
-            pointer-events: none;
-            white-space: nowrap;
-            font-family: monospace;
-            will-change: transform;
-        }
-
-        .report-container { position: relative; z-index: 1; background: #f4f7f6; padding-top: 20px; width: 100%; max-width: 1200px; margin: 0 auto; }
-        .summary-card { background: white; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.08); padding: 25px; margin: 0 15px 40px 15px; }
-        .category-row { background: #f1f4f8; border-left: 5px solid #3498db; padding: 10px 15px; margin-top: 15px; font-weight: bold; display: flex; justify-content: space-between; align-items: center; border-radius: 4px; }
-        .item-table { width: 100%; margin-bottom: 10px; table-layout: fixed; }
-        .item-table td { padding: 10px 15px; border-bottom: 1px solid #eee; word-wrap: break-word; overflow-wrap: break-word; }
-        
-        .total-banner { background: black; color: white; padding: 25px; border-radius: 8px; text-align: center; font-size: 1.6rem; font-weight: 700; margin-top: 25px; font-family: 'Montserrat', sans-serif; letter-spacing: 1px; }
-        
-        .filter-section { 
-            background: white; padding: 20px 25px; border-radius: 12px; margin: 20px auto; 
-            box-shadow: 0 4px 15px rgba(0,0,0,0.04); font-family: 'Montserrat', sans-serif;
-            width: calc(100% - 30px); max-width: 1200px;
-        }
-        .filter-group-title { 
-            font-size: 0.85rem; font-weight: 700; color: #7f8c8d; text-transform: uppercase; 
-            letter-spacing: 1.5px; margin-bottom: 12px; display: block; 
-            border-bottom: 2px solid #ecf0f1; padding-bottom: 6px; width: 100%;
-        }
-        .filter-container { display: flex; flex-wrap: wrap; gap: 8px; align-items: center; }
-        
-        .btn-custom-filter { 
-            background: #f8f9fa; color: #34495e; border: 1px solid #dcdde1; border-radius: 6px; 
-            padding: 8px 14px; font-size: 0.8rem; font-weight: 600; 
-            transition: all 0.2s ease; cursor: pointer; text-transform: uppercase;
-            touch-action: manipulation;
-        }
-        .btn-custom-filter:hover { background: #ecf0f1; border-color: #bdc3c7; transform: translateY(-1px); }
-        
-        .btn-custom-active-tipo { background: #2c3e50 !important; color: white !important; border-color: #2c3e50 !important; box-shadow: 0 4px 8px rgba(44,62,80,0.2); }
-        .btn-custom-active-color { background: #1abc9c !important; color: white !important; border-color: #1abc9c !important; box-shadow: 0 4px 8px rgba(26,188,156,0.2); }
-        .btn-custom-active-none { background: #e74c3c !important; color: white !important; border-color: #e74c3c !important; box-shadow: 0 4px 8px rgba(231,76,60,0.2); }
-        
-        @media (max-width: 768px) {
-            .header { padding: 15px 10px; }
-            .header h2 { font-size: 1.3rem; letter-spacing: 1px; }
-            
-            .filter-section { width: calc(100% - 20px); padding: 15px 12px; margin: 10px auto; }
-            .btn-custom-filter { padding: 6px 10px; font-size: 0.7rem; }
-            .filter-group-title { font-size: 0.75rem; margin-bottom: 8px; }
-            
-            #info-bar { font-size: 13px; padding: 10px; }
-            
-            .summary-card { padding: 15px; margin: 0 10px 30px 10px; }
-            .category-row { font-size: 0.9rem; padding: 8px 10px; }
-            .item-table td { padding: 8px 10px; font-size: 0.85rem; }
-            .total-banner { font-size: 1.2rem; padding: 15px; margin-top: 15px; }
-            
-            .custom-nav { top: 55px; left: 10px; transform: scale(0.85); transform-origin: top left; }
-            .btn-fs { top: 55px; right: 10px; padding: 6px 12px; font-size: 11px; }
-            #toggle-sidebar-btn { top: 100px; right: 10px; font-size: 11px; padding: 6px 10px; }
-            
-            #workspace { height: 65vh; }
-        }
-
-        .fs-close-btn { float: left; cursor: pointer; font-size: 24px; margin-bottom: 10px; }
-    </style>
-</head>
-<body>
-    <div style="background: white; text-align: center; padding-top: 20px; width: 100%; overflow: hidden;">
-        <img src="__LOGO_URI__" alt="Mosaico" style="max-height: 85px; max-width: 90%; object-fit: contain; display: __MOSTRAR_LOGO__;">
-    </div>
-    
-    <div class="header" style="border-top: none; padding-top: 10px;">
-        <h2>__TITULO_FINAL__</h2>
-    </div>
-    
-    <div id="main-filters" class="filter-section">
-        <div class="mb-4 filter-container" id="group-tipo-main">
-            <span class="filter-group-title">TIPO DE PIEZA</span>
-            <button class="btn-custom-filter btn-custom-active-tipo" data-val="all" onclick="updateFilters('tipo', 'all', this)">TODOS</button>
-            __BTN_TIPO_MAIN__
-            <button class="btn-custom-filter" data-val="none" onclick="updateFilters('tipo', 'none', this)">❌ NINGUNO</button>
-        </div>
-        <div class="filter-container" id="group-color-main">
-            <span class="filter-group-title">COLOR</span>
-            <button class="btn-custom-filter btn-custom-active-color" data-val="all" onclick="updateFilters('color', 'all', this)">TODOS</button>
-            __BTN_COLOR_MAIN__
-        </div>
-    </div>
-
-    <div id="workspace">
-        
-        <div id="info-bar">Selecciona un punto para ver su detalle</div>
-
-        <div id="fs-sidebar">
-            <span class="fs-close-btn" onclick="toggleFsSidebar()">×</span>
-            <div style="clear:both;"></div>
-            <h5 class="mb-4">🔍 Filtros de Inspección</h5>
-            
-            <div class="sidebar-section-title" style="margin-top: 20px;">NIVEL DE AGRUPAMIENTO DIAGRAMA</div>
-            <p style="font-size: 11px; color: #bdc3c7; line-height: 1.3; margin-bottom: 8px;">Ajusta la barra para dividir los componentes en grupos o juntar las cantidades:</p>
-            <input type="range" id="sensitivity-slider" min="10" max="50" value="15" style="width: 100%; cursor: pointer;">
-            <div style="display: flex; justify-content: space-between; font-size: 10px; color: #ecf0f1; margin-bottom: 25px; font-weight: bold;">
-                <span>← SEPARAR GRUPOS</span>
-                <span>JUNTAR CANTIDADES →</span>
-            </div>
-
-            <div class="sidebar-section-title">TIPO DE COMPONENTE</div>
-            <div class="d-grid gap-2 mb-4" id="group-tipo-fs">
-                <button class="btn btn-primary btn-sm btn-filter-fs" data-val="all" onclick="syncAndFilter('tipo', 'all', this)">TODOS</button>
-                __BTN_TIPO_FS__
-                <button class="btn btn-outline-secondary btn-sm btn-filter-fs" data-val="none" onclick="syncAndFilter('tipo', 'none', this)">OCULTAR TODO</button>
-            </div>
-
-            <div class="sidebar-section-title">FILTRAR POR COLOR</div>
-            <div class="d-grid gap-2" id="group-color-fs">
-                <button class="btn btn-success btn-sm btn-filter-fs" data-val="all" onclick="syncAndFilter('color', 'all', this)">TODOS LOS COLORES</button>
-                __BTN_COLOR_FS__
-            </div>
-        </div>
-
-        <div class="custom-nav">
-            <div id="btn-in" class="nav-btn btn-zoom-in" title="Acercar">+</div>
-            <div id="btn-out" class="nav-btn btn-zoom-out" title="Alejar">−</div>
-            <div id="btn-home" class="nav-btn btn-home" title="Centrar">🏠</div>
-            <div id="btn-diagrama" class="nav-btn btn-diagrama" title="Activar Modo Diagrama (Márgenes)">📊</div>
-        </div>
-        
-        <button id="toggle-sidebar-btn" onclick="toggleFsSidebar()">☰ Filtros</button>
-        <button class="btn-fs" onclick="toggleFS()">📺 Pantalla Completa</button>
-        
-        <div id="viewer-container"></div>
-    </div>
-
-    <div class="container-fluid report-container">
-        <div class="summary-card" id="tables-output"></div>
-    </div>
-
-    <script>
-        const puntos = __PUNTOS_JSON__;
-        const imgW = __WIDTH__;
-        let DISTANCE_THRESHOLD = 0.15;
-        
-        const viewer = OpenSeadragon({
-            id: "viewer-container",
-            prefixUrl: "https://cdnjs.cloudflare.com/ajax/libs/openseadragon/4.1.0/images/",
-            tileSources: { type: 'image', url: '__DATA_URI__' },
-            showNavigationControl: false,
-            maxZoomLevel: 80,
-            minZoomImageRatio: 1.0,
-            visibilityRatio: 1.0,
-            constrainDuringPan: true,
-            animationTime: 0.2, 
-            springStiffness: 20, 
-            gestureSettingsTouch: { clickToZoom: false, dblClickToZoom: false },
-            gestureSettingsMouse: { clickToZoom: false, dblClickToZoom: false }
-        });
-
-        const canvasOverlay = document.createElement('canvas');
-        canvasOverlay.style.position = 'absolute';
-        canvasOverlay.style.top = '0';
-        canvasOverlay.style.left = '0';
-        canvasOverlay.style.pointerEvents = 'none'; 
-        canvasOverlay.style.zIndex = '500';
-        viewer.canvas.appendChild(canvasOverlay);
-
-        let filterT = 'all', filterC = 'all', lastSelected = null;
-        let diagramMode = false;
-        let sliderTimeout;
-
-        function getFilteredPoints() {
-            return puntos.filter(p => (filterT === 'all' || p.tipo === filterT) && (filterC === 'all' || p.color_norm === filterC));
-        }
-
-        function renderCanvas() {
-            const ctx = canvasOverlay.getContext('2d');
-            const w = viewer.canvas.clientWidth;
-            const h = viewer.canvas.clientHeight;
-            const dpr = window.devicePixelRatio || 1; 
-            
-            canvasOverlay.width = w * dpr;
-            canvasOverlay.height = h * dpr;
-            canvasOverlay.style.width = w + 'px';
-            canvasOverlay.style.height = h + 'px';
-            ctx.scale(dpr, dpr);
-            
-            ctx.clearRect(0, 0, w, h); 
-
-            if (filterT === 'none') return;
-
-            const filtered = getFilteredPoints();
-            const baseRadius = 9; 
-
-            filtered.forEach(p => {
-                 const vp = new OpenSeadragon.Point(p.x/imgW, p.y/imgW);
-                 const px = viewer.viewport.pixelFromPoint(vp, true);
-                 
-                 if(px.x < -20 || px.x > w + 20 || px.y < -20 || px.y > h + 20) return;
-
-                 const isSelected = (p === lastSelected);
-                 
-                 ctx.beginPath();
-                 ctx.arc(px.x, px.y, isSelected ? baseRadius * 1.6 : baseRadius, 0, 2*Math.PI);
-                 ctx.fillStyle = p.color_plot;
-                 ctx.globalAlpha = diagramMode ? 0.20 : 0.85;
-                 ctx.fill();
-                 
-                 if (isSelected) {
-                     ctx.globalAlpha = 1.0;
-                     ctx.lineWidth = 3;
-                     ctx.strokeStyle = '#ffffff';
-                     ctx.shadowColor = '#ffffff';
-                     ctx.shadowBlur = 10;
-                     ctx.stroke();
-                     ctx.shadowBlur = 0; 
-                 }
-            });
-        }
-
-        viewer.addHandler('update-viewport', renderCanvas);
-        viewer.addHandler('animation', renderCanvas);
-
-        // =======================================================
-        // SISTEMA DE CLICK NATIVO Y A PRUEBA DE ERRORES (CORREGIDO)
-        // =======================================================
-        viewer.addHandler('canvas-click', function(event) {
-            if (filterT === 'none') return;
-            
-            const webPoint = event.position; // Coordenadas relativas exactas del click
-            const filtered = getFilteredPoints();
-            let minDist = Infinity;
-            let bestP = null;
-
-            filtered.forEach(p => {
-                const vp = new OpenSeadragon.Point(p.x/imgW, p.y/imgW);
-                const px = viewer.viewport.pixelFromPoint(vp, true);
-                const dist = Math.sqrt(Math.pow(px.x - webPoint.x, 2) + Math.pow(px.y - webPoint.y, 2));
-                if (dist < minDist) {
-                    minDist = dist;
-                    bestP = p;
-                }
-            });
-
-            const bar = document.getElementById('info-bar');
-
-            // 25 pixeles de tolerancia para dedos o ratón
-            if (minDist < 25 && bestP) {
-                lastSelected = bestP;
-                bar.style.backgroundColor = bestP.color_plot;
-                bar.style.color = getContrastColor(bestP.color_plot);
-                bar.innerHTML = "SELECCIONADO: " + bestP.tipo.toUpperCase() + " | " + bestP.color_norm.replace(/_/g, ' ').toUpperCase() + " (" + bestP.tamaño + ")";
-                
-                event.preventDefaultAction = true; // Evitar que OpenSeadragon haga zoom al clicar el punto
-            } else {
-                // Si hace click en una zona vacía, deseleccionamos
-                if(lastSelected) {
-                    lastSelected = null;
-                    bar.style.backgroundColor = "#f8f9fa"; 
-                    bar.style.color = "#2c3e50";
-                    bar.innerHTML = "Selecciona un punto para ver su detalle";
-                }
-            }
-            
-            // Repintar el lienzo y/o el diagrama
-            if (diagramMode) {
-                updateDataAndDiagram();
-            } else {
-                renderCanvas();
-            }
-        });
-
-        document.getElementById('sensitivity-slider').addEventListener('input', function(e) {
-            DISTANCE_THRESHOLD = e.target.value / 100.0;
-            if (diagramMode) {
-                clearTimeout(sliderTimeout);
-                sliderTimeout = setTimeout(updateDataAndDiagram, 100); 
-            }
-        });
-
-        document.addEventListener('fullscreenchange', () => {
-            if (!document.fullscreenElement) {
-                document.getElementById('fs-sidebar').classList.remove('active');
-            }
-            setTimeout(() => { viewer.viewport.goHome(); }, 100);
-        });
-
-        function toggleFsSidebar() {
-            document.getElementById('fs-sidebar').classList.toggle('active');
-        }
-
-        function resetSelection() {
-            lastSelected = null;
-            const bar = document.getElementById('info-bar');
-            bar.style.backgroundColor = "#f8f9fa"; 
-            bar.style.color = "#2c3e50";
-            bar.innerHTML = "Selecciona un punto para ver su detalle";
-        }
-
-        function syncAndFilter(mode, value, btn) {
-            resetSelection(); // Limpiamos la selección si cambiamos de filtro
-            
-            if (mode === 'tipo') {
-                filterT = value;
-                const activeMainT = (value === 'none') ? 'btn-custom-active-none' : 'btn-custom-active-tipo';
-                highlightMainButtons('group-tipo-main', value, activeMainT);
-                const activeFsT = (value === 'none') ? 'btn-secondary' : 'btn-primary';
-                const outlineFsT = (value === 'none') ? 'btn-outline-secondary' : 'btn-outline-light';
-                highlightFsButtons('group-tipo-fs', value, activeFsT, outlineFsT);
-            } else {
-                filterC = value;
-                highlightMainButtons('group-color-main', value, 'btn-custom-active-color');
-                highlightFsButtons('group-color-fs', value, 'btn-success', 'btn-outline-light');
-            }
-            updateDataAndDiagram();
-        }
-
-        function highlightMainButtons(groupId, value, activeClass) {
-            const container = document.getElementById(groupId);
-            container.querySelectorAll('.btn-custom-filter').forEach(btn => {
-                btn.className = 'btn-custom-filter'; 
-                if (btn.getAttribute('data-val') === value) {
-                    btn.classList.add(activeClass);
-                }
-            });
-        }
-
-        function highlightFsButtons(groupId, value, activeClass, outlineClass) {
-            const container = document.getElementById(groupId);
-            container.querySelectorAll('.btn-filter-fs').forEach(btn => {
-                const btnVal = btn.getAttribute('data-val');
-                if (btnVal === value) {
-                    btn.className = 'btn btn-sm ' + activeClass + ' btn-filter-fs';
-                } else {
-                    btn.className = 'btn btn-sm ' + outlineClass + ' btn-filter-fs';
-                }
-            });
-        }
-
-        function updateFilters(mode, value, btn) { syncAndFilter(mode, value, btn); }
-
-        function getContrastColor(hex) {
-            if (hex.indexOf('#') === 0) hex = hex.slice(1);
-            const cssColors = { 'purple': '800080', 'black': '000000', 'royalblue': '4169E1', 'crimson': 'DC143C', 'gray': '808080' };
-            if (cssColors[hex]) hex = cssColors[hex];
-            if (hex.length === 3) hex = hex[0]+hex[0]+hex[1]+hex[1]+hex[2]+hex[2];
-            if (hex.length !== 6) return '#2c3e50';
-            const r = parseInt(hex.slice(0, 2), 16);
-            const g = parseInt(hex.slice(2, 4), 16);
-            const b = parseInt(hex.slice(4, 6), 16);
-            const yiq = ((r * 299) + (g * 587) + (b * 114)) / 1000;
-            return (yiq >= 128) ? '#2c3e50' : '#ffffff';
-        }
-
-        viewer.addHandler('open', updateDataAndDiagram);
-
-        function updateDataAndDiagram() {
-            viewer.clearOverlays();
-            const bar = document.getElementById('info-bar');
-            
-            if (filterT === 'none') {
-                bar.innerHTML = "MODO DE INSPECCIÓN: PUNTOS OCULTOS";
-                bar.style.backgroundColor = "#f8f9fa"; bar.style.color = "#2c3e50";
-                renderSummary([]); 
-                renderCanvas();
-                return;
-            }
-            
-            if (!lastSelected) {
-                bar.innerHTML = "Selecciona un punto para ver su detalle";
-                bar.style.backgroundColor = "#f8f9fa"; bar.style.color = "#2c3e50";
-            }
-
-            const filtered = getFilteredPoints();
-
-            if (diagramMode) {
-                const groupsByType = {};
-                filtered.forEach(p => {
-                    const key = p.tipo.toUpperCase() + " " + p.color_norm.replace(/_/g, ' ').toUpperCase() + " " + p.tamaño;
-                    if (!groupsByType[key]) groupsByType[key] = [];
-                    groupsByType[key].push(p);
-                });
-
-                let leftLabels = [];
-                let rightLabels = [];
-
-                for (let k in groupsByType) {
-                    let points = groupsByType[k];
-                    let clusters = [];
-
-                    points.forEach(p => {
-                        let pX = p.x / imgW;
-                        let pY = p.y / imgW;
-                        let addedToCluster = false;
-                        for (let i = 0; i < clusters.length; i++) {
-                            let cluster = clusters[i];
-                            for (let cp of cluster.points) {
-                                let cpX = cp.x / imgW;
-                                let cpY = cp.y / imgW;
-                                if (Math.sqrt(Math.pow(pX - cpX, 2) + Math.pow(pY - cpY, 2)) < DISTANCE_THRESHOLD) {
-                                    cluster.points.push(p);
-                                    addedToCluster = true;
-                                    break;
-                                }
-                            }
-                            if (addedToCluster) break;
-                        }
-                        if (!addedToCluster) clusters.push({ points: [p], color: p.color_plot });
-                    });
-
-                    clusters.forEach(cluster => {
-                        let count = cluster.points.length;
-                        let sumX = 0, sumY = 0;
-                        cluster.points.forEach(p => { sumX += (p.x / imgW); sumY += (p.y / imgW); });
-                        let centroidX = sumX / count;
-                        let centroidY = sumY / count;
-                        
-                        let bestP = cluster.points[0];
-                        let minDist = Infinity;
-                        cluster.points.forEach(p => {
-                            let pX = p.x / imgW;
-                            let pY = p.y / imgW;
-                            let d = Math.sqrt(Math.pow(pX - centroidX, 2) + Math.pow(pY - centroidY, 2));
-                            if (d < minDist) {
-                                minDist = d;
-                                bestP = p; 
-                            }
-                        });
-
-                        let cX = bestP.x / imgW;
-                        let cY = bestP.y / imgW;
-                        
-                        let isLeft = cX < 0.5;
-                        let edgeX = isLeft ? 0.05 : 0.95;
-                        
-                        let obj = { cluster, cX, cY, adjY: cY, edgeX, k, count };
-                        if (isLeft) leftLabels.push(obj); else rightLabels.push(obj);
-                    });
-                }
-
-                function spreadLabels(labels) {
-                    if (labels.length === 0) return;
-                    labels.sort((a, b) => a.cY - b.cY);
-                    const MIN_GAP = Math.min(0.045, 0.95 / labels.length); 
-                    
-                    for(let iter = 0; iter < 20; iter++) {
-                        for (let i = 0; i < labels.length - 1; i++) {
-                            let overlap = MIN_GAP - (labels[i+1].adjY - labels[i].adjY);
-                            if (overlap > 0) {
-                                labels[i].adjY -= overlap * 0.5;
-                                labels[i+1].adjY += overlap * 0.5;
-                            }
-                        }
-                    }
-                    
-                    let topOverflow = 0.02 - labels[0].adjY;
-                    if (topOverflow > 0) labels.forEach(l => l.adjY += topOverflow);
-                    
-                    let bottomOverflow = labels[labels.length-1].adjY - 0.98;
-                    if (bottomOverflow > 0) labels.forEach(l => l.adjY -= bottomOverflow);
-                }
-
-                spreadLabels(leftLabels);
-                spreadLabels(rightLabels);
-
-                [...leftLabels, ...rightLabels].forEach(lbl => {
-                    let { cX, cY, adjY, edgeX, cluster, k, count } = lbl;
-                    let color = cluster.color;
-                    let isLeft = cX < 0.5;
-                    let midX = cX + (edgeX - cX) * 0.5; 
-                    
-                    let w1 = Math.abs(midX - cX);
-                    const hLine1 = document.createElement("div");
-                    hLine1.style.borderTop = `2px dashed ${color}`;
-                    hLine1.style.opacity = "0.6";
-                    hLine1.style.pointerEvents = "none";
-                    hLine1.style.willChange = "transform";
-                    viewer.addOverlay({ element: hLine1, location: new OpenSeadragon.Rect(Math.min(cX, midX), cY, w1, 0.0001) });
-
-                    let h2 = Math.abs(adjY - cY);
-                    if (h2 > 0.001) { 
-                        const vLine = document.createElement("div");
-                        vLine.style.borderLeft = `2px dashed ${color}`;
-                        vLine.style.opacity = "0.6";
-                        vLine.style.pointerEvents = "none";
-                        vLine.style.willChange = "transform";
-                        viewer.addOverlay({ element: vLine, location: new OpenSeadragon.Rect(midX, Math.min(cY, adjY), 0.0001, h2) });
-                    }
-
-                    let w3 = Math.abs(edgeX - midX);
-                    const hLine3 = document.createElement("div");
-                    hLine3.style.borderTop = `2px dashed ${color}`;
-                    hLine3.style.opacity = "0.6";
-                    hLine3.style.pointerEvents = "none";
-                    hLine3.style.willChange = "transform";
-                    viewer.addOverlay({ element: hLine3, location: new OpenSeadragon.Rect(Math.min(midX, edgeX), adjY, w3, 0.0001) });
-
-                    const anchorDot = document.createElement("div");
-                    anchorDot.style.width = "12px";
-                    anchorDot.style.height = "12px";
-                    anchorDot.style.backgroundColor = color;
-                    anchorDot.style.borderRadius = "50%";
-                    anchorDot.style.border = "2px solid white";
-                    anchorDot.style.boxShadow = "0 0 4px black";
-                    anchorDot.style.willChange = "transform";
-                    anchorDot.style.pointerEvents = "none"; // CRUCIAL: Para no bloquear el click
-                    viewer.addOverlay({ element: anchorDot, location: new OpenSeadragon.Point(cX, cY), placement: 'CENTER' });
-
-                    const elLabel = document.createElement("div");
-                    elLabel.className = "diagram-label";
-                    elLabel.style.borderLeftColor = isLeft ? color : "transparent";
-                    elLabel.style.borderRightColor = isLeft ? "transparent" : color;
-                    elLabel.style.borderLeftWidth = isLeft ? "6px" : "0px";
-                    elLabel.style.borderRightWidth = isLeft ? "0px" : "6px";
-                    elLabel.style.borderStyle = "solid";
-                    elLabel.innerHTML = `<span style="color:${color}; font-size:14px;">●</span> <b>${count}</b> ${k}`;
-
-                    viewer.addOverlay({
-                        element: elLabel,
-                        location: new OpenSeadragon.Point(edgeX, adjY),
-                        placement: isLeft ? 'LEFT' : 'RIGHT',
-                        checkResize: false
-                    });
-                });
-            }
-
-            renderSummary(filtered);
-            renderCanvas(); 
-        }
-
-        function renderSummary(data) {
-            const container = document.getElementById('tables-output');
-            const groups = {}; let totalGral = 0;
-            const summaryData = (filterT === 'none') ? puntos : data;
-            summaryData.forEach(p => {
-                totalGral++;
-                if(!groups[p.tipo]) groups[p.tipo] = {};
-                const key = p.color_norm.replace(/_/g, ' ').toUpperCase() + " (" + p.tamaño + ")";
-                groups[p.tipo][key] = (groups[p.tipo][key] || 0) + 1;
-            });
-            let html = '<h4 class="fw-bold mb-4" style="font-family:Montserrat, sans-serif;">RESUMEN DE COMPONENTES</h4>';
-            for(let t in groups) {
-                let subtotal = Object.values(groups[t]).reduce((a, b) => a + b, 0);
-                html += '<div class="category-row"><span>' + t.toUpperCase() + '</span><span class="badge bg-primary">' + subtotal + ' pz</span></div><table class="item-table"><tbody>';
-                for(let k in groups[t]) html += '<tr><td>' + k + '</td><td class="text-end fw-bold">' + groups[t][k] + ' pz</td></tr>';
-                html += '</tbody></table>';
-            }
-            html += '<div class="total-banner">CANTIDAD TOTAL: ' + totalGral + ' PIEZAS</div>';
-            container.innerHTML = html;
-        }
-
-        function toggleFS() {
-            const el = document.getElementById("workspace");
-            
-            if (!document.fullscreenElement) {
-                let fsPromise = el.requestFullscreen ? el.requestFullscreen() : (el.webkitRequestFullscreen ? el.webkitRequestFullscreen() : null);
-                
-                if (fsPromise) {
-                    fsPromise.then(() => {
-                        if (screen.orientation && screen.orientation.unlock) screen.orientation.unlock();
-                    }).catch(err => console.log("Error al entrar a fullscreen:", err));
-                } else if (el.webkitRequestFullscreen) {
-                    el.webkitRequestFullscreen();
-                    if (screen.orientation && screen.orientation.unlock) screen.orientation.unlock();
-                }
-            } else {
-                let exitPromise = document.exitFullscreen ? document.exitFullscreen() : (document.webkitExitFullscreen ? document.webkitExitFullscreen() : null);
-                
-                if (exitPromise) {
-                    exitPromise.then(() => {
-                        if (screen.orientation && screen.orientation.unlock) screen.orientation.unlock();
-                    }).catch(err => console.log("Error al salir de fullscreen:", err));
-                } else if (document.webkitExitFullscreen) { 
-                    document.webkitExitFullscreen();
-                }
-            }
-        }
-
-        document.getElementById('btn-in').onclick = () => viewer.viewport.zoomBy(1.4);
-        document.getElementById('btn-out').onclick = () => viewer.viewport.zoomBy(0.7);
-        document.getElementById('btn-home').onclick = () => viewer.viewport.goHome();
-        
-        document.getElementById('btn-diagrama').onclick = () => {
-            diagramMode = !diagramMode;
-            document.getElementById('btn-diagrama').style.background = diagramMode ? '#e74c3c' : '#f39c12';
-            updateDataAndDiagram();
-        };
-    </script>
-</body>
-</html>
-"""
+def panel_rendimiento(medidor):
+    # Solo con MOSAICO_PERF=1 (o MOSAICO_PERF_LOG): log JSON y panel plegado con las etapas medidas
+    medidor.volcar()
+    if medidor.mediciones:
+        with st.expander("⏱️ Rendimiento"):
+            st.dataframe(pd.DataFrame(medidor.mediciones, columns=COLUMNAS_RENDIMIENTO), use_container_width=True, hide_index=True)
 
 # =========================================================
 # INTERFAZ PRINCIPAL CON PESTAÑAS
@@ -758,92 +64,62 @@ with tab1:
         st.write("") 
         st.write("")
         img_file = st.file_uploader("2. Subir Imagen base", type=["jpg", "png", "jpeg"])
+        exportar_teselas = st.checkbox("Exportar paquete ZIP con teselas (deep zoom)", help="La imagen se corta en teselas por nivel de zoom y el visor sólo descarga las visibles. Recomendado para fotos de alta resolución.")
+
+    with st.expander("⚙️ Opciones de imagen"):
+        col_c, col_d, col_e = st.columns(3)
+        with col_c:
+            lado_max = st.selectbox("Lado máximo (px)", ["Original", 8192, 6144, 4096, 3072, 2048], help="Reduce la imagen si su lado mayor supera este valor; los puntos se escalan con ella.")
+            formato_imagen = st.selectbox("Formato", formatos_disponibles(), format_func=str.upper, help="WebP y AVIF pesan bastante menos que JPEG a igual calidad y conservan la transparencia.")
+        with col_d:
+            calidad_imagen = st.slider("Calidad", min_value=40, max_value=95, value=75, step=1)
+            progresivo = st.checkbox("JPEG progresivo", help="Se ve borrosa mientras carga y se va definiendo; suele pesar un poco menos.")
+        with col_e:
+            peso_max_kb = st.number_input("Peso máximo de la imagen (KB, 0 = sin límite)", min_value=0, value=0, step=100, help="Busca la mayor calidad que entra en este peso; si ni la mínima entra, reduce la resolución. No aplica a las teselas.")
+    opciones_imagen = OpcionesImagen(formato=formato_imagen, calidad=calidad_imagen, lado_max=None if lado_max == "Original" else lado_max,
+                                     peso_max_kb=peso_max_kb or None, progresivo=progresivo)
 
     if xml_file and img_file:
         with st.spinner("Procesando componentes..."):
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-            rows = []
-            for image in root.findall("image"):
-                for points in image.findall("points"):
-                    coords = points.attrib["points"].split(";")
-                    tipo = points.attrib.get("label", "sin_tipo")
-                    attrs = {a.attrib["name"]: a.text for a in points.findall("attribute")}
-                    for c in coords:
-                        x, y = map(float, c.split(","))
-                        
-                        tamaño_defecto = ""
-                        if tipo == "microperla": tamaño_defecto = "pp01"
-                        elif tipo == "marquiz": tamaño_defecto = "6x3mm"
-                        elif tipo == "cristal": tamaño_defecto = "ss18"
-
-                        rows.append({
-                            "x": x, "y": y, "tipo": tipo, 
-                            "color_norm": normalizar_color(attrs.get("color", "")), 
-                            "tamaño": attrs.get("tamaño", tamaño_defecto),
-                            "color_plot": COLOR_CATALOG.get(normalizar_color(attrs.get("color", "")), "gray")
-                        })
-            
-            filas_limpias = []
-            coordenadas_vistas = set()
-            for row in rows:
-                coord_id = (round(row["x"], 2), round(row["y"], 2))
-                if coord_id not in coordenadas_vistas:
-                    filas_limpias.append(row)
-                    coordenadas_vistas.add(coord_id)
-            rows = filas_limpias
-
-            df = pd.DataFrame(rows)
-            df["color_norm"] = df.apply(ajustar_color_por_tipo, axis=1)
-            df["color_plot"] = df["color_norm"].map(lambda x: COLOR_CATALOG.get(x, "gray"))
-
-            img = Image.open(img_file)
-            width, height = img.size
-            buffered = BytesIO()
-            img.save(buffered, format="JPEG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
-            data_uri = f"data:image/jpeg;base64,{img_base64}"
+            cache = cache_reportes()
+            medidor = Medidor("tab1", archivo=xml_file.name)
+            xml_bytes = xml_file.getvalue()
+            img_bytes = img_file.getvalue()
+            hash_xml, hash_img = hash_contenido(xml_bytes), hash_contenido(img_bytes)
+            df_anotado, tamaño_anotado = cache.obtener(("xml", hash_xml), lambda: leer_puntos(xml_bytes, medidor))
+
+            nombre_limpio = nombre_limpio_modelo(nombre_modelo)
+
+            # La imagen se prepara antes que los puntos: su escala final los lleva a sus píxeles
+            if exportar_teselas:
+                width, height, teselas, escala = cache.obtener(("teselas", hash_img, opciones_imagen, tamaño_anotado),
+                                                               lambda: imagen_a_teselas(img_bytes, medidor, opciones_imagen, tamaño_anotado))
+                carpeta_teselas = f"{nombre_limpio}_files"
+                tile_sources = tile_sources_dzi(carpeta_teselas, width, height, formato=extension_imagen(opciones_imagen.formato))
+            else:
+                width, height, data_uri, escala = cache.obtener(("imagen", hash_img, opciones_imagen, tamaño_anotado),
+                                                                lambda: imagen_a_data_uri(img_bytes, medidor, opciones_imagen, tamaño_anotado))
+                tile_sources = tile_sources_imagen(data_uri)
+
+            df, puntos_json = cache.obtener(("puntos", hash_xml, escala), lambda: codificar_puntos(df_anotado, escala, medidor))
+
+            logo_uri, mostrar_logo = logo_data_uri()
+            valores = valores_reporte(nombre_modelo, df, puntos_json, width, tile_sources, logo_uri, mostrar_logo)
 
-            logo_uri = ""
-            mostrar_logo = "none"
-            try:
-                logo_img = Image.open("banner_mosaico.png")
-                buffered_logo = BytesIO()
-                logo_img.save(buffered_logo, format="PNG")
-                logo_base64 = base64.b64encode(buffered_logo.getvalue()).decode()
-                logo_uri = f"data:image/png;base64,{logo_base64}"
-                mostrar_logo = "inline-block"
-            except Exception:
-                pass 
-
-            puntos_json = df.to_json(orient='records')
-            tipos_unicos = sorted(df["tipo"].unique().tolist())
-            colores_unicos = sorted(df["color_norm"].unique().tolist())
-            
-            titulo_final = f"Componentes {nombre_modelo}" if nombre_modelo else "Componentes"
-
-            btn_tipo_main = ' '.join([f'<button class="btn-custom-filter" data-val="{t}" onclick="updateFilters(\'tipo\', \'{t}\', this)">{t.upper()}</button>' for t in tipos_unicos])
-            btn_color_main = ' '.join([f'<button class="btn-custom-filter" data-val="{c}" onclick="updateFilters(\'color\', \'{c}\', this)">{c.replace("_", " ").upper()}</button>' for c in colores_unicos])
-            
-            btn_tipo_fs = ' '.join([f'<button class="btn btn-outline-light btn-sm btn-filter-fs" data-val="{t}" onclick="syncAndFilter(\'tipo\', \'{t}\', this)">{t.upper()}</button>' for t in tipos_unicos])
-            btn_color_fs = ' '.join([f'<button class="btn btn-outline-light btn-sm btn-filter-fs" style="text-align: left;" data-val="{c}" onclick="syncAndFilter(\'color\', \'{c}\', this)"><span style="display:inline-block;width:10px;height:10px;background:{COLOR_CATALOG.get(c, "gray")};margin-right:8px;border-radius:50%"></span>{c.replace("_", " ").upper()}</button>' for c in colores_unicos])
-
-            html_report = HTML_TEMPLATE.replace("__TITULO_FINAL__", str(titulo_final))
-            html_report = html_report.replace("__BTN_TIPO_MAIN__", btn_tipo_main)
-            html_report = html_report.replace("__BTN_COLOR_MAIN__", btn_color_main)
-            html_report = html_report.replace("__BTN_TIPO_FS__", btn_tipo_fs)
-            html_report = html_report.replace("__BTN_COLOR_FS__", btn_color_fs)
-            html_report = html_report.replace("__PUNTOS_JSON__", puntos_json)
-            html_report = html_report.replace("__WIDTH__", str(width))
-            html_report = html_report.replace("__DATA_URI__", data_uri)
-            html_report = html_report.replace("__LOGO_URI__", logo_uri)
-            html_report = html_report.replace("__MOSTRAR_LOGO__", mostrar_logo)
-
-            nombre_limpio = str(nombre_modelo).replace("Componentes ", "").replace("Componentes", "").strip() if nombre_modelo else "Modelo_Sin_Nombre"
             nombre_archivo = f"{nombre_limpio}.html"
 
             st.success("✅ ¡Reporte generado exitosamente con los clicks funcionales!")
-            st.download_button(label="📥 DESCARGAR REPORTE HTML", data=html_report, file_name=nombre_archivo, mime="text/html", type="primary")
+            if exportar_teselas:
+                zip_buffer = zip_temporal()
+                with medidor.etapa("zip_teselas"):
+                    escribir_paquete_teselas(zip_buffer, nombre_limpio, valores, width, height, teselas, opciones_imagen)
+                st.download_button(label="📥 DESCARGAR PAQUETE CON TESELAS (ZIP)", data=leer_para_descarga(zip_buffer), file_name=f"{nombre_limpio}.zip", mime="application/zip", type="primary")
+            else:
+                with medidor.etapa("plantilla"):
+                    html = PLANTILLA.render(valores)
+                st.download_button(label="📥 DESCARGAR REPORTE HTML", data=html, file_name=nombre_archivo, mime="text/html", type="primary")
+            st.caption(cache.resumen())
+            panel_rendimiento(medidor)
 
 # =========================================================
 # PESTAÑA 2: ACTUALIZAR Y REPARAR HTMLs
@@ -853,97 +129,47 @@ with tab2:
     st.info("Sube los archivos HTML generados en el pasado. Esta herramienta los reparará, restablecerá el click y los dejará con el nombre exterior limpio.")
 
     html_files = st.file_uploader("Subir HTML(s) a actualizar y corregir", type=["html"], accept_multiple_files=True, key="fixer_uploader")
+    como_biblioteca = st.checkbox("Exportar como biblioteca (assets compartidos)", help="Los HTML referencian una carpeta assets/ con el visor, el logo y las imágenes, cada uno una sola vez (nombrados por su hash). Para publicar muchos reportes en un hosting estático; la carpeta assets/ debe acompañar siempre a los HTML.")
 
     if html_files:
-        zip_buffer = BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for i, html_file in enumerate(html_files):
-                content = html_file.read().decode("utf-8")
-                
-                match_puntos = re.search(r'const puntos = (\[.*?\]);', content, re.DOTALL)
-                match_w = re.search(r'const imgW = ([\d\.]+);', content)
-                match_uri = re.search(r"url:\s*['\"](data:image/[^'\"]+)['\"]", content)
-                match_title = re.search(r'<title>(.*?)</title>', content, re.IGNORECASE)
-                
-                if match_puntos and match_w and match_uri:
-                    try:
-                        puntos_raw = match_puntos.group(1)
-                        puntos_lista = json.loads(puntos_raw)
-                        
-                        filas_limpias = []
-                        coordenadas_vistas = set()
-                        for row in puntos_lista:
-                            coord_id = (round(float(row["x"]), 2), round(float(row["y"]), 2))
-                            if coord_id not in coordenadas_vistas:
-                                filas_limpias.append(row)
-                                coordenadas_vistas.add(coord_id)
-                        
-                        puntos_json_limpio = json.dumps(filas_limpias)
-                        
-                        df_clean = pd.DataFrame(filas_limpias)
-                        tipos_unicos = sorted(df_clean["tipo"].unique().tolist()) if "tipo" in df_clean.columns else []
-                        colores_unicos = sorted(df_clean["color_norm"].unique().tolist()) if "color_norm" in df_clean.columns else []
-                        
-                        btn_tipo_main = ' '.join([f'<button class="btn-custom-filter" data-val="{t}" onclick="updateFilters(\'tipo\', \'{t}\', this)">{t.upper()}</button>' for t in tipos_unicos])
-                        btn_color_main = ' '.join([f'<button class="btn-custom-filter" data-val="{c}" onclick="updateFilters(\'color\', \'{c}\', this)">{c.replace("_", " ").upper()}</button>' for c in colores_unicos])
-                        btn_tipo_fs = ' '.join([f'<button class="btn btn-outline-light btn-sm btn-filter-fs" data-val="{t}" onclick="syncAndFilter(\'tipo\', \'{t}\', this)">{t.upper()}</button>' for t in tipos_unicos])
-                        btn_color_fs = ' '.join([f'<button class="btn btn-outline-light btn-sm btn-filter-fs" style="text-align: left;" data-val="{c}" onclick="syncAndFilter(\'color\', \'{c}\', this)"><span style="display:inline-block;width:10px;height:10px;background:{COLOR_CATALOG.get(c, "gray")};margin-right:8px;border-radius:50%"></span>{c.replace("_", " ").upper()}</button>' for c in colores_unicos])
-
-                        width = match_w.group(1)
-                        data_uri = match_uri.group(1)
-                        
-                        if match_title:
-                            titulo_interior = match_title.group(1)
-                            if not titulo_interior.lower().startswith("componentes"):
-                                titulo_interior = f"Componentes {titulo_interior}"
-                            modelo_puro = match_title.group(1).replace("Componentes ", "").replace("Componentes", "").strip()
-                        else:
-                            titulo_interior = "Componentes"
-                            modelo_puro = html_file.name.replace(".html", "").replace("Componentes ", "").replace("Corregido_", "").replace("Actualizado_", "")
-                        
-                        logo_uri = ""
-                        mostrar_logo = "none"
-                        try:
-                            logo_img = Image.open("banner_mosaico.png")
-                            buffered_logo = BytesIO()
-                            logo_img.save(buffered_logo, format="PNG")
-                            logo_base64 = base64.b64encode(buffered_logo.getvalue()).decode()
-                            logo_uri = f"data:image/png;base64,{logo_base64}"
-                            mostrar_logo = "inline-block"
-                        except Exception:
-                            pass
-                            
-                        html_report = HTML_TEMPLATE.replace("__TITULO_FINAL__", str(titulo_interior))
-                        html_report = html_report.replace("__BTN_TIPO_MAIN__", btn_tipo_main)
-                        html_report = html_report.replace("__BTN_COLOR_MAIN__", btn_color_main)
-                        html_report = html_report.replace("__BTN_TIPO_FS__", btn_tipo_fs)
-                        html_report = html_report.replace("__BTN_COLOR_FS__", btn_color_fs)
-                        html_report = html_report.replace("__PUNTOS_JSON__", puntos_json_limpio)
-                        html_report = html_report.replace("__WIDTH__", str(width))
-                        html_report = html_report.replace("__DATA_URI__", data_uri)
-                        html_report = html_report.replace("__LOGO_URI__", logo_uri)
-                        html_report = html_report.replace("__MOSTRAR_LOGO__", mostrar_logo)
-
-                        st.success(f"✅ {html_file.name}: Listo.")
-                        
-                        archivo_limpio = f"{modelo_puro}.html"
-                        zip_file.writestr(archivo_limpio, html_report)
-                        
-                    except Exception as e:
-                        st.error(f"Error procesando {html_file.name}: {e}")
+        logo_uri, mostrar_logo = logo_data_uri()
+
+        medidor = Medidor("tab2")
+        tamaño_total = sum(html_file.size for html_file in html_files)
+        en_procesos = procesos_para(len(html_files), tamaño_total) > 1
+        barra = st.progress(0.0, text=f"Reparando 0 de {len(html_files)} archivos...")
+        zip_buffer = zip_temporal()
+        with medidor.etapa("lote_reparacion", en_procesos=en_procesos), zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            # Los lotes grandes se reparan en paralelo; el ZIP se arma a medida que terminan
+            archivos = [(html_file.name, html_file.getvalue) for html_file in html_files]
+            assets_escritos = set()
+            for i, resultado in enumerate(reparar_en_lote(archivos, logo_uri, mostrar_logo, medidor=medidor, como_biblioteca=como_biblioteca,
+                                                          tamaño_total=tamaño_total), start=1):
+                if resultado.estado == "ok":
+                    st.success(f"✅ {resultado.nombre}: Listo.")
+                    zip_file.writestr(resultado.archivo, resultado.html, **compresion_para(len(resultado.html), resultado.bytes_imagen))
+                    for ruta, datos in (resultado.assets or {}).items():
+                        if ruta not in assets_escritos:
+                            assets_escritos.add(ruta)
+                            # Las imágenes ya vienen comprimidas: sólo el visor pasa por deflate
+                            zip_file.writestr(ruta, datos, compress_type=zipfile.ZIP_DEFLATED if ruta.endswith(EXTENSIONES_TEXTO) else zipfile.ZIP_STORED)
+                elif resultado.estado == "error":
+                    st.error(f"Error procesando {resultado.nombre}: {resultado.error}")
                 else:
-                    st.error(f"No se encontró la información completa en {html_file.name}.")
+                    st.error(f"No se encontró la información completa en {resultado.nombre}.")
+                barra.progress(i / len(html_files), text=f"Reparando {i} de {len(html_files)} archivos...")
 
         fecha_descarga = datetime.now().strftime("%Y-%m-%d_%H-%M")
         nombre_zip = f"HTMLs_Actualizados_({fecha_descarga}).zip"
 
         st.download_button(
             label="📦 DESCARGAR TODOS LOS ACTUALIZADOS (ZIP)",
-            data=zip_buffer.getvalue(),
+            data=leer_para_descarga(zip_buffer),
             file_name=nombre_zip,
             mime="application/zip",
             type="primary"
         )
+        panel_rendimiento(medidor)
 
 # =========================================================
 # PESTAÑA 3: TABLA DE RESUMEN GLOBAL
@@ -955,30 +181,10 @@ with tab3:
     html_files_resumen = st.file_uploader("Subir HTML(s) para crear tabla", type=["html"], accept_multiple_files=True, key="resumen_uploader")
 
     if html_files_resumen:
-        datos_tabla = []
-        
-        with st.spinner("Extrayendo datos de los HTMLs..."):
-            for file in html_files_resumen:
-                content = file.read().decode("utf-8")
-                
-                nombre_modelo = file.name.replace(".html", "").replace("Corregido_", "").replace("Actualizado_", "")
-                match_title = re.search(r'<title>(.*?)</title>', content, re.IGNORECASE)
-                if match_title:
-                    nombre_modelo = match_title.group(1).replace("Componentes ", "").strip()
-                    
-                cantidad = 0
-                match_puntos = re.search(r'const puntos = (\[.*?\]);', content, re.DOTALL)
-                if match_puntos:
-                    try:
-                        puntos_lista = json.loads(match_puntos.group(1))
-                        cantidad = len(puntos_lista)
-                    except:
-                        pass 
-                        
-                datos_tabla.append({
-                    "Nombre del Modelo": nombre_modelo, 
-                    "Cantidad Total de Piezas": cantidad
-                })
+        medidor = Medidor("tab3")
+        with st.spinner("Extrayendo datos de los HTMLs..."), medidor.etapa("lote_resumen"):
+            resumenes = resumir_en_lote([(file.name, file.getvalue) for file in html_files_resumen], medidor=medidor)
+            datos_tabla = filas_tabla(resumenes)
                 
         if datos_tabla:
             df_resumen = pd.DataFrame(datos_tabla)
@@ -991,3 +197,4 @@ with tab3:
                 mime="text/csv",
                 type="primary"
             )
+        panel_rendimiento(medidor)
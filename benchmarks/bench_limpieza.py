@@ -0,0 +1,62 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from benchmarks.sinteticos import generar_xml_cvat
+from mosaico.catalogo import COLOR_CATALOG, ajustar_color_por_tipo
+from mosaico.limpieza import limpiar_puntos
+from mosaico.parser_xml import parsear_cvat_xml
+
+# =========================================================
+# BENCHMARK: bucle + df.apply (anterior) vs limpieza columnar
+# =========================================================
+# Uso: python benchmarks/bench_limpieza.py [--tamaños 100000 500000 1000000]
+
+def limpiar_legado(rows):
+    filas_limpias = []
+    coordenadas_vistas = set()
+    for row in rows:
+        coord_id = (round(row["x"], 2), round(row["y"], 2))
+        if coord_id not in coordenadas_vistas:
+            filas_limpias.append(row)
+            coordenadas_vistas.add(coord_id)
+    rows = filas_limpias
+
+    df = pd.DataFrame(rows)
+    df["color_norm"] = df.apply(ajustar_color_por_tipo, axis=1)
+    df["color_plot"] = df["color_norm"].map(lambda x: COLOR_CATALOG.get(x, "gray"))
+    return df
+
+def _cronometrar(func, *args):
+    t0 = time.perf_counter()
+    resultado = func(*args)
+    return resultado, time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la limpieza de puntos fila a fila contra la columnar")
+    parser.add_argument("--tamaños", type=int, nargs="+", default=[100_000, 500_000, 1_000_000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.tamaños:
+            ruta = generar_xml_cvat(Path(tmp) / f"cvat_{n}.xml", n, n_tipos=8, n_colores=12)
+            df_crudo = parsear_cvat_xml(ruta).a_dataframe()
+            rows = df_crudo.to_dict("records")
+
+            df_legado, t_legado = _cronometrar(limpiar_legado, rows)
+            df_nuevo, t_nuevo = _cronometrar(limpiar_puntos, df_crudo)
+            identico = df_legado.to_json(orient="records") == df_nuevo.to_json(orient="records")
+
+            print(json.dumps({"puntos": n, "filas_limpias": len(df_nuevo), "identico": identico,
+                              "legado_s": round(t_legado, 3), "columnar_s": round(t_nuevo, 3),
+                              "aceleracion": round(t_legado / t_nuevo, 1)}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from benchmarks.sinteticos import generar_xml_cvat
+from mosaico.catalogo import COLOR_CATALOG, normalizar_color
+from mosaico.parser_xml import parsear_cvat_xml
+
+# =========================================================
+# BENCHMARK: ET.parse + dicts (anterior) vs iterparse columnar
+# =========================================================
+# Cada caso corre en un proceso aparte para que el pico de RSS sea el suyo.
+# Uso: python benchmarks/bench_parser_xml.py [--tamaños 10000 100000 1000000]
+
+def parsear_legado(ruta):
+    tree = ET.parse(ruta)
+    root = tree.getroot()
+    rows = []
+    for image in root.findall("image"):
+        for points in image.findall("points"):
+            coords = points.attrib["points"].split(";")
+            tipo = points.attrib.get("label", "sin_tipo")
+            attrs = {a.attrib["name"]: a.text for a in points.findall("attribute")}
+            for c in coords:
+                x, y = map(float, c.split(","))
+
+                tamaño_defecto = ""
+                if tipo == "microperla": tamaño_defecto = "pp01"
+                elif tipo == "marquiz": tamaño_defecto = "6x3mm"
+                elif tipo == "cristal": tamaño_defecto = "ss18"
+
+                rows.append({
+                    "x": x, "y": y, "tipo": tipo,
+                    "color_norm": normalizar_color(attrs.get("color", "")),
+                    "tamaño": attrs.get("tamaño", tamaño_defecto),
+                    "color_plot": COLOR_CATALOG.get(normalizar_color(attrs.get("color", "")), "gray")
+                })
+    return pd.DataFrame(rows)
+
+def parsear_streaming(ruta):
+    return parsear_cvat_xml(ruta).a_dataframe()
+
+IMPLEMENTACIONES = {"legado": parsear_legado, "streaming": parsear_streaming}
+
+def _rss_max_mb():
+    # ru_maxrss viene en KiB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def _trabajador(impl, ruta):
+    base = _rss_max_mb()
+    t0 = time.perf_counter()
+    df = IMPLEMENTACIONES[impl](ruta)
+    segundos = time.perf_counter() - t0
+    print(json.dumps({"filas": len(df), "segundos": round(segundos, 3),
+                      "rss_base_mb": round(base, 1), "rss_max_mb": round(_rss_max_mb(), 1)}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara tiempo y RSS del parseo de XML CVAT")
+    parser.add_argument("--tamaños", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--trabajador", nargs=2, metavar=("IMPL", "RUTA"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trabajador:
+        _trabajador(*args.trabajador)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.tamaños:
+            ruta = generar_xml_cvat(Path(tmp) / f"cvat_{n}.xml", n)
+            mb_xml = ruta.stat().st_size / (1024 * 1024)
+            resultados = {}
+            for impl in IMPLEMENTACIONES:
+                salida = subprocess.run([sys.executable, __file__, "--trabajador", impl, str(ruta)],
+                                        capture_output=True, text=True, check=True)
+                resultados[impl] = json.loads(salida.stdout)
+            print(json.dumps({"puntos": n, "xml_mb": round(mb_xml, 1), **resultados}))
+
+if __name__ == "__main__":
+    main()
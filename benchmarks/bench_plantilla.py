@@ -0,0 +1,69 @@
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mosaico.plantilla import HTML_TEMPLATE, PLANTILLA, botones_filtro
+from mosaico.teselas import tile_sources_imagen
+
+# =========================================================
+# MICROBENCHMARK: diez str.replace encadenados vs plantilla compilada
+# =========================================================
+# Uso: python benchmarks/bench_plantilla.py [--imagen-mb 2 10 30] [--puntos 100000]
+
+def llenar_legado(v):
+    html_report = HTML_TEMPLATE.replace("__TITULO_FINAL__", str(v["TITULO_FINAL"]))
+    html_report = html_report.replace("__BTN_TIPO_MAIN__", v["BTN_TIPO_MAIN"])
+    html_report = html_report.replace("__BTN_COLOR_MAIN__", v["BTN_COLOR_MAIN"])
+    html_report = html_report.replace("__BTN_TIPO_FS__", v["BTN_TIPO_FS"])
+    html_report = html_report.replace("__BTN_COLOR_FS__", v["BTN_COLOR_FS"])
+    html_report = html_report.replace("__PUNTOS_JSON__", v["PUNTOS_JSON"])
+    html_report = html_report.replace("__WIDTH__", str(v["WIDTH"]))
+    html_report = html_report.replace("__TILE_SOURCES__", "".join(v["TILE_SOURCES"]))
+    html_report = html_report.replace("__LOGO_URI__", v["LOGO_URI"])
+    html_report = html_report.replace("__MOSTRAR_LOGO__", v["MOSTRAR_LOGO"])
+    # El download_button recibe str y lo codifica; se incluye para comparar lo mismo
+    return html_report.encode("utf-8")
+
+def _medir(func, valores, repeticiones):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        salida = func(valores)
+    segundos = (time.perf_counter() - t0) / repeticiones
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return salida, segundos, pico
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el llenado de la plantilla HTML")
+    parser.add_argument("--imagen-mb", type=float, nargs="+", default=[2, 10, 30])
+    parser.add_argument("--puntos", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    puntos_json = json.dumps([{"x": 1234.56, "y": 789.01, "tipo": "cristal", "color_norm": "ab_cristal",
+                               "tamaño": "ss18", "color_plot": "lightcyan"}] * args.puntos)
+    for mb in args.imagen_mb:
+        data_uri = "data:image/jpeg;base64," + base64.b64encode(os.urandom(int(mb * 1024 * 1024 * 3 / 4))).decode()
+        valores = {
+            "TITULO_FINAL": "Componentes PB-8612 A", "PUNTOS_JSON": puntos_json, "WIDTH": 6000,
+            "TILE_SOURCES": tile_sources_imagen(data_uri), "LOGO_URI": "", "MOSTRAR_LOGO": "none",
+            **botones_filtro(["cristal", "microperla"], ["ab_cristal", "plata"]),
+        }
+        legado, t_legado, pico_legado = _medir(llenar_legado, valores, args.repeticiones)
+        nuevo, t_nuevo, pico_nuevo = _medir(PLANTILLA.render, valores, args.repeticiones)
+        print(json.dumps({
+            "imagen_mb": mb, "reporte_mb": round(len(nuevo) / (1024 * 1024), 1), "identico": legado == nuevo,
+            "replace_ms": round(t_legado * 1000, 1), "compilada_ms": round(t_nuevo * 1000, 1),
+            "replace_pico_mb": round(pico_legado / (1024 * 1024), 1), "compilada_pico_mb": round(pico_nuevo / (1024 * 1024), 1),
+        }))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from mosaico.plantilla import HTML_TEMPLATE
+
+# =========================================================
+# PARIDAD: AGRUPAMIENTO DEL MODO DIAGRAMA (REQUIERE NODE)
+# =========================================================
+# Ejecuta con node la función agruparPorDistancia del template y el bucle
+# anidado original sobre los mismos puntos y compara grupo por grupo.
+# Uso: python benchmarks/paridad_agrupamiento.py [--tamaños 200 2000 20000] [--umbrales 0.02 0.1 0.15 0.5]
+
+AGRUPAR_LEGADO = """
+function agruparLegado(xs, ys, umbral) {
+    let clusters = [];
+    const grupoDe = new Int32Array(xs.length);
+    for (let i = 0; i < xs.length; i++) {
+        let addedToCluster = false;
+        for (let c = 0; c < clusters.length; c++) {
+            for (let j of clusters[c]) {
+                if (Math.sqrt(Math.pow(xs[i] - xs[j], 2) + Math.pow(ys[i] - ys[j], 2)) < umbral) {
+                    clusters[c].push(i);
+                    grupoDe[i] = c;
+                    addedToCluster = true;
+                    break;
+                }
+            }
+            if (addedToCluster) break;
+        }
+        if (!addedToCluster) { grupoDe[i] = clusters.length; clusters.push([i]); }
+    }
+    return { grupoDe, grupos: clusters.length };
+}
+"""
+
+COMPARAR = """
+const casos = JSON.parse(require('fs').readFileSync(process.argv[2], 'utf8'));
+for (const caso of casos) {
+    const xs = Float64Array.from(caso.xs), ys = Float64Array.from(caso.ys);
+    let t0 = performance.now();
+    const legado = agruparLegado(xs, ys, caso.umbral);
+    const tLegado = performance.now() - t0;
+    t0 = performance.now();
+    const grilla = agruparPorDistancia(xs, ys, caso.umbral);
+    const tGrilla = performance.now() - t0;
+    let distintos = 0;
+    for (let i = 0; i < xs.length; i++) if (legado.grupoDe[i] !== grilla.grupoDe[i]) distintos++;
+    console.log(JSON.stringify({
+        nombre: caso.nombre, puntos: xs.length, umbral: caso.umbral, grupos: grilla.grupos,
+        identico: distintos === 0 && legado.grupos === grilla.grupos, puntos_distintos: distintos,
+        legado_ms: +tLegado.toFixed(2), grilla_ms: +tGrilla.toFixed(2)
+    }));
+}
+"""
+
+def extraer_funcion(nombre):
+    inicio = HTML_TEMPLATE.index(f"function {nombre}(")
+    fin = HTML_TEMPLATE.index("\n        }", inicio) + len("\n        }")
+    return HTML_TEMPLATE[inicio:fin]
+
+def puntos_uniformes(rnd, n):
+    return [rnd.uniform(0, 1) for _ in range(n)], [rnd.uniform(0, 0.75) for _ in range(n)]
+
+def puntos_en_manchas(rnd, n, manchas=12):
+    # Manchas densas separadas: el caso típico de un mosaico, con puentes entre grupos
+    centros = [(rnd.uniform(0, 1), rnd.uniform(0, 0.75), rnd.uniform(0.01, 0.08)) for _ in range(manchas)]
+    xs, ys = [], []
+    for _ in range(n):
+        cx, cy, r = rnd.choice(centros)
+        xs.append(min(1, max(0, rnd.gauss(cx, r))))
+        ys.append(min(0.75, max(0, rnd.gauss(cy, r))))
+    return xs, ys
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el agrupamiento en grilla del modo diagrama contra el bucle anidado original")
+    parser.add_argument("--tamaños", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--umbrales", type=float, nargs="+", default=[0.02, 0.1, 0.15, 0.3, 0.5])
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    node = shutil.which("node")
+    if node is None:
+        sys.exit("Se necesita node en el PATH para ejecutar el JavaScript del reporte")
+
+    rnd = random.Random(args.semilla)
+    casos = []
+    for n in args.tamaños:
+        for nombre, generar in (("uniforme", puntos_uniformes), ("manchas", puntos_en_manchas)):
+            xs, ys = generar(rnd, n)
+            casos += [{"nombre": nombre, "xs": xs, "ys": ys, "umbral": u} for u in args.umbrales]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datos = Path(tmp) / "casos.json"
+        datos.write_text(json.dumps(casos), encoding="utf-8")
+        script = Path(tmp) / "paridad.js"
+        script.write_text("\n".join([extraer_funcion("agruparPorDistancia"), AGRUPAR_LEGADO, COMPARAR]), encoding="utf-8")
+        resultado = subprocess.run([node, str(script), str(datos)], stdout=subprocess.PIPE, text=True, check=True)
+
+    lineas = [json.loads(l) for l in resultado.stdout.splitlines() if l.strip()]
+    for linea in lineas:
+        print(json.dumps(linea))
+    if not all(l["identico"] for l in lineas):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
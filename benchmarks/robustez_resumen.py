@@ -0,0 +1,69 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pandas as pd
+
+from mosaico.compacto import puntos_compactos_json
+from mosaico.plantilla import PLANTILLA
+from mosaico.reporte import valores_reporte
+from mosaico.resumen import resumir_en_lote, resumir_reporte
+from mosaico.teselas import tile_sources_imagen
+
+# =========================================================
+# ROBUSTEZ: RESUMEN (PESTAÑA 3) CON REPORTES DAÑADOS
+# =========================================================
+# Arma un reporte válido y variantes con DATOS_PUNTOS truncado o editado a mano;
+# cada una debe resumirse con cantidad 0 sin cortar el lote (como en la pestaña 3).
+# Imprime una línea JSON por caso y sale con 1 si alguno falla.
+# Uso: python benchmarks/robustez_resumen.py
+MARCA = b"const DATOS_PUNTOS = "
+
+def reporte_valido():
+    df = pd.DataFrame({"x": [10.0, 20.0, 30.0], "y": [5.0, 6.0, 7.0], "tipo": ["balin", "balin", "perla"],
+                       "color_norm": ["rojo", "azul", "rojo"], "tamaño": [4, 4, 6], "color_plot": ["red", "blue", "red"]})
+    valores = valores_reporte("Prueba", df, puntos_compactos_json(df), 100, tile_sources_imagen("data:image/jpeg;base64,AAAA"))
+    return PLANTILLA.render(valores)
+
+def con_puntos(html, nuevo):
+    inicio = html.index(MARCA) + len(MARCA)
+    fin = html.index(b";\n", inicio)
+    return html[:inicio] + nuevo + html[fin:]
+
+def main():
+    html = reporte_valido()
+    inicio = html.index(MARCA) + len(MARCA)
+    original = html[inicio:html.index(b";\n", inicio)]
+    datos = json.loads(original)
+    casos = {
+        "truncado": original[:len(original) // 2],
+        "json_invalido": b"{" + original[2:],
+        "sin_n": json.dumps({k: v for k, v in datos.items() if k != "n"}).encode(),
+        "grupo_no_texto": json.dumps({**datos, "grupo": 123}).encode(),
+        "grupo_fuera_de_rango": json.dumps({**datos, "grupos": [[9, 9, 0, 0]] * len(datos["grupos"])}).encode(),
+        "tipos_incorrectos": json.dumps({**datos, "grupos": None}).encode(),
+        "arreglo": b"[1, 2, 3]",
+    }
+    fallas = 0
+    valido = resumir_reporte("valido.html", html)
+    print(json.dumps({"caso": "valido", "cantidad": valido.cantidad, "ok": valido.cantidad == 3}))
+    fallas += valido.cantidad != 3
+
+    archivos = [(f"{nombre}.html", lambda c=con_puntos(html, payload): c) for nombre, payload in casos.items()]
+    archivos.append(("valido.html", lambda: html))
+    try:
+        resumenes = resumir_en_lote(archivos)
+    except Exception as e:
+        print(json.dumps({"caso": "lote", "ok": False, "error": f"{type(e).__name__}: {e}"}))
+        return 1
+    for (nombre, _), resumen in zip(archivos, resumenes):
+        esperado = 3 if nombre == "valido.html" else 0
+        ok = resumen.cantidad == esperado
+        fallas += not ok
+        print(json.dumps({"caso": nombre, "cantidad": resumen.cantidad, "ok": ok}))
+    return 1 if fallas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import random
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+from PIL import Image
+
+# =========================================================
+# GENERADOR DE XML CVAT SINTÉTICOS PARA BENCHMARKS
+# =========================================================
+TIPOS = ["cristal", "microperla", "marquiz", "dicroico", "balin", "perla", "cabujon", "roseta"]
+COLORES = ["plata", "dorado", "ab cristal", "Jet", "siam", "zafiro", "topaz", "rsb_azul", "", "Rosa ", "vitral", "fuschia"]
+
+def generar_xml_cvat(ruta, n_puntos, n_tipos=5, n_colores=8, ancho=4000, alto=3000,
+                     puntos_por_elemento=5, duplicados=0.02, semilla=0):
+    rnd = random.Random(semilla)
+    tipos = TIPOS[:n_tipos]
+    colores = COLORES[:n_colores]
+    escritos = 0
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n<annotations>\n<version>1.1</version>\n')
+        f.write(f'<image id="0" name="mosaico.jpg" width="{ancho}" height="{alto}">\n')
+        previo = None
+        while escritos < n_puntos:
+            k = min(puntos_por_elemento, n_puntos - escritos)
+            coords = []
+            for _ in range(k):
+                if previo and rnd.random() < duplicados:
+                    coords.append(previo)
+                else:
+                    previo = f"{rnd.uniform(0, ancho):.2f},{rnd.uniform(0, alto):.2f}"
+                    coords.append(previo)
+            tipo = rnd.choice(tipos)
+            color = rnd.choice(colores)
+            f.write(f'<points label={quoteattr(tipo)} source="manual" occluded="0" points="{";".join(coords)}" z_order="0">')
+            if color:
+                f.write(f'<attribute name="color">{color}</attribute>')
+            if rnd.random() < 0.3:
+                f.write(f'<attribute name="tamaño">ss{rnd.choice([6, 10, 16, 20])}</attribute>')
+            f.write("</points>\n")
+            escritos += k
+        f.write("</image>\n</annotations>\n")
+    return ruta
+
+def generar_imagen(ruta, ancho=4000, alto=3000, semilla=0, calidad=90):
+    # Degradé con manchas y ruido: se comprime como una foto, no como un color liso
+    rnd = np.random.default_rng(semilla)
+    xs = np.linspace(0, 255, ancho, dtype=np.float32)
+    ys = np.linspace(0, 255, alto, dtype=np.float32)[:, None]
+    base = np.empty((alto, ancho, 3), dtype=np.float32)
+    base[..., 0] = xs
+    base[..., 1] = ys
+    base[..., 2] = (xs + ys) / 2
+    for _ in range(40):
+        cx, cy, r = rnd.integers(0, ancho), rnd.integers(0, alto), int(rnd.uniform(0.02, 0.1) * ancho)
+        y0, y1, x0, x1 = max(0, cy - r), min(alto, cy + r), max(0, cx - r), min(ancho, cx + r)
+        yy, xx = np.ogrid[y0:y1, x0:x1]
+        base[y0:y1, x0:x1][(xx - cx) ** 2 + (yy - cy) ** 2 < r * r] = rnd.uniform(0, 255, 3)
+    base += rnd.normal(0, 12, base.shape).astype(np.float32)
+    Image.fromarray(np.clip(base, 0, 255).astype(np.uint8)).save(ruta, format="JPEG", quality=calidad)
+    return ruta
@@ -0,0 +1,164 @@
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.sinteticos import generar_imagen, generar_xml_cvat
+from mosaico.catalogo import COLOR_CATALOG, ajustar_color_por_tipo
+from mosaico.compacto import puntos_compactos_json
+from mosaico.extraccion import extraer_datos_reporte
+from mosaico.limpieza import _por_combinacion, mascara_coordenadas_unicas
+from mosaico.parser_xml import parsear_cvat_xml
+from mosaico.plantilla import PLANTILLA
+from mosaico.reparacion import reparar_reporte
+from mosaico.reporte import imagen_a_data_uri, valores_reporte
+from mosaico.resumen import resumir_reporte
+from mosaico.teselas import tile_sources_imagen
+
+# =========================================================
+# SUITE DE BENCHMARKS: PESTAÑAS 1-3 Y VISOR
+# =========================================================
+# Genera un XML de CVAT y una imagen sintéticos por caso y cronometra cada etapa
+# por separado (mediana de --repeticiones): parseo del XML, duplicados, colores
+# por tipo, codificación de puntos, JPEG, plantilla, extracción y
+# reparación (pestaña 2) y resumen (pestaña 3). Con node en el PATH también
+# mide el visor del reporte generado (benchmarks/visor_stub.js).
+# El resultado se guarda como JSON; --comparar muestra el cociente contra otra corrida.
+# Uso: python benchmarks/suite.py [--puntos 5000 50000] [--tipos 5] [--colores 8]
+#                                 [--resolucion 4000x3000] [--salida resultados.json] [--comparar anterior.json]
+FORMATO = "mosaico-bench-1"
+VISOR_STUB = Path(__file__).resolve().parent / "visor_stub.js"
+UMBRAL_REGRESION = 1.2  # cociente nuevo/anterior a partir del cual se marca
+
+def _cronometrar(repeticiones, func):
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = func()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return resultado, {"mediana_ms": round(statistics.median(tiempos), 2), "min_ms": round(min(tiempos), 2)}
+
+def _version(comando):
+    try:
+        return subprocess.run(comando, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def medir_visor(node, ruta_html, cuadros, clicks):
+    resultado = subprocess.run([node, str(VISOR_STUB), str(ruta_html), "--cuadros", str(cuadros), "--clicks", str(clicks)],
+                               stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(resultado.stdout)
+
+def medir_caso(tmp, n, args, ruta_imagen, node):
+    ancho, alto = args.resolucion
+    ruta_xml = generar_xml_cvat(Path(tmp) / f"cvat_{n}.xml", n, n_tipos=args.tipos, n_colores=args.colores,
+                                ancho=ancho, alto=alto, semilla=args.semilla)
+    xml_bytes, img_bytes = ruta_xml.read_bytes(), ruta_imagen.read_bytes()
+    rep = args.repeticiones
+    etapas = {}
+
+    df_crudo, etapas["parseo_xml"] = _cronometrar(rep, lambda: parsear_cvat_xml(ruta_xml).a_dataframe())
+    df, etapas["duplicados"] = _cronometrar(rep, lambda: df_crudo[mascara_coordenadas_unicas(df_crudo["x"], df_crudo["y"])].reset_index(drop=True))
+
+    def colores():
+        limpio = df.copy()
+        limpio["color_norm"] = _por_combinacion(ajustar_color_por_tipo, limpio, ["tipo", "color_norm"])
+        limpio["color_plot"] = _por_combinacion(lambda f: COLOR_CATALOG.get(f["color_norm"], "gray"), limpio, ["color_norm"])
+        return limpio
+    df, etapas["color_por_tipo"] = _cronometrar(rep, colores)
+
+    puntos_json, etapas["codificacion_puntos"] = _cronometrar(rep, lambda: puntos_compactos_json(df))
+    (width, _, data_uri, _), etapas["codificacion_imagen"] = _cronometrar(rep, lambda: imagen_a_data_uri(img_bytes))
+    valores = valores_reporte("Benchmark", df, puntos_json, width, tile_sources_imagen(data_uri))
+    html, etapas["plantilla"] = _cronometrar(rep, lambda: PLANTILLA.render(valores))
+
+    _, etapas["extraccion_reporte"] = _cronometrar(rep, lambda: extraer_datos_reporte(html))
+    _, etapas["reparacion"] = _cronometrar(1, lambda: reparar_reporte("Benchmark.html", html))
+    _, etapas["resumen"] = _cronometrar(rep, lambda: resumir_reporte("Benchmark.html", html))
+
+    caso = {"puntos": n, "puntos_limpios": len(df), "tipos": args.tipos, "colores": args.colores,
+            "resolucion": f"{ancho}x{alto}", "bytes_xml": len(xml_bytes), "bytes_imagen": len(img_bytes),
+            "bytes_reporte": len(html), "etapas": etapas}
+    if node:
+        ruta_html = Path(tmp) / f"reporte_{n}.html"
+        ruta_html.write_bytes(html)
+        caso["visor"] = medir_visor(node, ruta_html, args.cuadros, args.clicks)
+    return caso
+
+def _aplanar(caso):
+    # {"etapas.parseo_xml": ms, "visor.render.zoom_1.ms_por_cuadro": ms, ...} para comparar corridas
+    planos = {f"etapas.{k}": v["mediana_ms"] for k, v in caso["etapas"].items()}
+    pendientes = [("visor", caso.get("visor", {}))]
+    while pendientes:
+        prefijo, valor = pendientes.pop()
+        if isinstance(valor, dict):
+            pendientes += [(f"{prefijo}.{k}", v) for k, v in valor.items() if k not in ("llamadas_canvas", "puntos", "arcos", "aciertos")]
+        elif isinstance(valor, (int, float)):
+            planos[prefijo] = valor
+    return planos
+
+def comparar(actual, ruta_anterior):
+    anterior = json.loads(Path(ruta_anterior).read_text(encoding="utf-8"))
+    previos = {(c["puntos"], c["resolucion"]): _aplanar(c) for c in anterior["casos"]}
+    for caso in actual["casos"]:
+        base = previos.get((caso["puntos"], caso["resolucion"]))
+        if base is None:
+            continue
+        for clave, valor in sorted(_aplanar(caso).items()):
+            if clave in base and base[clave] > 0:
+                cociente = valor / base[clave]
+                print(json.dumps({"puntos": caso["puntos"], "medida": clave, "anterior": base[clave], "actual": valor,
+                                  "cociente": round(cociente, 2), "regresion": cociente >= UMBRAL_REGRESION}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide cada etapa de las pestañas 1-3 y del visor con datos sintéticos")
+    parser.add_argument("--puntos", type=int, nargs="+", default=[5_000, 50_000])
+    parser.add_argument("--tipos", type=int, default=5)
+    parser.add_argument("--colores", type=int, default=8)
+    parser.add_argument("--resolucion", type=lambda s: tuple(int(v) for v in s.lower().split("x")), default=(4000, 3000))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--cuadros", type=int, default=20, help="cuadros por zoom en el visor")
+    parser.add_argument("--clicks", type=int, default=2000)
+    parser.add_argument("--sin-visor", action="store_true", help="no mide el visor aunque haya node")
+    parser.add_argument("--salida", type=Path, help="archivo JSON de resultados (por defecto, benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    node = None if args.sin_visor else shutil.which("node")
+    if node is None and not args.sin_visor:
+        print("node no está en el PATH: se omite el visor", file=sys.stderr)
+
+    resultado = {
+        "formato": FORMATO, "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _version(["git", "-C", str(Path(__file__).resolve().parents[1]), "rev-parse", "--short", "HEAD"]),
+        "python": platform.python_version(), "node": _version([node, "--version"]) if node else None,
+        "plataforma": platform.platform(), "procesador": platform.processor() or platform.machine(),
+        "parametros": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+        "casos": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta_imagen = generar_imagen(Path(tmp) / "imagen.jpg", *args.resolucion, semilla=args.semilla)
+        for n in args.puntos:
+            caso = medir_caso(tmp, n, args, ruta_imagen, node)
+            print(json.dumps({"puntos": n, "etapas_ms": {k: v["mediana_ms"] for k, v in caso["etapas"].items()}}))
+            resultado["casos"].append(caso)
+
+    salida = args.salida or Path(__file__).resolve().parent / "resultados" / f"{datetime.now():%Y-%m-%d_%H-%M-%S}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados en {salida}", file=sys.stderr)
+    if args.comparar:
+        comparar(resultado, args.comparar)
+
+if __name__ == "__main__":
+    main()
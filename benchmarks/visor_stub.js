@@ -0,0 +1,192 @@
+// =========================================================
+// BENCHMARK DEL VISOR SIN NAVEGADOR (NODE)
+// =========================================================
+// Ejecuta los <script> de un reporte generado sobre un DOM mínimo: canvas 2D que
+// solo cuenta llamadas, un OpenSeadragon con el viewport lineal y sin WebGL ni
+// Worker (el diagrama se calcula en el hilo principal). Mide carga, renderCanvas
+// a varios zooms, el click (índice espacial) y updateDataAndDiagram con filtros
+// y con el modo diagrama; imprime un objeto JSON.
+// Uso: node benchmarks/visor_stub.js REPORTE.html [--cuadros 20] [--clicks 2000]
+// Los scripts corren en el contexto principal (vm.runInThisContext): un contexto
+// aislado encarece cada acceso a globales y distorsiona los tiempos. Los <script src>
+// locales (visor de una biblioteca, en assets/) se leen relativos al reporte.
+'use strict';
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const { performance } = require('perf_hooks');
+
+const ANCHO = 1000, ALTO = 750;
+
+function opcion(nombre, defecto) {
+  const i = process.argv.indexOf(nombre);
+  return i === -1 ? defecto : Number(process.argv[i + 1]);
+}
+
+const llamadas = {};
+function contexto2D() {
+  const ctx = {};
+  for (const m of ['beginPath', 'arc', 'fill', 'stroke', 'clearRect', 'moveTo', 'lineTo', 'fillRect', 'strokeRect',
+                   'setLineDash', 'save', 'restore', 'fillText', 'closePath', 'rect', 'setTransform', 'roundRect',
+                   'drawImage', 'translate', 'scale', 'quadraticCurveTo', 'clip']) {
+    ctx[m] = () => { llamadas[m] = (llamadas[m] || 0) + 1; };
+  }
+  ctx.measureText = (t) => ({ width: String(t).length * 7 });
+  return ctx;
+}
+
+class Elemento {
+  constructor(tag) {
+    this.tagName = tag; this.style = {}; this.children = []; this.innerHTML = ''; this.attrs = {};
+    this.className = ''; this.width = 300; this.height = 150; this.value = '';
+    const el = this;
+    this.classList = {
+      add(c) { el.className += ' ' + c; }, remove(c) { el.className = el.className.replace(c, ''); },
+      toggle() {}, contains(c) { return el.className.includes(c); }
+    };
+  }
+  getAttribute(k) { return this.attrs[k]; }
+  setAttribute(k, v) { this.attrs[k] = v; }
+  addEventListener() {}
+  removeEventListener() {}
+  appendChild(c) { this.children.push(c); return c; }
+  querySelectorAll() { return []; }
+  getContext(tipo) { return tipo === '2d' ? (this._ctx || (this._ctx = contexto2D())) : null; }
+  get clientWidth() { return ANCHO; }
+  get clientHeight() { return ALTO; }
+}
+
+function crearOpenSeadragon(aspecto) {
+  class Point { constructor(x, y) { this.x = x; this.y = y; } }
+  class Rect { constructor(x, y, w, h) { this.x = x; this.y = y; this.width = w; this.height = h; } }
+  const handlers = {};
+  const viewport = {
+    zoom: 1, cx: 0.5, cy: aspecto / 2,
+    getZoom() { return this.zoom; },
+    getBounds() { const w = 1 / this.zoom, h = w * ALTO / ANCHO; return new Rect(this.cx - w / 2, this.cy - h / 2, w, h); },
+    pixelFromPoint(p) { const b = this.getBounds(), s = ANCHO * this.zoom; return new Point((p.x - b.x) * s, (p.y - b.y) * s); },
+    pointFromPixel(p) { const b = this.getBounds(), s = ANCHO * this.zoom; return new Point(p.x / s + b.x, p.y / s + b.y); },
+    deltaPointsFromPixels(p) { const s = ANCHO * this.zoom; return new Point(p.x / s, p.y / s); },
+    deltaPixelsFromPoints(p) { const s = ANCHO * this.zoom; return new Point(p.x * s, p.y * s); },
+    getContainerSize() { return new Point(ANCHO, ALTO); },
+    viewportToImageZoom(z) { return z; },
+    zoomBy(f) { this.zoom *= f; },
+    goHome() { this.zoom = 1; this.cx = 0.5; this.cy = aspecto / 2; },
+    panTo(p) { this.cx = p.x; this.cy = p.y; },
+  };
+  const visor = {
+    canvas: new Elemento('div'), element: new Elemento('div'), viewport,
+    world: { getItemAt() { return { getContentSize() { return new Point(ANCHO, ANCHO * aspecto); } }; } },
+    addHandler(n, f) { (handlers[n] = handlers[n] || []).push(f); },
+    raise(n, ev) { (handlers[n] || []).forEach(f => f(ev || {})); },
+    addOverlay() {}, clearOverlays() {}, isFullPage() { return false; },
+  };
+  function OpenSeadragon() { return visor; }
+  OpenSeadragon.Point = Point;
+  OpenSeadragon.Rect = Rect;
+  return { OpenSeadragon, visor };
+}
+
+function instalarGlobales() {
+  const elementos = {};
+  const pendientes = [];
+  const document = {
+    getElementById(id) { return elementos[id] || (elementos[id] = new Elemento('div')); },
+    createElement(tag) { return new Elemento(tag); },
+    addEventListener() {}, fullscreenElement: null,
+    body: new Elemento('body'), head: new Elemento('head'),
+  };
+  const { OpenSeadragon, visor } = crearOpenSeadragon(0.75);
+  Object.assign(globalThis, {
+    document, OpenSeadragon, screen: {},
+    window: { devicePixelRatio: 1, addEventListener() {}, location: { search: '' }, document },
+    location: { search: '' },
+    requestAnimationFrame: (f) => { pendientes.push(() => f(performance.now())); return pendientes.length; },
+    cancelAnimationFrame() {},
+  });
+  // setTimeout del reporte (debounce del slider) a una cola que se vacía a mano
+  globalThis.setTimeout = (f) => { pendientes.push(f); return pendientes.length; };
+  globalThis.clearTimeout = () => {};
+  return { visor, elementos, vaciar() { while (pendientes.length) pendientes.shift()(); } };
+}
+
+function mediana(valores) {
+  const v = [...valores].sort((a, b) => a - b);
+  return v.length ? v[Math.floor(v.length / 2)] : 0;
+}
+
+function cronometrar(n, func) {
+  const tiempos = [];
+  for (let k = 0; k < n; k++) {
+    const t0 = performance.now();
+    func(k);
+    tiempos.push(performance.now() - t0);
+  }
+  return +mediana(tiempos).toFixed(3);
+}
+
+function main() {
+  const ruta = process.argv[2];
+  const cuadros = opcion('--cuadros', 20), clicks = opcion('--clicks', 2000);
+  const html = fs.readFileSync(ruta, 'utf8');
+  const scripts = [...html.matchAll(/<script(?: src="([^"]*)")?>([\s\S]*?)<\/script>/g)]
+    .filter(m => !/^https?:/.test(m[1] || ''))
+    .map(m => m[1] ? fs.readFileSync(path.resolve(path.dirname(ruta), decodeURI(m[1])), 'utf8') : m[2]);
+  const { visor, vaciar } = instalarGlobales();
+
+  const gancho = 'globalThis.__bench = { puntos, renderCanvas, updateDataAndDiagram, sel: () => lastSelected,' +
+    ' estado(ft, fc, dm, u) { filterT = ft; filterC = fc; diagramMode = dm; DISTANCE_THRESHOLD = u; lastSelected = null; } };';
+  let t0 = performance.now();
+  vm.runInThisContext(scripts.join('\n') + '\n' + gancho, { filename: 'reporte.js' });
+  visor.raise('open');
+  vaciar();
+  const B = globalThis.__bench;
+  const resultado = { puntos: B.puntos.length, carga_ms: +(performance.now() - t0).toFixed(1) };
+
+  // renderCanvas a distintos zooms (centro de la imagen); arcos por cuadro como referencia
+  resultado.render = {};
+  for (const zoom of [1, 4, 16]) {
+    visor.viewport.goHome();
+    visor.viewport.zoom = zoom;
+    B.renderCanvas();
+    const previos = llamadas.arc || 0;
+    B.renderCanvas();
+    const arcos = (llamadas.arc || 0) - previos;
+    resultado.render['zoom_' + zoom] = { ms_por_cuadro: cronometrar(cuadros, () => B.renderCanvas()), arcos };
+  }
+
+  // Click: posiciones pseudoaleatorias a zoom 4 (incluye el redibujado que dispara)
+  let semilla = 7;
+  const azar = () => (semilla = (semilla * 16807) % 2147483647) / 2147483647;
+  visor.viewport.goHome();
+  visor.viewport.zoom = 4;
+  let aciertos = 0;
+  const tClick = performance.now();
+  for (let k = 0; k < clicks; k++) {
+    visor.raise('canvas-click', { position: { x: azar() * ANCHO, y: azar() * ALTO } });
+    if (B.sel()) aciertos++;
+  }
+  resultado.click = { ms_por_click: +((performance.now() - tClick) / Math.max(1, clicks)).toFixed(4), aciertos };
+
+  // Filtros y modo diagrama (cálculo síncrono, sin Worker)
+  visor.viewport.goHome();
+  const tipos = [...new Set(B.puntos.map(p => p.tipo))], colores = [...new Set(B.puntos.map(p => p.color_norm))];
+  const filtros = [['all', 'all'], [tipos[0], 'all'], ['all', colores[0]], [tipos[0], colores[0]]];
+  resultado.filtros_ms = cronometrar(filtros.length * 3, (k) => {
+    const [ft, fc] = filtros[k % filtros.length];
+    B.estado(ft, fc, false, 0.15);
+    B.updateDataAndDiagram();
+  });
+  resultado.diagrama_ms = {};
+  for (const umbral of [0.10, 0.15, 0.30, 0.50]) {
+    resultado.diagrama_ms['umbral_' + umbral] = cronometrar(3, () => {
+      B.estado('all', 'all', true, umbral);
+      B.updateDataAndDiagram();
+      vaciar();
+    });
+  }
+  resultado.llamadas_canvas = llamadas;
+  process.stdout.write(JSON.stringify(resultado) + '\n');
+}
+
+main();
@@ -0,0 +1,105 @@
+import base64
+import hashlib
+import os
+from pathlib import Path
+
+from .plantilla import CSS_VISOR, JS_VISOR, plantilla_con_assets
+from .teselas import tile_sources_imagen
+
+# =========================================================
+# EXPORTACIÓN COMO BIBLIOTECA (ASSETS COMPARTIDOS)
+# =========================================================
+# Los reportes de una biblioteca no embeben el visor, el logo ni la imagen: se
+# escriben una sola vez en assets/ con el hash del contenido en el nombre y cada
+# HTML los referencia con rutas relativas. Un mismo archivo sirve a todos los
+# reportes que lo usan (y queda en la caché del navegador entre uno y otro); como
+# el nombre cambia si cambia el contenido, se puede publicar en cualquier hosting
+# estático con caché permanente.
+#   biblioteca/
+#       Modelo A.html, Modelo B.html, ...
+#       assets/visor-<hash>.js, visor-<hash>.css, logo-<hash>.png,
+#              imagen-<hash>.jpg, teselas-<hash>/<nivel>/<col>_<fila>.jpg
+# Con `raiz` los assets se escriben en disco; varios procesos pueden escribir el
+# mismo a la vez porque el contenido es idéntico y el reemplazo es atómico. Sin
+# `raiz` se acumulan en `pendientes` y el llamador los agrega (p. ej. a un ZIP).
+CARPETA_ASSETS = "assets"
+LARGO_HASH = 16
+EXTENSIONES_TEXTO = (".js", ".css")   # los únicos assets que vale la pena comprimir
+_EXTENSIONES_MIME = {"jpeg": "jpg", "svg+xml": "svg"}
+
+def huella(*trozos):
+    h = hashlib.sha256()
+    for trozo in trozos:
+        h.update(trozo)
+    return h.hexdigest()[:LARGO_HASH]
+
+def escribir_si_falta(ruta, datos):
+    if ruta.exists():
+        return
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f".{ruta.name}.{os.getpid()}.tmp")
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+def decodificar_data_uri(data_uri):
+    # (bytes, extensión) de una data URI base64 de imagen (str, bytes o memoryview)
+    data_uri = data_uri.encode("ascii") if isinstance(data_uri, str) else bytes(data_uri)
+    cabecera, _, contenido = data_uri.partition(b",")
+    subtipo = cabecera[len(b"data:image/"):].split(b";")[0].decode("ascii")
+    return base64.b64decode(contenido), _EXTENSIONES_MIME.get(subtipo, subtipo)
+
+class Biblioteca:
+    def __init__(self, raiz=None):
+        self.raiz = Path(raiz) if raiz is not None else None
+        self.pendientes = {}    # ruta relativa -> bytes, cuando no hay raiz
+        self._agregados = set()
+        self._plantilla = None
+        self._logos = {}
+
+    def _guardar(self, ruta, datos):
+        if ruta in self._agregados:
+            return
+        self._agregados.add(ruta)
+        if self.raiz is None:
+            self.pendientes[ruta] = datos
+        else:
+            escribir_si_falta(self.raiz / ruta, datos)
+
+    def agregar(self, datos, prefijo, extension):
+        # Devuelve la ruta relativa al HTML ("assets/<prefijo>-<hash>.<extensión>")
+        ruta = f"{CARPETA_ASSETS}/{prefijo}-{huella(datos)}.{extension}"
+        self._guardar(ruta, datos)
+        return ruta
+
+    def agregar_teselas(self, teselas):
+        # La carpeta se nombra con el hash de todas las teselas (rutas incluidas)
+        carpeta = f"{CARPETA_ASSETS}/teselas-{huella(*(t for ruta, datos in teselas for t in (ruta.encode(), datos)))}"
+        for ruta, datos in teselas:
+            self._guardar(f"{carpeta}/{ruta}", datos)
+        return carpeta
+
+    def plantilla(self):
+        if self._plantilla is None:
+            self._plantilla = plantilla_con_assets(self.agregar(CSS_VISOR.encode("utf-8"), "visor", "css"),
+                                                   self.agregar(JS_VISOR.encode("utf-8"), "visor", "js"))
+        return self._plantilla
+
+    def logo(self, logo_uri, mostrar_logo):
+        # Recibe y devuelve (LOGO_URI, MOSTRAR_LOGO) como logo_data_uri, con el logo como archivo
+        if not logo_uri:
+            return logo_uri, mostrar_logo
+        if logo_uri not in self._logos:
+            datos, extension = decodificar_data_uri(logo_uri)
+            self._logos[logo_uri] = self.agregar(datos, "logo", extension)
+        return self._logos[logo_uri], mostrar_logo
+
+    def imagen(self, datos, extension):
+        return tile_sources_imagen(self.agregar(datos, "imagen", extension))
+
+    def imagen_data_uri(self, data_uri):
+        return self.imagen(*decodificar_data_uri(data_uri))
+
+    def tomar_pendientes(self):
+        pendientes, self.pendientes = self.pendientes, {}
+        return pendientes
@@ -0,0 +1,63 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# =========================================================
+# CACHÉ LRU POR HASH DE CONTENIDO
+# =========================================================
+# Streamlit vuelve a ejecutar todo el script en cada interacción; con esta
+# caché un cambio en el título no repite el parseo ni la codificación de la
+# imagen mientras los archivos subidos sean los mismos bytes.
+
+def hash_contenido(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+def tamaño_aproximado(valor):
+    if isinstance(valor, (bytes, bytearray, str)):
+        return len(valor)
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(deep=True).sum())
+    if isinstance(valor, (tuple, list)):
+        return sum(tamaño_aproximado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+class CacheLRU:
+    def __init__(self, max_entradas=16, max_bytes=512 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes = 0
+        self._entradas = OrderedDict()  # clave -> (valor, tamaño)
+        self._lock = threading.Lock()   # cada sesión de Streamlit corre en su hilo
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave, calcular):
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave][0]
+            self.fallos += 1
+
+        valor = calcular()
+        tamaño = tamaño_aproximado(valor)
+        if tamaño > self.max_bytes:
+            return valor
+
+        with self._lock:
+            if clave not in self._entradas:
+                self._entradas[clave] = (valor, tamaño)
+                self.bytes += tamaño
+            while len(self._entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                _, (_, liberado) = self._entradas.popitem(last=False)
+                self.bytes -= liberado
+        return valor
+
+    def resumen(self):
+        return f"Caché: {self.aciertos} aciertos · {self.fallos} fallos · {len(self)} entradas ({self.bytes / (1024 * 1024):.1f} MB)"
@@ -0,0 +1,44 @@
+import pandas as pd
+
+# =========================================================
+# CATÁLOGO DE COLORES Y REGLAS POR TIPO
+# =========================================================
+COLOR_CATALOG = {
+    "plata": "silver", "dorado": "gold", "rosa": "pink",
+    "ab_aguamarina": "aquamarine", "ab_amatista": "mediumpurple",
+    "ab_cristal": "lightcyan", "ab_peridot": "lightgreen",
+    "ab_rose": "lightpink", "ab_zafiro": "deepskyblue",
+    "aguamarina": "turquoise", "amatista": "purple",
+    "black_diamond": "black", "blue_zircon": "darkturquoise",
+    "cristal": "silver", "fuschia": "fuchsia", "fuschua": "fuchsia", "jet": "black",
+    "jonquil": "gold", "opal_blue_zircone": "skyblue",
+    "opal_green": "lightgreen", "peridot": "limegreen",
+    "rose": "pink", "siam": "crimson", "topaz": "orange",
+    "violet": "violet", "zafiro": "royalblue", "sin_color": "gray",
+    "gmb_morado": "#9400D3", "rsb_azul": "#0000FF", "rsb/gbm_subl": "#87CEFA",
+    "amarillo": "#FFFF00", "azul_rey": "#0000CD", "rojo": "#FF0000",
+    "turqueza": "#40E0D0", "turqueza_metalico": "#00CED1", "teal": "#008080",
+    "mauva": "#E0B0FF", "lilac": "#C8A2C8", "azul_purpura": "#8A2BE2",
+    "orquida": "#DA70D6", "purpura": "#800080", "salmon": "#FA8072",
+    "gris": "#808080", "azul_agua": "#00FFFF", "verde_jade": "#00A86B",
+    "morado": "#7A288A", "otro": "#D3D3D3",
+    "vitral": "#9370DB", "ab_tanzanita": "#483D8B",
+    "fuschia_metalico": "#FF1493"
+}
+
+# Tamaño que se asume cuando el XML no trae el atributo "tamaño"
+TAMAÑO_POR_TIPO = {"microperla": "pp01", "marquiz": "6x3mm", "cristal": "ss18"}
+
+def normalizar_color(c):
+    if pd.isna(c) or c == "": return "sin_color"
+    return str(c).lower().strip().replace(" ", "_")
+
+def ajustar_color_por_tipo(row):
+    tipo = str(row["tipo"]).lower()
+    color = row["color_norm"]
+    if tipo == "microperla" or tipo == "marquiz": return color if color in COLOR_CATALOG else "otro"
+    if tipo == "dicroico":
+        if color in ["gmb_morado", "rsb_azul", "rsb/gbm_subl"]: return color
+        return "gmb_morado"
+    if tipo == "balin" and color not in ["plata", "dorado"]: return "plata"
+    return color
@@ -0,0 +1,188 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .biblioteca import Biblioteca
+from .imagen import FORMATOS, OpcionesImagen, extension_imagen, formato_disponible
+from .instrumentacion import Medidor
+from .paralelo import MAX_PROCESOS, mapear_en_procesos
+from .plantilla import PLANTILLA
+from .reporte import (LOGO_PREDETERMINADO, codificar_puntos, escribir_paquete_teselas,
+                      imagen_a_archivo, imagen_a_data_uri, imagen_a_teselas, leer_puntos, logo_data_uri,
+                      nombre_limpio_modelo, valores_reporte)
+from .teselas import tile_sources_dzi, tile_sources_imagen
+
+# =========================================================
+# GENERACIÓN DE REPORTES EN LOTE (SIN STREAMLIT)
+# =========================================================
+# Uso: python -m mosaico.cli ENTRADA [ENTRADA ...] -o CARPETA_SALIDA [--procesos N] [--teselas] [--logo RUTA]
+#                           [--formato jpeg|webp|avif] [--calidad Q] [--lado-max PX] [--peso-max-kb KB] [--progresivo]
+#                           [--biblioteca]
+# Cada ENTRADA es una carpeta, donde se emparejan nombre.xml con nombre.jpg/.jpeg/.png,
+# o un manifiesto .jsonl con un objeto por línea: {"xml": ..., "imagen": ..., "nombre": ...}
+# (rutas relativas al manifiesto; "nombre" es opcional y por defecto es el nombre del XML).
+# Cada reporte se genera en un proceso del pool con las mismas etapas que la
+# pestaña 1. Por stdout sale una línea JSON por reporte terminado, con los
+# tiempos de cada etapa, y una línea final con el resumen del lote. Los tiempos
+# los toma Medidor con los mismos nombres de etapa que la app; con
+# MOSAICO_PERF_LOG las mediciones completas van además a ese archivo.
+# Con --biblioteca la salida es una biblioteca para hosting estático (ver
+# mosaico/biblioteca.py): los HTML referencian el visor, el logo y las imágenes
+# (o teselas) escritos una sola vez en CARPETA_SALIDA/assets/.
+EXTENSIONES_IMAGEN = (".jpg", ".jpeg", ".png")
+
+_logo = {"LOGO_URI": "", "MOSTRAR_LOGO": "none"}
+_salida = {"biblioteca": None}
+
+def _inicializar_trabajador(logo_uri, mostrar_logo, raiz_biblioteca=None):
+    _logo["LOGO_URI"] = logo_uri
+    _logo["MOSTRAR_LOGO"] = mostrar_logo
+    _salida["biblioteca"] = Biblioteca(raiz_biblioteca) if raiz_biblioteca else None
+
+def pares_de_carpeta(carpeta):
+    # XML sin imagen del mismo nombre quedan con imagen None y se informan como error
+    imagenes = {}
+    for ruta in sorted(carpeta.iterdir()):
+        if ruta.suffix.lower() in EXTENSIONES_IMAGEN:
+            imagenes.setdefault(ruta.stem, ruta)
+    for xml in sorted(carpeta.glob("*.xml")):
+        yield {"xml": xml, "imagen": imagenes.get(xml.stem), "nombre": xml.stem}
+
+def pares_de_manifiesto(manifiesto):
+    base = manifiesto.parent
+    with open(manifiesto, encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            entrada = json.loads(linea)
+            xml = base / entrada["xml"]
+            imagen = base / entrada["imagen"] if entrada.get("imagen") else None
+            yield {"xml": xml, "imagen": imagen, "nombre": entrada.get("nombre") or xml.stem}
+
+def trabajos_de(entradas, salida, teselas, opciones, como_biblioteca=False):
+    # Nombres de salida repetidos se desambiguan con un sufijo para no pisarse
+    usados = set()
+    for entrada in entradas:
+        entrada = Path(entrada)
+        for par in (pares_de_carpeta(entrada) if entrada.is_dir() else pares_de_manifiesto(entrada)):
+            base = nombre_limpio_modelo(par["nombre"])
+            nombre_archivo, n = base, 1
+            while nombre_archivo.lower() in usados:
+                n += 1
+                nombre_archivo = f"{base}_{n}"
+            usados.add(nombre_archivo.lower())
+            extension = ".zip" if teselas and not como_biblioteca else ".html"
+            yield (str(par["xml"]), str(par["imagen"]) if par["imagen"] else None, par["nombre"],
+                   str(salida / f"{nombre_archivo}{extension}"), teselas, opciones)
+
+def generar_reporte(xml, imagen, nombre_modelo, destino, teselas, opciones):
+    # Corre en un proceso del pool: lee, genera y escribe. Devuelve el registro de
+    # progreso y las mediciones de Medidor (se suman en el proceso principal)
+    medidor = Medidor("cli", archivo=Path(xml).name, activa=True)
+    registro = {"evento": "reporte", "xml": xml, "imagen": imagen, "nombre": nombre_modelo}
+    with medidor.etapa("reporte"):
+        try:
+            _generar(xml, imagen, nombre_modelo, destino, teselas, opciones, medidor, registro)
+        except Exception as e:
+            registro.update(estado="error", error=f"{type(e).__name__}: {e}")
+    *etapas, total = medidor.mediciones
+    tiempos = {}
+    for m in etapas:
+        tiempos[m["etapa"]] = round(tiempos.get(m["etapa"], 0) + m["pared_ms"], 2)
+    registro.update(tiempos_ms=tiempos, total_ms=total["pared_ms"])
+    return registro, medidor.mediciones
+
+def _generar(xml, imagen, nombre_modelo, destino, teselas, opciones, medidor, registro):
+    if imagen is None:
+        raise FileNotFoundError(f"no hay imagen para {xml}")
+    with medidor.etapa("lectura"):
+        xml_bytes, img_bytes = Path(xml).read_bytes(), Path(imagen).read_bytes()
+    df, tamaño_anotado = leer_puntos(xml_bytes, medidor)
+
+    nombre_limpio = Path(destino).stem
+    biblioteca = _salida["biblioteca"]
+    if teselas:
+        width, height, lista_teselas, escala = imagen_a_teselas(img_bytes, medidor, opciones, tamaño_anotado)
+        if biblioteca is None:
+            carpeta = f"{nombre_limpio}_files"
+        else:
+            with medidor.etapa("assets"):
+                carpeta = biblioteca.agregar_teselas(lista_teselas)
+        tile_sources = tile_sources_dzi(carpeta, width, height, formato=extension_imagen(opciones.formato))
+    elif biblioteca is None:
+        width, height, data_uri, escala = imagen_a_data_uri(img_bytes, medidor, opciones, tamaño_anotado)
+        tile_sources = tile_sources_imagen(data_uri)
+    else:
+        width, height, datos_imagen, escala = imagen_a_archivo(img_bytes, medidor, opciones, tamaño_anotado)
+        with medidor.etapa("assets"):
+            tile_sources = biblioteca.imagen(datos_imagen, extension_imagen(opciones.formato))
+    del img_bytes
+    df, puntos_json = codificar_puntos(df, escala, medidor)
+
+    logo = (_logo["LOGO_URI"], _logo["MOSTRAR_LOGO"])
+    if biblioteca is not None:
+        logo = biblioteca.logo(*logo)
+    valores = valores_reporte(nombre_modelo, df, puntos_json, width, tile_sources, *logo)
+
+    with medidor.etapa("zip_teselas" if teselas and biblioteca is None else "plantilla"), open(destino, "wb") as f:
+        if biblioteca is not None:
+            biblioteca.plantilla().escribir(f, valores)
+        elif teselas:
+            escribir_paquete_teselas(f, nombre_limpio, valores, width, height, lista_teselas, opciones)
+        else:
+            PLANTILLA.escribir(f, valores)
+
+    registro.update(estado="ok", archivo=destino, puntos=len(df), ancho=width, alto=height, bytes=Path(destino).stat().st_size)
+
+def _emitir(registro, salida):
+    salida.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    salida.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mosaico.cli", description="Genera reportes HTML de mosaicos a partir de pares XML de CVAT + imagen")
+    parser.add_argument("entradas", nargs="+", type=Path, help="carpetas con pares nombre.xml/nombre.jpg o manifiestos .jsonl")
+    parser.add_argument("-o", "--salida", type=Path, required=True, help="carpeta donde se escriben los reportes")
+    parser.add_argument("--procesos", type=int, default=MAX_PROCESOS)
+    parser.add_argument("--teselas", action="store_true", help="genera un ZIP con teselas (deep zoom) por reporte")
+    parser.add_argument("--logo", default=LOGO_PREDETERMINADO, help="imagen del encabezado (se omite si no existe)")
+    parser.add_argument("--formato", choices=list(FORMATOS), default="jpeg", help="formato de la imagen embebida o de las teselas")
+    parser.add_argument("--calidad", type=int, default=OpcionesImagen.calidad, help="calidad de codificación (1-100)")
+    parser.add_argument("--lado-max", type=int, help="reduce la imagen si su lado mayor supera estos px (los puntos se escalan con ella)")
+    parser.add_argument("--peso-max-kb", type=int, help="mayor calidad (hasta --calidad) que entra en este peso; no aplica a teselas")
+    parser.add_argument("--progresivo", action="store_true", help="JPEG progresivo")
+    parser.add_argument("--biblioteca", action="store_true",
+                        help="visor, logo e imágenes (o teselas) una sola vez en SALIDA/assets/, nombrados por su hash; los HTML los referencian")
+    args = parser.parse_args(argv)
+
+    for entrada in args.entradas:
+        if not entrada.exists():
+            parser.error(f"no existe {entrada}")
+    if not formato_disponible(args.formato):
+        parser.error(f"esta instalación de Pillow no puede escribir {args.formato}")
+    opciones = OpcionesImagen(formato=args.formato, calidad=args.calidad, lado_max=args.lado_max,
+                              peso_max_kb=args.peso_max_kb, progresivo=args.progresivo)
+    args.salida.mkdir(parents=True, exist_ok=True)
+    trabajos = list(trabajos_de(args.entradas, args.salida, args.teselas, opciones, args.biblioteca))
+    if not trabajos:
+        parser.error("no se encontraron pares XML/imagen")
+
+    procesos = max(1, min(args.procesos, len(trabajos)))
+    _emitir({"evento": "inicio", "total": len(trabajos), "procesos": procesos}, sys.stdout)
+    medidor = Medidor("cli", activa=True)
+    errores = 0
+    with medidor.etapa("lote_cli", en_procesos=True):
+        resultados = mapear_en_procesos(generar_reporte, trabajos, procesos,
+                                        initializer=_inicializar_trabajador,
+                                        initargs=(*logo_data_uri(args.logo), str(args.salida) if args.biblioteca else None))
+        for i, (registro, mediciones) in enumerate(resultados, start=1):
+            medidor.agregar(mediciones)
+            errores += registro["estado"] != "ok"
+            _emitir({**registro, "completados": i, "total": len(trabajos)}, sys.stdout)
+    medidor.volcar()
+    _emitir({"evento": "fin", "total": len(trabajos), "ok": len(trabajos) - errores, "errores": errores,
+             "segundos": round(medidor.mediciones[-1]["pared_ms"] / 1000, 2)}, sys.stdout)
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
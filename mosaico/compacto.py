@@ -0,0 +1,80 @@
+import base64
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from .parser_xml import COLUMNAS_GRUPO
+
+# =========================================================
+# FORMATO COMPACTO (COLUMNAR) DE LOS PUNTOS EMBEBIDOS
+# =========================================================
+# En vez de un arreglo JSON con un objeto por punto, el reporte lleva:
+#   {"formato": "columnar-1", "n": N,
+#    "x": base64 Float32 little-endian, "y": ídem,
+#    "tipos": [...], "colores": [...], "tamaños": [...], "colores_plot": [...],
+#    "grupos": [[tipo, color, tamaño, color_plot], ...]   (índices en las tablas)
+#    "grupo": base64 Uint16/Uint32 little-endian (grupo de cada punto), "bytes_grupo": 2 | 4}
+# decodificarPuntos() del template arma de nuevo los objetos del visor. Los
+# lectores de las pestañas 2 y 3 aceptan este formato y el arreglo anterior.
+FORMATO = "columnar-1"
+TABLAS = ("tipos", "colores", "tamaños", "colores_plot")  # en el orden de COLUMNAS_GRUPO
+
+def _base64(arreglo, dtype):
+    return base64.b64encode(np.ascontiguousarray(arreglo, dtype=dtype).tobytes()).decode("ascii")
+
+def _valor_json(valor):
+    # NaN/None (columna ausente en reportes viejos) -> null
+    return None if valor is None or (isinstance(valor, float) and math.isnan(valor)) else valor
+
+def codificar_puntos(df):
+    n = len(df)
+    datos = {"formato": FORMATO, "n": n, "x": _base64(df["x"], "<f4"), "y": _base64(df["y"], "<f4")}
+
+    codigos = []
+    for tabla, columna in zip(TABLAS, COLUMNAS_GRUPO):
+        valores = df[columna] if columna in df.columns else pd.Series([None] * n, dtype=object)
+        cod, unicos = pd.factorize(valores.astype(object), use_na_sentinel=False)
+        datos[tabla] = [_valor_json(v) for v in unicos]
+        codigos.append(cod.astype(np.int64))
+
+    # Combinación de los cuatro códigos -> grupo, en orden de primera aparición
+    combinado = np.zeros(n, dtype=np.int64)
+    for cod, tabla in zip(codigos, TABLAS):
+        combinado = combinado * max(len(datos[tabla]), 1) + cod
+    grupo, combinaciones = pd.factorize(combinado)
+    primeros = np.unique(grupo, return_index=True)[1]
+    datos["grupos"] = [[int(cod[i]) for cod in codigos] for i in primeros]
+
+    bytes_grupo = 2 if len(combinaciones) <= 0x10000 else 4
+    datos["grupo"] = _base64(grupo, "<u2" if bytes_grupo == 2 else "<u4")
+    datos["bytes_grupo"] = bytes_grupo
+    return datos
+
+def puntos_compactos_json(df):
+    return json.dumps(codificar_puntos(df), separators=(",", ":"))
+
+def _grupo_de(datos):
+    dtype = "<u2" if datos.get("bytes_grupo", 2) == 2 else "<u4"
+    return np.frombuffer(base64.b64decode(datos["grupo"]), dtype=dtype)
+
+def leer_puntos(crudo):
+    # crudo: texto embebido en el reporte, en cualquiera de los dos formatos
+    datos = json.loads(crudo)
+    if isinstance(datos, list):
+        return pd.DataFrame(datos) if datos else pd.DataFrame(columns=["x", "y", *COLUMNAS_GRUPO])
+
+    columnas = {eje: np.frombuffer(base64.b64decode(datos[eje]), dtype="<f4").astype(np.float64) for eje in ("x", "y")}
+    grupo = _grupo_de(datos)
+    for k, (tabla, columna) in enumerate(zip(TABLAS, COLUMNAS_GRUPO)):
+        por_grupo = np.array([datos[tabla][g[k]] for g in datos["grupos"]] or [None], dtype=object)
+        columnas[columna] = por_grupo[grupo]
+    return pd.DataFrame(columnas)
+
+def contar_tipo_color(datos):
+    # datos: objeto compacto ya parseado; cantidad de puntos por (tipo, color_norm)
+    conteo = np.bincount(_grupo_de(datos), minlength=len(datos["grupos"]))
+    for g, n in zip(datos["grupos"], conteo.tolist()):
+        if n:
+            yield datos["tipos"][g[0]], datos["colores"][g[1]], n
@@ -0,0 +1,101 @@
+import re
+from dataclasses import dataclass
+
+# =========================================================
+# EXTRACCIÓN DE DATOS EMBEBIDOS EN REPORTES HTML (PESTAÑA 2)
+# =========================================================
+# Se trabaja sobre los bytes crudos con bytes.find: no se decodifica el
+# archivo completo y la imagen base64 se devuelve como memoryview, sin copia.
+MARCA_PUNTOS = b"const puntos = ["
+MARCA_PUNTOS_COMPACTOS = b"const puntos = decodificarPuntos("
+MARCA_DATOS_PUNTOS = b"const DATOS_PUNTOS = "
+MARCA_IMGW = b"const imgW = "
+MARCA_URL = b"url:"
+PREFIJO_DATA_URI = b"data:image/"
+_TITULO = re.compile(rb"<title>(.*?)</title>", re.IGNORECASE)
+_DIGITOS = frozenset(b"0123456789.")
+_BLANCOS = frozenset(b" \t\n\r\f\v")
+
+@dataclass
+class DatosReporte:
+    titulo: str = None
+    puntos: bytes = None       # arreglo JSON o objeto columnar, tal cual viene en el HTML
+    img_w: str = None
+    data_uri: memoryview = None
+
+def buscar_titulo(contenido):
+    match_title = _TITULO.search(contenido)
+    return match_title.group(1).decode("utf-8", errors="replace") if match_title else None
+
+def buscar_puntos(contenido):
+    # Equivale a re.search(r'const puntos = (\[.*?\]);', content, re.DOTALL)
+    inicio = contenido.find(MARCA_PUNTOS)
+    if inicio < 0:
+        return None
+    inicio += len(MARCA_PUNTOS) - 1
+    fin = contenido.find(b"];", inicio)
+    return None if fin < 0 else (inicio, fin + 1)
+
+def buscar_puntos_compactos(contenido):
+    # El objeto columnar ocupa el resto de la línea hasta ";" (o ");" en los
+    # reportes que lo pasaban directo a decodificarPuntos): los strings JSON no
+    # pueden llevar saltos de línea sin escapar. La marca actual va primero porque
+    # el visor embebido también contiene "decodificarPuntos(DATOS_PUNTOS);".
+    for marca, cierre in ((MARCA_DATOS_PUNTOS, b";"), (MARCA_PUNTOS_COMPACTOS, b");")):
+        inicio = contenido.find(marca)
+        if inicio < 0:
+            continue
+        inicio += len(marca)
+        fin_linea = contenido.find(b"\n", inicio)
+        fin = contenido.rfind(cierre, inicio, len(contenido) if fin_linea < 0 else fin_linea)
+        return None if fin < 0 else (inicio, fin)
+    return None
+
+def _buscar_img_w(contenido):
+    # Equivale a re.search(r'const imgW = ([\d\.]+);', content)
+    pos = contenido.find(MARCA_IMGW)
+    while pos >= 0:
+        inicio = fin = pos + len(MARCA_IMGW)
+        while fin < len(contenido) and contenido[fin] in _DIGITOS:
+            fin += 1
+        if fin > inicio and contenido[fin:fin + 1] == b";":
+            return inicio, fin
+        pos = contenido.find(MARCA_IMGW, pos + 1)
+    return None
+
+def _buscar_data_uri(contenido):
+    # Equivale a re.search(r"url:\s*['\"](data:image/[^'\"]+)['\"]", content)
+    pos = contenido.find(MARCA_URL)
+    while pos >= 0:
+        inicio = pos + len(MARCA_URL)
+        while inicio < len(contenido) and contenido[inicio] in _BLANCOS:
+            inicio += 1
+        if contenido[inicio:inicio + 1] in (b"'", b'"') and contenido.startswith(PREFIJO_DATA_URI, inicio + 1):
+            inicio += 1
+            fin_simple = contenido.find(b"'", inicio)
+            fin_doble = contenido.find(b'"', inicio)
+            fin = min(f for f in (fin_simple, fin_doble, len(contenido)) if f >= 0)
+            if fin < len(contenido):
+                return inicio, fin
+        pos = contenido.find(MARCA_URL, pos + 1)
+    return None
+
+def extraer_datos_reporte(contenido):
+    datos = DatosReporte()
+    vista = memoryview(contenido)
+
+    datos.titulo = buscar_titulo(contenido)
+
+    tramo = buscar_puntos(contenido) or buscar_puntos_compactos(contenido)
+    if tramo:
+        datos.puntos = contenido[tramo[0]:tramo[1]]
+
+    tramo = _buscar_img_w(contenido)
+    if tramo:
+        datos.img_w = contenido[tramo[0]:tramo[1]].decode("ascii")
+
+    tramo = _buscar_data_uri(contenido)
+    if tramo:
+        datos.data_uri = vista[tramo[0]:tramo[1]]
+
+    return datos
@@ -0,0 +1,180 @@
+import math
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+from .instrumentacion import SIN_MEDIDOR
+
+# =========================================================
+# PREPARACIÓN DE LA IMAGEN BASE (PESTAÑA 1 Y CLI)
+# =========================================================
+# Antes de embeberla (o cortarla en teselas) la imagen se orienta según EXIF,
+# pasa a un modo que el formato de salida acepte, se reduce a un lado máximo y
+# se codifica con la calidad pedida o con la mayor que entra en el presupuesto
+# de peso. El visor normaliza las coordenadas con el ancho del reporte (imgW),
+# así que si la imagen cambia de tamaño los puntos se escalan con la misma
+# proporción: `escala` lleva las coordenadas anotadas a píxeles de la salida.
+FORMATOS = {  # formato -> (nombre en Pillow, tipo MIME, extensión de tesela)
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+    "avif": ("AVIF", "image/avif", "avif"),
+}
+FORMATOS_CON_ALFA = ("webp", "avif")
+FONDO = (255, 255, 255)   # donde la transparencia no se puede conservar (JPEG)
+CALIDAD_MIN = 40
+RONDAS_REDUCCION = 4      # reducciones extra si ni CALIDAD_MIN entra en el presupuesto
+SIN_ESCALA = (1.0, 1.0)
+ORIENTACION_EXIF = 0x0112
+
+@dataclass(frozen=True)
+class OpcionesImagen:
+    formato: str = "jpeg"
+    calidad: int = 75             # la de Pillow por defecto
+    lado_max: int = None          # px del lado mayor; None conserva la resolución
+    peso_max_kb: int = None       # presupuesto del archivo codificado (la data URI ocupa 4/3)
+    progresivo: bool = False      # JPEG progresivo, con tablas de Huffman optimizadas
+
+OPCIONES_ORIGINAL = OpcionesImagen()
+
+@dataclass
+class ImagenPreparada:
+    img: Image.Image
+    escala: tuple = SIN_ESCALA    # (x, y): coordenadas anotadas -> píxeles de img
+    datos: bytes = None
+    calidad: int = None
+
+@lru_cache(maxsize=None)
+def formato_disponible(formato):
+    # WebP y AVIF dependen de cómo se compiló Pillow: se prueba con 1x1 px
+    try:
+        Image.new("RGB", (1, 1)).save(BytesIO(), format=FORMATOS[formato][0])
+        return True
+    except (KeyError, OSError, ValueError):
+        return False
+
+def formatos_disponibles():
+    return [f for f in FORMATOS if formato_disponible(f)]
+
+def mime_imagen(formato):
+    return FORMATOS[formato][1]
+
+def extension_imagen(formato):
+    return FORMATOS[formato][2]
+
+def _misma_proporcion(a, b, tolerancia=0.01):
+    return abs(a[0] * b[1] - a[1] * b[0]) <= tolerancia * a[0] * b[1]
+
+def _orientar(img, tamaño_anotado):
+    # CVAT anota sobre la imagen ya rotada según EXIF; si el XML declara un tamaño
+    # que sólo coincide con los píxeles sin rotar, las anotaciones van sobre esos.
+    # Devuelve (imagen, si se giró 90°)
+    orientacion = img.getexif().get(ORIENTACION_EXIF, 1)
+    if orientacion not in range(2, 9):
+        return img, False
+    girada = orientacion in (5, 6, 7, 8)
+    if girada and tamaño_anotado and _misma_proporcion(img.size, tamaño_anotado) \
+            and not _misma_proporcion(img.size[::-1], tamaño_anotado):
+        return img, False
+    return ImageOps.exif_transpose(img), girada
+
+def _tiene_alfa(img):
+    return img.mode in ("RGBA", "LA", "PA", "RGBa", "La") or "transparency" in img.info
+
+def convertir_modo(img, formato="jpeg"):
+    # JPEG admite L y RGB; WebP y AVIF, RGB y RGBA. La transparencia se conserva
+    # donde se puede y si no se compone sobre FONDO (RGBA -> JPEG falla en Pillow
+    # y un convert("RGB") directo deja negro lo transparente)
+    if _tiene_alfa(img):
+        rgba = img.convert("RGBA")
+        if formato in FORMATOS_CON_ALFA:
+            return rgba
+        fondo = Image.new("RGB", img.size, FONDO)
+        fondo.paste(rgba, mask=rgba.getchannel("A"))
+        if "icc_profile" in img.info:
+            fondo.info["icc_profile"] = img.info["icc_profile"]
+        return fondo
+    if img.mode == "RGB" or (img.mode == "L" and formato == "jpeg"):
+        return img
+    if img.mode.startswith("I"):
+        # 16 bits (PNG de escala de grises): convert("L") satura todo lo que pasa de 255
+        img = img.point(lambda v: v / 256).convert("L")
+        return img if formato == "jpeg" else img.convert("RGB")
+    convertida = img.convert("L" if img.mode == "1" and formato == "jpeg" else "RGB")
+    if img.mode == "CMYK":
+        convertida.info.pop("icc_profile", None)  # el perfil es de CMYK, ya no aplica
+    return convertida
+
+def preparar_imagen(img_bytes, opciones=OPCIONES_ORIGINAL, tamaño_anotado=None, medidor=SIN_MEDIDOR):
+    # tamaño_anotado: (ancho, alto) que declara el XML de CVAT; si falta, las
+    # coordenadas se toman en píxeles de la imagen ya orientada
+    with medidor.etapa("preparacion_imagen"):
+        img = Image.open(BytesIO(img_bytes))
+        ancho, alto = img.size
+        factor = min(1.0, opciones.lado_max / max(ancho, alto)) if opciones.lado_max else 1.0
+        if factor < 1.0:
+            # JPEG se decodifica ya reducido (1/2, 1/4, 1/8), nunca por debajo del destino
+            img.draft(img.mode, (math.ceil(ancho * factor), math.ceil(alto * factor)))
+        img, girada = _orientar(img, tamaño_anotado)
+        if girada:
+            ancho, alto = alto, ancho
+        img = convertir_modo(img, opciones.formato)
+
+        destino = (max(1, round(ancho * factor)), max(1, round(alto * factor)))
+        if img.size != destino:
+            img = img.resize(destino, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        origen = tamaño_anotado or (ancho, alto)
+        escala = SIN_ESCALA if destino == tuple(origen) else (destino[0] / origen[0], destino[1] / origen[1])
+        return ImagenPreparada(img, escala)
+
+def guardar_imagen(img, opciones=OPCIONES_ORIGINAL, calidad=None):
+    parametros = {"quality": opciones.calidad if calidad is None else calidad}
+    if img.info.get("icc_profile"):
+        parametros["icc_profile"] = img.info["icc_profile"]
+    if opciones.formato == "jpeg" and opciones.progresivo:
+        parametros.update(progressive=True, optimize=True)
+    buffered = BytesIO()
+    img.save(buffered, format=FORMATOS[opciones.formato][0], **parametros)
+    return buffered.getvalue()
+
+def codificar_imagen(preparada, opciones=OPCIONES_ORIGINAL, medidor=SIN_MEDIDOR):
+    # Con presupuesto: búsqueda binaria de la mayor calidad entre CALIDAD_MIN y
+    # opciones.calidad que entra; si ni la mínima entra se reduce la imagen en
+    # proporción al exceso (actualizando la escala) y se vuelve a buscar
+    with medidor.etapa("codificacion_imagen"):
+        img, escala = preparada.img, preparada.escala
+        datos = guardar_imagen(img, opciones)
+        if not opciones.peso_max_kb:
+            return replace(preparada, datos=datos, calidad=opciones.calidad)
+        presupuesto = opciones.peso_max_kb * 1024
+        for ronda in range(RONDAS_REDUCCION + 1):
+            if len(datos) <= presupuesto:
+                return ImagenPreparada(img, escala, datos, opciones.calidad)
+            mejor, lo, hi = None, min(CALIDAD_MIN, opciones.calidad), opciones.calidad - 1
+            while lo <= hi:
+                calidad = (lo + hi) // 2
+                intento = guardar_imagen(img, opciones, calidad)
+                if len(intento) <= presupuesto:
+                    mejor, lo = (intento, calidad), calidad + 1
+                else:
+                    datos, hi = intento, calidad - 1
+            if mejor:
+                return ImagenPreparada(img, escala, *mejor)
+            if ronda == RONDAS_REDUCCION:
+                break
+            factor = max(0.5, 0.95 * math.sqrt(presupuesto / len(datos)))
+            destino = (max(1, round(img.width * factor)), max(1, round(img.height * factor)))
+            escala = (escala[0] * destino[0] / img.width, escala[1] * destino[1] / img.height)
+            img = img.resize(destino, Image.Resampling.LANCZOS)
+            datos = guardar_imagen(img, opciones)
+        # No entra ni reducida: se entrega lo más liviano que se logró
+        return ImagenPreparada(img, escala, datos, min(CALIDAD_MIN, opciones.calidad))
+
+def escalar_puntos(df, escala):
+    if escala == SIN_ESCALA:
+        return df
+    df = df.copy()
+    df["x"] = df["x"] * escala[0]
+    df["y"] = df["y"] * escala[1]
+    return df
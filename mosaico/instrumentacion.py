@@ -0,0 +1,121 @@
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# =========================================================
+# INSTRUMENTACIÓN POR ETAPA: TIEMPO, CPU Y MEMORIA
+# =========================================================
+# Apagada por defecto; se configura con variables de entorno, que también
+# heredan los procesos del pool de la pestaña 2 y del CLI:
+#   MOSAICO_PERF=1           mide cada etapa y muestra el panel "Rendimiento"
+#   MOSAICO_PERF_LOG=ruta    además agrega una línea JSON por etapa a ese archivo
+#   MOSAICO_PERF_MEMORIA=1   suma el pico de tracemalloc por etapa (encarece cada asignación)
+# Apagada, etapa() devuelve siempre el mismo nullcontext y no se mide nada.
+# cpu_ms es el CPU del hilo que abre la etapa (time.thread_time): el de los
+# procesos del pool no se ve desde el principal, así que las etapas que sólo
+# esperan resultados (en_procesos=True, p. ej. lote_reparacion) no lo informan;
+# cada archivo trae su propio cpu_ms medido en su proceso.
+RUTA_LOG = os.environ.get("MOSAICO_PERF_LOG") or None
+ACTIVA = os.environ.get("MOSAICO_PERF") == "1" or RUTA_LOG is not None
+MEMORIA = ACTIVA and os.environ.get("MOSAICO_PERF_MEMORIA") == "1"
+
+_NULO = nullcontext()
+_escritura_log = threading.Lock()
+# Pico de tracemalloc de cada etapa abierta, por hilo (cada sesión de Streamlit
+# corre en el suyo): reset_peak() es global al proceso, así que una etapa anidada
+# o la de otra sesión borraría el pico de las demás. Antes de cada reset el pico
+# vigente se acumula en todas las abiertas, de cualquier hilo; con sesiones a la
+# vez el pico de una etapa incluye lo que asignaron las otras.
+_picos = threading.Lock()
+_picos_abiertos = {}    # id del hilo -> picos de sus etapas abiertas, de afuera hacia adentro
+
+def _rss_actual_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _rss_pico_mb():
+    # ru_maxrss: pico del proceso desde que arrancó (KiB en Linux, bytes en macOS)
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / 2**20 if sys.platform == "darwin" else rss / 1024, 1)
+
+class Medidor:
+    def __init__(self, pestaña, archivo=None, activa=ACTIVA, memoria=MEMORIA):
+        self.pestaña = pestaña
+        self.archivo = archivo
+        self.activa = activa
+        self.memoria = memoria
+        self.lote = uuid.uuid4().hex[:8]
+        self.mediciones = []
+
+    def etapa(self, nombre, archivo=None, en_procesos=False):
+        return self._medir(nombre, archivo or self.archivo, en_procesos) if self.activa else _NULO
+
+    @contextmanager
+    def _medir(self, nombre, archivo, en_procesos):
+        if self.memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            with _picos:
+                _acumular_pico()
+                tracemalloc.reset_peak()
+                _picos_abiertos.setdefault(threading.get_ident(), []).append(0)
+        rss_inicio = _rss_actual_mb()
+        t0, cpu0 = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            pared, cpu = time.perf_counter() - t0, time.thread_time() - cpu0
+            rss = _rss_actual_mb()
+            pico = None
+            if self.memoria:
+                with _picos:
+                    propios = _picos_abiertos[threading.get_ident()]
+                    pico = max(propios.pop(), tracemalloc.get_traced_memory()[1])
+                    if not propios:
+                        del _picos_abiertos[threading.get_ident()]
+                    _acumular_pico(pico)
+            self.mediciones.append({
+                "ts": datetime.now().isoformat(timespec="milliseconds"), "lote": self.lote, "pid": os.getpid(),
+                "pestaña": self.pestaña, "archivo": archivo, "etapa": nombre,
+                "pared_ms": round(pared * 1000, 2), "cpu_ms": None if en_procesos else round(cpu * 1000, 2),
+                "rss_mb": rss, "rss_delta_mb": round(rss - rss_inicio, 1) if rss is not None and rss_inicio is not None else None,
+                "rss_pico_mb": _rss_pico_mb(),
+                "tracemalloc_pico_mb": round(pico / 2**20, 2) if pico is not None else None,
+            })
+
+    def agregar(self, mediciones):
+        # Mediciones hechas en otro proceso (se devuelven junto al resultado)
+        if self.activa and mediciones:
+            self.mediciones.extend({**m, "lote": self.lote} for m in mediciones)
+
+    def volcar(self, ruta=RUTA_LOG):
+        # Solo el proceso principal escribe el log: las líneas no se intercalan
+        if not ruta or not self.mediciones:
+            return
+        with _escritura_log, open(ruta, "a", encoding="utf-8") as f:
+            for m in self.mediciones:
+                f.write(json.dumps(m, ensure_ascii=False) + "\n")
+
+SIN_MEDIDOR = Medidor("", activa=False)
+
+def _acumular_pico(pico=None):
+    pico = tracemalloc.get_traced_memory()[1] if pico is None else pico
+    for propios in _picos_abiertos.values():
+        for i, previo in enumerate(propios):
+            propios[i] = max(previo, pico)
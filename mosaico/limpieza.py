@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from .catalogo import COLOR_CATALOG, ajustar_color_por_tipo
+from .instrumentacion import SIN_MEDIDOR
+
+# =========================================================
+# LIMPIEZA COLUMNAR: DUPLICADOS Y COLORES POR TIPO
+# =========================================================
+def redondear_2(valores):
+    # np.round multiplica por 100 y puede diferir de round(x, 2) de Python justo
+    # en los medios; esos pocos casos se resuelven con el round de Python.
+    valores = np.asarray(valores, dtype=np.float64)
+    redondeados = np.round(valores, 2)
+    escala = valores * 100
+    dudosos = np.flatnonzero(np.abs(np.abs(escala - np.trunc(escala)) - 0.5) < 1e-6)
+    for i in dudosos:
+        redondeados[i] = round(float(valores[i]), 2)
+    return redondeados
+
+def mascara_coordenadas_unicas(x, y):
+    # True en la primera aparición de cada (round(x, 2), round(y, 2))
+    coords = pd.DataFrame({"x": redondear_2(x), "y": redondear_2(y)})
+    return ~coords.duplicated(keep="first").to_numpy()
+
+def _por_combinacion(func, df, columnas):
+    # Evalúa func una sola vez por combinación distinta de columnas
+    grupo = df.groupby(columnas, sort=False, dropna=False).ngroup().to_numpy()
+    unicos = df[columnas].drop_duplicates().to_dict("records")
+    return np.array([func(fila) for fila in unicos], dtype=object)[grupo]
+
+def limpiar_puntos(df, medidor=SIN_MEDIDOR):
+    with medidor.etapa("duplicados"):
+        df = df[mascara_coordenadas_unicas(df["x"], df["y"])].reset_index(drop=True)
+    with medidor.etapa("color_por_tipo"):
+        df["color_norm"] = _por_combinacion(ajustar_color_por_tipo, df, ["tipo", "color_norm"])
+        df["color_plot"] = _por_combinacion(lambda f: COLOR_CATALOG.get(f["color_norm"], "gray"), df, ["color_norm"])
+    return df
@@ -0,0 +1,42 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+# =========================================================
+# EJECUCIÓN EN PARALELO POR ARCHIVO
+# =========================================================
+MAX_PROCESOS = os.cpu_count() or 1
+EN_VUELO_POR_PROCESO = 2  # archivos enviados a la vez por proceso; acota la RAM
+BYTES_POR_PROCESO = int(os.environ.get("MOSAICO_MB_POR_PROCESO", "32")) * 1024 * 1024
+
+def procesos_para(cantidad, tamaño_total, max_procesos=MAX_PROCESOS):
+    # Levantar el pool (spawn e importar pandas en cada proceso) cuesta del orden
+    # de un segundo y Streamlit lo repite en cada interacción: sólo se reparte si
+    # a cada proceso le tocan al menos BYTES_POR_PROCESO. Con un solo CPU o un
+    # lote chico devuelve 1, y mapear_en_procesos trabaja en línea.
+    return max(1, min(max_procesos, MAX_PROCESOS, cantidad, tamaño_total // BYTES_POR_PROCESO))
+
+def mapear_en_procesos(func, tareas, max_procesos=MAX_PROCESOS, initializer=None, initargs=()):
+    # tareas: iterable de tuplas de argumentos, consumido a medida que hay lugar
+    # (un generador permite leer cada archivo recién al enviarlo). Entrega los
+    # resultados en orden de finalización.
+    tareas = iter(tareas)
+    if max_procesos <= 1:
+        if initializer:
+            initializer(*initargs)
+        for args in tareas:
+            yield func(*args)
+        return
+
+    # "spawn": hacer fork del servidor multihilo de Streamlit puede colgarse
+    contexto = multiprocessing.get_context("spawn")
+    max_en_vuelo = max_procesos * EN_VUELO_POR_PROCESO
+    with ProcessPoolExecutor(max_workers=max_procesos, mp_context=contexto,
+                             initializer=initializer, initargs=initargs) as pool:
+        en_vuelo = {pool.submit(func, *args) for args in islice(tareas, max_en_vuelo)}
+        while en_vuelo:
+            listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                yield futuro.result()
+            en_vuelo |= {pool.submit(func, *args) for args in islice(tareas, max_en_vuelo - len(en_vuelo))}
@@ -0,0 +1,78 @@
+import xml.etree.ElementTree as ET
+from array import array
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .catalogo import COLOR_CATALOG, TAMAÑO_POR_TIPO, normalizar_color
+
+# =========================================================
+# LECTURA EN STREAMING DEL XML DE CVAT
+# =========================================================
+# Las coordenadas se guardan en arreglos columnares (8 bytes por eje) y los
+# textos repetidos (tipo, color, tamaño) una sola vez por combinación, de modo
+# que ni el árbol XML ni un dict por punto llegan a existir en memoria.
+COLUMNAS_GRUPO = ("tipo", "color_norm", "tamaño", "color_plot")
+
+@dataclass
+class PuntosCVAT:
+    x: array = field(default_factory=lambda: array("d"))
+    y: array = field(default_factory=lambda: array("d"))
+    grupo: array = field(default_factory=lambda: array("I"))
+    grupos: list = field(default_factory=list)  # (tipo, color_norm, tamaño, color_plot)
+    tamaño_imagen: tuple = None  # (width, height) del primer <image>, si los declara
+
+    def __len__(self):
+        return len(self.x)
+
+    def a_dataframe(self):
+        idx = np.frombuffer(self.grupo, dtype=np.dtype(self.grupo.typecode))
+        columnas = {
+            "x": np.frombuffer(self.x, dtype=np.float64).copy(),
+            "y": np.frombuffer(self.y, dtype=np.float64).copy(),
+        }
+        tabla = list(zip(*self.grupos)) if self.grupos else [()] * len(COLUMNAS_GRUPO)
+        for nombre, valores in zip(COLUMNAS_GRUPO, tabla):
+            columnas[nombre] = np.array(valores, dtype=object)[idx]
+        return pd.DataFrame(columnas)
+
+def parsear_cvat_xml(fuente):
+    puntos = PuntosCVAT()
+    indice_grupo = {}
+    pila = []
+
+    for evento, elem in ET.iterparse(fuente, events=("start", "end")):
+        if evento == "start":
+            pila.append(elem)
+            if len(pila) == 2 and elem.tag == "image" and puntos.tamaño_imagen is None:
+                try:
+                    tamaño = (int(float(elem.attrib["width"])), int(float(elem.attrib["height"])))
+                    puntos.tamaño_imagen = tamaño if min(tamaño) > 0 else None
+                except (KeyError, ValueError):
+                    pass
+            continue
+        pila.pop()
+        nivel = len(pila)
+
+        # Equivale a root.findall("image") -> image.findall("points")
+        if nivel == 2 and elem.tag == "points" and pila[1].tag == "image":
+            tipo = elem.attrib.get("label", "sin_tipo")
+            attrs = {a.attrib["name"]: a.text for a in elem.findall("attribute")}
+            color_norm = normalizar_color(attrs.get("color", ""))
+            clave = (tipo, color_norm, attrs.get("tamaño", TAMAÑO_POR_TIPO.get(tipo, "")), COLOR_CATALOG.get(color_norm, "gray"))
+            g = indice_grupo.get(clave)
+            if g is None:
+                g = indice_grupo[clave] = len(puntos.grupos)
+                puntos.grupos.append(clave)
+            for c in elem.attrib["points"].split(";"):
+                x, y = map(float, c.split(","))
+                puntos.x.append(x)
+                puntos.y.append(y)
+                puntos.grupo.append(g)
+
+        # Soltamos cada hijo de <annotations> / <image> en cuanto se cierra
+        if nivel in (1, 2):
+            pila[-1].remove(elem)
+
+    return puntos
@@ -0,0 +1,1658 @@
+import re
+
+from .catalogo import COLOR_CATALOG
+
+# =========================================================
+# PLANTILLA MAESTRA HTML (CANVAS ENGINE + CLICK NATIVO)
+# =========================================================
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>__TITULO_FINAL__</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=0, shrink-to-fit=no">
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
+    <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700&display=swap" rel="stylesheet">
+    <script src="https://cdnjs.cloudflare.com/ajax/libs/openseadragon/4.1.0/openseadragon.min.js"></script>
+    <style>
+        * { box-sizing: border-box; }
+        html, body { 
+            background-color: #f4f7f6; padding: 0; margin: 0; 
+            font-family: 'Segoe UI', sans-serif; 
+            width: 100%; max-width: 100%; overflow-x: hidden; 
+            touch-action: manipulation; 
+        }
+        
+        .header { background: white; color: black; padding: 25px 15px; text-align: center; border-bottom: 4px solid #1abc9c; width: 100%; }
+        .header h2 { 
+            font-family: 'Montserrat', sans-serif; 
+            letter-spacing: 3px; 
+            text-transform: uppercase;
+            font-weight: 700;
+            margin: 0;
+            font-size: 1.8rem;
+            word-wrap: break-word;
+        }
+        
+        #workspace { 
+            background: #000; position: relative; 
+            width: 100%; max-width: 100%; height: 75vh; 
+            overflow: hidden; display: block; 
+        }
+        #workspace:fullscreen { height: 100vh !important; width: 100vw !important; }
+        
+        #viewer-container { 
+            position: absolute; top: 0; left: 0; 
+            width: 100%; height: 100%; touch-action: none; 
+        }
+        
+        #info-bar {
+            position: absolute; top: 0; left: 0; z-index: 8000;
+            background: #f8f9fa; color: #2c3e50; padding: 12px 10px; text-align: center;
+            font-weight: bold; border-bottom: 3px solid #1abc9c; font-size: 18px;
+            width: 100%; display: block;
+            box-shadow: 0 4px 6px rgba(0,0,0,0.15);
+            overflow-wrap: break-word; word-wrap: break-word;
+            transition: background-color 0.2s ease, color 0.2s ease;
+        }
+
+        .custom-nav { position: absolute; top: 65px; left: 15px; z-index: 9999; display: flex; flex-direction: column; gap: 8px; }
+        .nav-btn { width: 44px; height: 44px; border-radius: 8px; border: 2px solid white; color: white; font-size: 22px; font-weight: bold; display: flex; align-items: center; justify-content: center; cursor: pointer; transition: 0.2s;}
+        .nav-btn:hover { transform: scale(1.1); }
+        .btn-zoom-in { background: #1abc9c !important; }
+        .btn-zoom-out { background: #ffb7c5 !important; color: #333 !important; }
+        .btn-home { background: #3498db !important; }
+        .btn-diagrama { background: #f39c12 !important; font-size: 20px; }
+
+        .btn-fs { position: absolute; top: 65px; right: 15px; z-index: 9999; background: #fff; border: 2px solid #2c3e50; padding: 8px 16px; border-radius: 20px; font-weight: bold; cursor: pointer; }
+
+        #fs-sidebar {
+            position: absolute; top: 0; right: -320px; width: 300px; height: 100%;
+            background: rgba(44, 62, 80, 0.95); backdrop-filter: blur(10px);
+            z-index: 10000; transition: 0.3s ease; padding: 25px; color: white;
+            box-shadow: -5px 0 15px rgba(0,0,0,0.5); overflow-y: auto;
+        }
+        #fs-sidebar.active { right: 0; }
+        
+        #toggle-sidebar-btn {
+            position: absolute; top: 120px; right: 15px; z-index: 9999;
+            background: #1abc9c; color: white; border: 2px solid white;
+            padding: 10px; border-radius: 8px; font-weight: bold; display: none; cursor: pointer;
+            transition: right 0.3s ease;
+        }
+        #fs-sidebar.active ~ #toggle-sidebar-btn { right: 315px; } 
+        #workspace:fullscreen #toggle-sidebar-btn { display: block; }
+
+        .sidebar-section-title { font-size: 12px; font-weight: bold; color: #1abc9c; letter-spacing: 1px; margin-bottom: 15px; border-bottom: 1px solid #3e5871; padding-bottom: 5px; }
+        
+        .report-container { position: relative; z-index: 1; background: #f4f7f6; padding-top: 20px; width: 100%; max-width: 1200px; margin: 0 auto; }
+        .summary-card { background: white; border-radius: 12px; box-shadow: 0 4px 20px rgba(0,0,0,0.08); padding: 25px; margin: 0 15px 40px 15px; }
+        .category-row { background: #f1f4f8; border-left: 5px solid #3498db; padding: 10px 15px; margin-top: 15px; font-weight: bold; display: flex; justify-content: space-between; align-items: center; border-radius: 4px; }
+        .item-table { width: 100%; margin-bottom: 10px; table-layout: fixed; }
+        .item-table td { padding: 10px 15px; border-bottom: 1px solid #eee; word-wrap: break-word; overflow-wrap: break-word; }
+        
+        .total-banner { background: black; color: white; padding: 25px; border-radius: 8px; text-align: center; font-size: 1.6rem; font-weight: 700; margin-top: 25px; font-family: 'Montserrat', sans-serif; letter-spacing: 1px; }
+        
+        .filter-section { 
+            background: white; padding: 20px 25px; border-radius: 12px; margin: 20px auto; 
+            box-shadow: 0 4px 15px rgba(0,0,0,0.04); font-family: 'Montserrat', sans-serif;
+            width: calc(100% - 30px); max-width: 1200px;
+        }
+        .filter-group-title { 
+            font-size: 0.85rem; font-weight: 700; color: #7f8c8d; text-transform: uppercase; 
+            letter-spacing: 1.5px; margin-bottom: 12px; display: block; 
+            border-bottom: 2px solid #ecf0f1; padding-bottom: 6px; width: 100%;
+        }
+        .filter-container { display: flex; flex-wrap: wrap; gap: 8px; align-items: center; }
+        
+        .btn-custom-filter { 
+            background: #f8f9fa; color: #34495e; border: 1px solid #dcdde1; border-radius: 6px; 
+            padding: 8px 14px; font-size: 0.8rem; font-weight: 600; 
+            transition: all 0.2s ease; cursor: pointer; text-transform: uppercase;
+            touch-action: manipulation;
+        }
+        .btn-custom-filter:hover { background: #ecf0f1; border-color: #bdc3c7; transform: translateY(-1px); }
+        
+        .btn-custom-active-tipo { background: #2c3e50 !important; color: white !important; border-color: #2c3e50 !important; box-shadow: 0 4px 8px rgba(44,62,80,0.2); }
+        .btn-custom-active-color { background: #1abc9c !important; color: white !important; border-color: #1abc9c !important; box-shadow: 0 4px 8px rgba(26,188,156,0.2); }
+        .btn-custom-active-none { background: #e74c3c !important; color: white !important; border-color: #e74c3c !important; box-shadow: 0 4px 8px rgba(231,76,60,0.2); }
+        
+        @media (max-width: 768px) {
+            .header { padding: 15px 10px; }
+            .header h2 { font-size: 1.3rem; letter-spacing: 1px; }
+            
+            .filter-section { width: calc(100% - 20px); padding: 15px 12px; margin: 10px auto; }
+            .btn-custom-filter { padding: 6px 10px; font-size: 0.7rem; }
+            .filter-group-title { font-size: 0.75rem; margin-bottom: 8px; }
+            
+            #info-bar { font-size: 13px; padding: 10px; }
+            
+            .summary-card { padding: 15px; margin: 0 10px 30px 10px; }
+            .category-row { font-size: 0.9rem; padding: 8px 10px; }
+            .item-table td { padding: 8px 10px; font-size: 0.85rem; }
+            .total-banner { font-size: 1.2rem; padding: 15px; margin-top: 15px; }
+            
+            .custom-nav { top: 55px; left: 10px; transform: scale(0.85); transform-origin: top left; }
+            .btn-fs { top: 55px; right: 10px; padding: 6px 12px; font-size: 11px; }
+            #toggle-sidebar-btn { top: 100px; right: 10px; font-size: 11px; padding: 6px 10px; }
+            
+            #workspace { height: 65vh; }
+        }
+
+        .fs-close-btn { float: left; cursor: pointer; font-size: 24px; margin-bottom: 10px; }
+
+        #perf-hud {
+            position: absolute; left: 10px; bottom: 10px; z-index: 9999; max-width: 340px;
+            background: rgba(0,0,0,0.78); color: #2ecc71; font: 11px/1.35 monospace; padding: 8px 10px; border-radius: 6px;
+        }
+        #perf-hud table { margin-top: 4px; }
+        #perf-hud th, #perf-hud td { padding: 0 4px; text-align: right; }
+        #perf-hud td:first-child { text-align: left; color: #ecf0f1; }
+        #perf-hud button { margin-top: 6px; font-size: 11px; padding: 2px 8px; border-radius: 4px; border: none; }
+    </style>
+</head>
+<body>
+    <div style="background: white; text-align: center; padding-top: 20px; width: 100%; overflow: hidden;">
+        <img src="__LOGO_URI__" alt="Mosaico" style="max-height: 85px; max-width: 90%; object-fit: contain; display: __MOSTRAR_LOGO__;">
+    </div>
+    
+    <div class="header" style="border-top: none; padding-top: 10px;">
+        <h2>__TITULO_FINAL__</h2>
+    </div>
+    
+    <div id="main-filters" class="filter-section">
+        <div class="mb-4 filter-container" id="group-tipo-main">
+            <span class="filter-group-title">TIPO DE PIEZA</span>
+            <button class="btn-custom-filter btn-custom-active-tipo" data-val="all" onclick="updateFilters('tipo', 'all', this)">TODOS</button>
+            __BTN_TIPO_MAIN__
+            <button class="btn-custom-filter" data-val="none" onclick="updateFilters('tipo', 'none', this)">❌ NINGUNO</button>
+        </div>
+        <div class="filter-container" id="group-color-main">
+            <span class="filter-group-title">COLOR</span>
+            <button class="btn-custom-filter btn-custom-active-color" data-val="all" onclick="updateFilters('color', 'all', this)">TODOS</button>
+            __BTN_COLOR_MAIN__
+        </div>
+    </div>
+
+    <div id="workspace">
+        
+        <div id="info-bar">Selecciona un punto para ver su detalle</div>
+
+        <div id="fs-sidebar">
+            <span class="fs-close-btn" onclick="toggleFsSidebar()">×</span>
+            <div style="clear:both;"></div>
+            <h5 class="mb-4">🔍 Filtros de Inspección</h5>
+            
+            <div class="sidebar-section-title" style="margin-top: 20px;">NIVEL DE AGRUPAMIENTO DIAGRAMA</div>
+            <p style="font-size: 11px; color: #bdc3c7; line-height: 1.3; margin-bottom: 8px;">Ajusta la barra para dividir los componentes en grupos o juntar las cantidades:</p>
+            <input type="range" id="sensitivity-slider" min="10" max="50" value="15" style="width: 100%; cursor: pointer;">
+            <div style="display: flex; justify-content: space-between; font-size: 10px; color: #ecf0f1; margin-bottom: 25px; font-weight: bold;">
+                <span>← SEPARAR GRUPOS</span>
+                <span>JUNTAR CANTIDADES →</span>
+            </div>
+
+            <div class="sidebar-section-title">TIPO DE COMPONENTE</div>
+            <div class="d-grid gap-2 mb-4" id="group-tipo-fs">
+                <button class="btn btn-primary btn-sm btn-filter-fs" data-val="all" onclick="syncAndFilter('tipo', 'all', this)">TODOS</button>
+                __BTN_TIPO_FS__
+                <button class="btn btn-outline-secondary btn-sm btn-filter-fs" data-val="none" onclick="syncAndFilter('tipo', 'none', this)">OCULTAR TODO</button>
+            </div>
+
+            <div class="sidebar-section-title">FILTRAR POR COLOR</div>
+            <div class="d-grid gap-2" id="group-color-fs">
+                <button class="btn btn-success btn-sm btn-filter-fs" data-val="all" onclick="syncAndFilter('color', 'all', this)">TODOS LOS COLORES</button>
+                __BTN_COLOR_FS__
+            </div>
+        </div>
+
+        <div class="custom-nav">
+            <div id="btn-in" class="nav-btn btn-zoom-in" title="Acercar">+</div>
+            <div id="btn-out" class="nav-btn btn-zoom-out" title="Alejar">−</div>
+            <div id="btn-home" class="nav-btn btn-home" title="Centrar">🏠</div>
+            <div id="btn-diagrama" class="nav-btn btn-diagrama" title="Activar Modo Diagrama (Márgenes)">📊</div>
+        </div>
+        
+        <button id="toggle-sidebar-btn" onclick="toggleFsSidebar()">☰ Filtros</button>
+        <button class="btn-fs" onclick="toggleFS()">📺 Pantalla Completa</button>
+        
+        <div id="viewer-container"></div>
+    </div>
+
+    <div class="container-fluid report-container">
+        <div class="summary-card" id="tables-output"></div>
+    </div>
+
+    <script>
+        // Datos de este reporte. El script siguiente (visor) es idéntico en todos
+        // los reportes: en la exportación como biblioteca se carga desde assets/.
+        const DATOS_PUNTOS = __PUNTOS_JSON__;
+        const imgW = __WIDTH__;
+        const TILE_SOURCES = __TILE_SOURCES__;
+    </script>
+    <script>
+        // =======================================================
+        // HUD DE RENDIMIENTO (?perf=1)
+        // =======================================================
+        // Con ?perf=1 las funciones principales quedan envueltas con performance.mark/
+        // measure (se ven también en la pestaña Performance del navegador) y un panel
+        // muestra FPS, tiempos por función, piezas dibujadas tras el recorte y
+        // etiquetas del diagrama. "Exportar" descarga la traza en JSON (formato Trace
+        // Event: se abre en chrome://tracing o Perfetto). Sin el parámetro no se
+        // envuelve nada. agruparPorDistancia, spreadLabels y calcularEtiquetas no se
+        // envuelven porque se copian al worker con toString(): calcularEtiquetas mide
+        // sus dos fases y devuelve los tiempos junto con las etiquetas.
+        const inicioScript = performance.now();
+        const perf = new URLSearchParams(window.location.search).get('perf') === '1' ? crearPerf() : null;
+        const cuadro = { modo: '', dibujados: 0, etiquetas: 0 };
+
+        function crearPerf() {
+            const MAX_EVENTOS = 20000;
+            const eventos = [], stats = new Map(), historialFps = [];
+            let fps = 0, peorCuadro = 0;
+
+            function registrar(nombre, inicio, dur, hilo, args) {
+                let s = stats.get(nombre);
+                if (!s) stats.set(nombre, s = { n: 0, total_ms: 0, max_ms: 0, ultimo_ms: 0 });
+                s.n++; s.total_ms += dur; s.ultimo_ms = dur;
+                if (dur > s.max_ms) s.max_ms = dur;
+                if (eventos.length < MAX_EVENTOS) eventos.push({ nombre, inicio, dur, hilo: hilo || 'principal', args });
+            }
+
+            function medir(nombre, f, detalle) {
+                const marca = 'mosaico:' + nombre;
+                return function () {
+                    const inicio = performance.now();
+                    performance.mark(marca);
+                    try {
+                        return f.apply(this, arguments);
+                    } finally {
+                        registrar(nombre, inicio, performance.now() - inicio, 'principal', detalle ? detalle() : undefined);
+                        try { performance.measure(nombre, marca); } catch (e) {}
+                        performance.clearMarks(marca);
+                    }
+                };
+            }
+
+            // Tiempos que devuelve calcularEtiquetas (en el worker o en el hilo principal)
+            function etiquetas(res, hilo) {
+                const fin = performance.now();
+                const args = { etiquetas: res.punto.length };
+                registrar('spreadLabels', fin - res.msRepartir, res.msRepartir, hilo, args);
+                registrar('agrupamiento', fin - res.msRepartir - res.msAgrupar, res.msAgrupar, hilo, args);
+            }
+
+            const hud = document.createElement('div');
+            hud.id = 'perf-hud';
+            hud.innerHTML = '<div id="perf-texto"></div>' +
+                '<button type="button" id="perf-exportar">Exportar JSON</button> <button type="button" id="perf-reiniciar">Reiniciar</button>';
+            document.getElementById('workspace').appendChild(hud);
+            const texto = document.getElementById('perf-texto');
+            document.getElementById('perf-exportar').onclick = () => exportar();
+            document.getElementById('perf-reiniciar').onclick = () => {
+                eventos.length = 0; stats.clear(); historialFps.length = 0;
+                performance.clearMeasures();
+            };
+
+            function pintar() {
+                const ms = (v) => v.toFixed(1);
+                const n = cuadro.dibujados === -1 ? 'GPU' : cuadro.dibujados;
+                let html = 'FPS ' + fps.toFixed(0) + ' · peor cuadro ' + ms(peorCuadro) + ' ms<br>' +
+                    'piezas ' + puntos.length + ' · modo ' + cuadro.modo + ' · dibujadas ' + n + '<br>' +
+                    'etiquetas ' + cuadro.etiquetas + ' / ' + etiquetasDiagrama.length +
+                    '<table><tr><th></th><th>n</th><th>últ</th><th>media</th><th>máx</th></tr>';
+                for (const [nombre, s] of stats) {
+                    html += '<tr><td>' + nombre + '</td><td>' + s.n + '</td><td>' + ms(s.ultimo_ms) + '</td><td>' +
+                        ms(s.total_ms / s.n) + '</td><td>' + ms(s.max_ms) + '</td></tr>';
+                }
+                texto.innerHTML = html + '</table>';
+            }
+
+            // FPS del navegador con un requestAnimationFrame continuo (solo con ?perf=1);
+            // los cuadros de más de 50 ms quedan en la traza como "cuadro_largo"
+            let anterior = 0, cuadros = 0, inicioVentana = performance.now(), peorVentana = 0;
+            function bucle(t) {
+                if (anterior) {
+                    const dt = t - anterior;
+                    if (dt > peorVentana) peorVentana = dt;
+                    if (dt > 50) registrar('cuadro_largo', anterior, dt);
+                }
+                anterior = t;
+                cuadros++;
+                if (t - inicioVentana >= 500) {
+                    fps = cuadros * 1000 / (t - inicioVentana);
+                    peorCuadro = peorVentana;
+                    if (historialFps.length < MAX_EVENTOS) historialFps.push({ t: Math.round(t), fps: +fps.toFixed(1), peor_ms: +peorCuadro.toFixed(1) });
+                    cuadros = 0; inicioVentana = t; peorVentana = 0;
+                    pintar();
+                }
+                requestAnimationFrame(bucle);
+            }
+            requestAnimationFrame(bucle);
+
+            function traza() {
+                const hilos = { principal: 1, worker: 2 };
+                return {
+                    traceEvents: eventos.map(e => ({
+                        name: e.nombre, cat: 'mosaico', ph: 'X', pid: 1, tid: hilos[e.hilo],
+                        ts: Math.round(e.inicio * 1000), dur: Math.round(e.dur * 1000), args: e.args || {}
+                    })).concat([
+                        { name: 'thread_name', ph: 'M', pid: 1, tid: 1, args: { name: 'principal' } },
+                        { name: 'thread_name', ph: 'M', pid: 1, tid: 2, args: { name: 'worker (ts aproximado)' } },
+                    ]),
+                    displayTimeUnit: 'ms',
+                    otherData: {
+                        titulo: document.title, fecha: new Date().toISOString(), navegador: navigator.userAgent,
+                        pantalla: screen.width + 'x' + screen.height + '@' + (window.devicePixelRatio || 1),
+                        nucleos: navigator.hardwareConcurrency || null, memoria_gb: navigator.deviceMemory || null,
+                        piezas: puntos.length, webgl: !!capaGL, lod: usarLOD, worker: !!trabajadorDiagrama,
+                        eventos_descartados: eventos.length >= MAX_EVENTOS,
+                        funciones: Object.fromEntries([...stats].map(([k, s]) => [k, { ...s, total_ms: +s.total_ms.toFixed(3), max_ms: +s.max_ms.toFixed(3), ultimo_ms: +s.ultimo_ms.toFixed(3) }])),
+                        fps: historialFps,
+                    },
+                };
+            }
+
+            function exportar() {
+                const url = URL.createObjectURL(new Blob([JSON.stringify(traza())], { type: 'application/json' }));
+                const a = document.createElement('a');
+                a.href = url;
+                a.download = 'perf_' + document.title.replace(/[^A-Za-z0-9_-]+/g, '_') + '.json';
+                document.body.appendChild(a);
+                a.click();
+                a.remove();
+                setTimeout(() => URL.revokeObjectURL(url), 1000);
+            }
+
+            return { medir, registrar, etiquetas, traza, exportar };
+        }
+
+        if (perf) {
+            decodificarPuntos = perf.medir('decodificarPuntos', decodificarPuntos);
+            construirPiramide = perf.medir('construirPiramide', construirPiramide);
+            renderCanvas = perf.medir('renderCanvas', renderCanvas,
+                () => ({ modo: cuadro.modo, dibujadas: cuadro.dibujados, etiquetas: cuadro.etiquetas }));
+            updateDataAndDiagram = perf.medir('updateDataAndDiagram', updateDataAndDiagram);
+            indicesFiltrados = perf.medir('indicesFiltrados', indicesFiltrados);
+            renderSummary = perf.medir('renderSummary', renderSummary);
+            htmlResumen = perf.medir('htmlResumen', htmlResumen);
+        }
+
+        // Puntos en formato columnar (ver mosaico/compacto.py): coordenadas en
+        // Float32 base64 y tipo/color/tamaño codificados por diccionario. Un
+        // arreglo de objetos (formato anterior) se usa tal cual.
+        function decodificarPuntos(datos) {
+            if (Array.isArray(datos)) return datos;
+            const bytes = (b64) => {
+                const texto = atob(b64);
+                const salida = new Uint8Array(texto.length);
+                for (let i = 0; i < texto.length; i++) salida[i] = texto.charCodeAt(i);
+                return salida.buffer;
+            };
+            const xs = new Float32Array(bytes(datos.x));
+            const ys = new Float32Array(bytes(datos.y));
+            const grupoDe = datos.bytes_grupo === 4 ? new Uint32Array(bytes(datos.grupo)) : new Uint16Array(bytes(datos.grupo));
+            const grupos = datos.grupos.map(([t, c, s, p]) => ({
+                tipo: datos.tipos[t], color_norm: datos.colores[c], tamaño: datos.tamaños[s], color_plot: datos.colores_plot[p]
+            }));
+            const lista = new Array(datos.n);
+            for (let i = 0; i < datos.n; i++) {
+                const g = grupos[grupoDe[i]];
+                lista[i] = { x: xs[i], y: ys[i], tipo: g.tipo, color_norm: g.color_norm, tamaño: g.tamaño, color_plot: g.color_plot };
+            }
+            return lista;
+        }
+
+        const puntos = decodificarPuntos(DATOS_PUNTOS);
+        let DISTANCE_THRESHOLD = 0.15;
+        
+        const viewer = OpenSeadragon({
+            id: "viewer-container",
+            prefixUrl: "https://cdnjs.cloudflare.com/ajax/libs/openseadragon/4.1.0/images/",
+            tileSources: TILE_SOURCES,
+            showNavigationControl: false,
+            maxZoomLevel: 80,
+            minZoomImageRatio: 1.0,
+            visibilityRatio: 1.0,
+            constrainDuringPan: true,
+            animationTime: 0.2, 
+            springStiffness: 20, 
+            gestureSettingsTouch: { clickToZoom: false, dblClickToZoom: false },
+            gestureSettingsMouse: { clickToZoom: false, dblClickToZoom: false }
+        });
+
+        const canvasOverlay = document.createElement('canvas');
+        canvasOverlay.style.position = 'absolute';
+        canvasOverlay.style.top = '0';
+        canvasOverlay.style.left = '0';
+        canvasOverlay.style.pointerEvents = 'none'; 
+        canvasOverlay.style.zIndex = '500';
+        viewer.canvas.appendChild(canvasOverlay);
+
+        let filterT = 'all', filterC = 'all', lastSelected = null;
+        let idxSeleccionado = -1;  // posición de lastSelected en puntos (se fija en el click)
+        let diagramMode = false;
+        let sliderTimeout;
+
+        function pasaFiltro(p) {
+            return (filterT === 'all' || p.tipo === filterT) && (filterC === 'all' || p.color_norm === filterC);
+        }
+
+        // =======================================================
+        // ÍNDICE ESPACIAL (GRILLA UNIFORME) PARA EL CLICK
+        // =======================================================
+        // Coordenadas normalizadas (x/imgW, y/imgW) calculadas una sola vez.
+        const ptsX = new Float32Array(puntos.length);
+        const ptsY = new Float32Array(puntos.length);
+        puntos.forEach((p, i) => { ptsX[i] = p.x / imgW; ptsY[i] = p.y / imgW; });
+
+        function construirIndiceEspacial(xs, ys) {
+            const n = xs.length;
+            let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+            for (let i = 0; i < n; i++) {
+                if (xs[i] < minX) minX = xs[i];
+                if (xs[i] > maxX) maxX = xs[i];
+                if (ys[i] < minY) minY = ys[i];
+                if (ys[i] > maxY) maxY = ys[i];
+            }
+            if (n === 0) { minX = minY = 0; maxX = maxY = 1; }
+
+            // ~1 punto por celda en promedio
+            const lado = Math.max(1, Math.min(1024, Math.ceil(Math.sqrt(n))));
+            const celda = Math.max(maxX - minX, maxY - minY, 1e-9) / lado;
+            const cols = Math.floor((maxX - minX) / celda) + 1;
+            const filas = Math.floor((maxY - minY) / celda) + 1;
+
+            // Conteo por celda -> offsets -> índices de puntos ordenados por celda
+            const celdaDe = new Uint32Array(n);
+            const inicio = new Uint32Array(cols * filas + 1);
+            for (let i = 0; i < n; i++) {
+                const c = Math.floor((ys[i] - minY) / celda) * cols + Math.floor((xs[i] - minX) / celda);
+                celdaDe[i] = c;
+                inicio[c + 1]++;
+            }
+            for (let c = 0; c < cols * filas; c++) inicio[c + 1] += inicio[c];
+            const cursor = inicio.slice(0, cols * filas);
+            const items = new Uint32Array(n);
+            for (let i = 0; i < n; i++) items[cursor[celdaDe[i]]++] = i;
+
+            return { minX, minY, celda, cols, filas, inicio, items };
+        }
+
+        // Índice del punto más cercano a (x, y) dentro de `radio` que cumpla `acepta`, o -1.
+        // A igual distancia gana el de menor índice, como en el recorrido lineal.
+        function puntoMasCercano(indice, x, y, radio, acepta) {
+            const { minX, minY, celda, cols, filas, inicio, items } = indice;
+            const c0 = Math.max(0, Math.floor((x - radio - minX) / celda));
+            const c1 = Math.min(cols - 1, Math.floor((x + radio - minX) / celda));
+            const f0 = Math.max(0, Math.floor((y - radio - minY) / celda));
+            const f1 = Math.min(filas - 1, Math.floor((y + radio - minY) / celda));
+            let mejor = -1, mejorD2 = radio * radio;
+            for (let f = f0; f <= f1; f++) {
+                for (let c = c0; c <= c1; c++) {
+                    const celdaId = f * cols + c;
+                    for (let k = inicio[celdaId]; k < inicio[celdaId + 1]; k++) {
+                        const i = items[k];
+                        const dx = ptsX[i] - x, dy = ptsY[i] - y;
+                        const d2 = dx * dx + dy * dy;
+                        if ((d2 < mejorD2 || (d2 === mejorD2 && i < mejor)) && acepta(puntos[i])) {
+                            mejorD2 = d2;
+                            mejor = i;
+                        }
+                    }
+                }
+            }
+            return mejor;
+        }
+
+        const indiceEspacial = construirIndiceEspacial(ptsX, ptsY);
+
+        // =======================================================
+        // DIBUJO DE PUNTOS EN CANVAS (RECORTE AL VIEWPORT)
+        // =======================================================
+        // tipo, color_norm y color_plot codificados como enteros para filtrar y
+        // agrupar sin comparar strings en cada cuadro.
+        function codificar(campo) {
+            const valores = [], codigos = new Map(), cod = new Uint16Array(puntos.length);
+            puntos.forEach((p, i) => {
+                let c = codigos.get(p[campo]);
+                if (c === undefined) { c = valores.length; codigos.set(p[campo], c); valores.push(p[campo]); }
+                cod[i] = c;
+            });
+            return { valores, cod };
+        }
+        const codTipo = codificar('tipo');
+        const codColor = codificar('color_norm');
+        const codPlot = codificar('color_plot');
+
+        // -1 = sin filtro; un valor que no está en los datos no coincide con ningún código
+        function codigoFiltro(codigos, valor) {
+            if (valor === 'all') return -1;
+            const c = codigos.valores.indexOf(valor);
+            return c === -1 ? codigos.valores.length : c;
+        }
+
+        // =======================================================
+        // ÍNDICES POR FILTRO Y CUBO DEL RESUMEN
+        // =======================================================
+        // Índices de los puntos de cada tipo y de cada color (en orden, agrupados por
+        // código) y un cubo tipo × color × tamaño con la cantidad de piezas y la primera
+        // aparición de cada combinación. Cambiar de filtro intersecta listas y el
+        // resumen se lee del cubo.
+        const codTamaño = codificar('tamaño');
+
+        function indicePorCodigo(codigos) {
+            const inicio = new Uint32Array(codigos.valores.length + 1);
+            for (let i = 0; i < puntos.length; i++) inicio[codigos.cod[i] + 1]++;
+            for (let c = 0; c < codigos.valores.length; c++) inicio[c + 1] += inicio[c];
+            const cursor = inicio.slice(0, codigos.valores.length);
+            const items = new Uint32Array(puntos.length);
+            for (let i = 0; i < puntos.length; i++) items[cursor[codigos.cod[i]]++] = i;
+            return { inicio, items };
+        }
+        const indiceTipo = indicePorCodigo(codTipo);
+        const indiceColor = indicePorCodigo(codColor);
+
+        const cubo = (() => {
+            const nT = codTipo.valores.length, nC = codColor.valores.length, nS = codTamaño.valores.length;
+            const cantidad = new Uint32Array(nT * nC * nS), primero = new Uint32Array(nT * nC * nS);
+            for (let i = puntos.length - 1; i >= 0; i--) {
+                const k = (codTipo.cod[i] * nC + codColor.cod[i]) * nS + codTamaño.cod[i];
+                cantidad[k]++;
+                primero[k] = i;
+            }
+            return { nT, nC, nS, cantidad, primero };
+        })();
+
+        // =======================================================
+        // CAPA WEBGL OPCIONAL (MOSAICOS MUY GRANDES)
+        // =======================================================
+        // A partir de UMBRAL_WEBGL puntos (o con ?render=webgl) los puntos se
+        // dibujan como point sprites en una sola llamada; ?render=2d la desactiva.
+        // Si no hay WebGL o se pierde el contexto se vuelve al canvas 2D.
+        const UMBRAL_WEBGL = 50000;
+
+        const VERTEX_GL = [
+            'attribute vec3 aPos;', 'attribute vec2 aCod;', 'attribute vec4 aColor;',
+            'uniform vec2 uOrigen;', 'uniform vec2 uEscala;', 'uniform vec2 uFiltro;',
+            'uniform float uSel;', 'uniform float uTamano;',
+            'varying vec4 vColor;',
+            'void main() {',
+            '  bool oculto = (uFiltro.x >= 0.0 && aCod.x != uFiltro.x) || (uFiltro.y >= 0.0 && aCod.y != uFiltro.y) || aPos.z == uSel;',
+            '  gl_Position = oculto ? vec4(2.0, 2.0, 2.0, 1.0) : vec4((aPos.xy - uOrigen) * uEscala + vec2(-1.0, 1.0), 0.0, 1.0);',
+            '  gl_PointSize = oculto ? 0.0 : uTamano;',
+            '  vColor = aColor;',
+            '}'
+        ].join(' ');
+        const FRAGMENT_GL = [
+            'precision mediump float;',
+            'varying vec4 vColor;', 'uniform float uAlpha;', 'uniform float uTamano;',
+            'void main() {',
+            '  float borde = clamp((0.5 - length(gl_PointCoord - 0.5)) * uTamano, 0.0, 1.0);',
+            '  float a = uAlpha * borde;',
+            '  gl_FragColor = vec4(vColor.rgb * a, a);',
+            '}'
+        ].join(' ');
+
+        function colorRGB(color) {
+            // El navegador normaliza nombres CSS ('silver', 'deepskyblue'...) a #rrggbb o rgba()
+            const ctx = document.createElement('canvas').getContext('2d');
+            ctx.fillStyle = '#000000';
+            ctx.fillStyle = color;
+            const v = String(ctx.fillStyle);
+            if (v[0] === '#') return [1, 3, 5].map(k => parseInt(v.slice(k, k + 2), 16));
+            return (v.match(/[0-9.]+/g) || [0, 0, 0]).slice(0, 3).map(Number);
+        }
+
+        function crearCapaGL() {
+            const canvas = document.createElement('canvas');
+            const gl = canvas.getContext('webgl', { premultipliedAlpha: true, antialias: false });
+            if (!gl) return null;
+
+            function shader(tipo, fuente) {
+                const sh = gl.createShader(tipo);
+                gl.shaderSource(sh, fuente);
+                gl.compileShader(sh);
+                return gl.getShaderParameter(sh, gl.COMPILE_STATUS) ? sh : null;
+            }
+            const vs = shader(gl.VERTEX_SHADER, VERTEX_GL), fs = shader(gl.FRAGMENT_SHADER, FRAGMENT_GL);
+            if (!vs || !fs) return null;
+            const prog = gl.createProgram();
+            gl.attachShader(prog, vs);
+            gl.attachShader(prog, fs);
+            gl.linkProgram(prog);
+            if (!gl.getProgramParameter(prog, gl.LINK_STATUS)) return null;
+            gl.useProgram(prog);
+
+            // Buffers subidos una sola vez: posición + índice, códigos de filtro y color
+            const n = puntos.length;
+            const pos = new Float32Array(n * 3), cod = new Uint16Array(n * 2), rgba = new Uint8Array(n * 4);
+            const paleta = codPlot.valores.map(colorRGB);
+            for (let i = 0; i < n; i++) {
+                pos[3*i] = ptsX[i]; pos[3*i + 1] = ptsY[i]; pos[3*i + 2] = i;
+                cod[2*i] = codTipo.cod[i]; cod[2*i + 1] = codColor.cod[i];
+                const c = paleta[codPlot.cod[i]];
+                rgba[4*i] = c[0]; rgba[4*i + 1] = c[1]; rgba[4*i + 2] = c[2]; rgba[4*i + 3] = 255;
+            }
+            function atributo(nombre, datos, tamaño, tipo, normalizado) {
+                gl.bindBuffer(gl.ARRAY_BUFFER, gl.createBuffer());
+                gl.bufferData(gl.ARRAY_BUFFER, datos, gl.STATIC_DRAW);
+                const loc = gl.getAttribLocation(prog, nombre);
+                gl.enableVertexAttribArray(loc);
+                gl.vertexAttribPointer(loc, tamaño, tipo, normalizado, 0, 0);
+            }
+            atributo('aPos', pos, 3, gl.FLOAT, false);
+            atributo('aCod', cod, 2, gl.UNSIGNED_SHORT, false);
+            atributo('aColor', rgba, 4, gl.UNSIGNED_BYTE, true);
+
+            const u = {};
+            ['uOrigen', 'uEscala', 'uFiltro', 'uSel', 'uTamano', 'uAlpha'].forEach(k => { u[k] = gl.getUniformLocation(prog, k); });
+            const rangoPunto = gl.getParameter(gl.ALIASED_POINT_SIZE_RANGE) || [1, 64];
+            gl.enable(gl.BLEND);
+            gl.blendFunc(gl.ONE, gl.ONE_MINUS_SRC_ALPHA);
+
+            canvas.style.position = 'absolute';
+            canvas.style.top = '0';
+            canvas.style.left = '0';
+            canvas.style.pointerEvents = 'none';
+            canvas.style.zIndex = '499';
+            viewer.canvas.appendChild(canvas);
+
+            let tamaño = '';
+            return {
+                canvas,
+                limpiar(w, h, dpr) {
+                    const clave = w + 'x' + h + '@' + dpr;
+                    if (clave !== tamaño) {
+                        tamaño = clave;
+                        canvas.width = Math.round(w * dpr);
+                        canvas.height = Math.round(h * dpr);
+                        canvas.style.width = w + 'px';
+                        canvas.style.height = h + 'px';
+                        gl.viewport(0, 0, canvas.width, canvas.height);
+                    }
+                    gl.clearColor(0, 0, 0, 0);
+                    gl.clear(gl.COLOR_BUFFER_BIT);
+                },
+                dibujar(b, escala, w, h, dpr, ft, fc, selIdx, alpha, radio) {
+                    gl.uniform2f(u.uOrigen, b.x, b.y);
+                    gl.uniform2f(u.uEscala, 2 * escala / w, -2 * escala / h);
+                    gl.uniform2f(u.uFiltro, ft, fc);
+                    gl.uniform1f(u.uSel, selIdx);
+                    gl.uniform1f(u.uTamano, Math.min(2 * radio * dpr, rangoPunto[1]));
+                    gl.uniform1f(u.uAlpha, alpha);
+                    gl.drawArrays(gl.POINTS, 0, n);
+                }
+            };
+        }
+
+        const modoRender = new URLSearchParams(window.location.search).get('render');
+        let capaGL = null;
+        if (modoRender === 'webgl' || (modoRender !== '2d' && puntos.length >= UMBRAL_WEBGL)) {
+            try { capaGL = crearCapaGL(); } catch (e) { capaGL = null; }
+            if (capaGL) {
+                capaGL.canvas.addEventListener('webglcontextlost', () => {
+                    capaGL.canvas.style.display = 'none';
+                    capaGL = null;
+                    renderCanvas();
+                });
+            }
+        }
+
+        // Buffers reutilizados entre cuadros: visibles ordenados por color de relleno
+        const visibles = new Uint32Array(puntos.length);
+        const porColor = new Uint32Array(puntos.length);
+        const inicioColor = new Uint32Array(codPlot.valores.length + 1);
+        let tamañoCanvas = '';
+
+        function ajustarCanvas(w, h, dpr) {
+            // Cambiar width/height borra y reasigna el buffer: solo si cambió el tamaño
+            const clave = w + 'x' + h + '@' + dpr;
+            if (clave !== tamañoCanvas) {
+                tamañoCanvas = clave;
+                canvasOverlay.width = Math.round(w * dpr);
+                canvasOverlay.height = Math.round(h * dpr);
+                canvasOverlay.style.width = w + 'px';
+                canvasOverlay.style.height = h + 'px';
+            }
+            const ctx = canvasOverlay.getContext('2d');
+            ctx.setTransform(dpr, 0, 0, dpr, 0, 0);
+            ctx.clearRect(0, 0, w, h);
+            return ctx;
+        }
+
+        function dibujarPuntos2D(ctx, b, escala, x0, x1, y0, y1, ft, fc, selIdx, baseRadius) {
+            // Recorte en coordenadas de imagen antes de proyectar
+            let n = 0;
+            inicioColor.fill(0);
+            for (let i = 0; i < puntos.length; i++) {
+                const x = ptsX[i], y = ptsY[i];
+                if (x < x0 || x > x1 || y < y0 || y > y1) continue;
+                if ((ft !== -1 && codTipo.cod[i] !== ft) || (fc !== -1 && codColor.cod[i] !== fc)) continue;
+                if (i === selIdx) continue;
+                visibles[n++] = i;
+                inicioColor[codPlot.cod[i] + 1]++;
+            }
+            for (let c = 0; c < codPlot.valores.length; c++) inicioColor[c + 1] += inicioColor[c];
+            const cursor = inicioColor.slice(0, codPlot.valores.length);
+            for (let k = 0; k < n; k++) porColor[cursor[codPlot.cod[visibles[k]]]++] = visibles[k];
+
+            // Un solo path y un solo fill por color
+            ctx.globalAlpha = diagramMode ? 0.20 : 0.85;
+            for (let c = 0; c < codPlot.valores.length; c++) {
+                if (inicioColor[c] === inicioColor[c + 1]) continue;
+                ctx.beginPath();
+                for (let k = inicioColor[c]; k < inicioColor[c + 1]; k++) {
+                    const i = porColor[k];
+                    const px = (ptsX[i] - b.x) * escala, py = (ptsY[i] - b.y) * escala;
+                    ctx.moveTo(px + baseRadius, py);
+                    ctx.arc(px, py, baseRadius, 0, 2*Math.PI);
+                }
+                ctx.fillStyle = codPlot.valores[c];
+                ctx.fill();
+            }
+            return n;
+        }
+
+        // =======================================================
+        // NIVELES DE DETALLE (LOD) CON LA VISTA ALEJADA
+        // =======================================================
+        // Pirámide de grillas sobre las coordenadas normalizadas: en el nivel L la
+        // celda mide 2^-L (en ancho de imagen). Cada celda ocupada guarda cantidad,
+        // centroide y color de relleno dominante. Al alejarse se elige el nivel cuya
+        // celda mide entre CELDA_LOD/2 y CELDA_LOD px; si las celdas visibles llevan
+        // en promedio DENSIDAD_LOD piezas o más se dibuja una marca por celda en vez
+        // de un punto por pieza, y si no, los puntos (que entonces son pocos más que
+        // las celdas). El costo por cuadro queda acotado por las celdas de pantalla.
+        // ?lod=0 la desactiva.
+        const CELDA_LOD = 18;    // px: el diámetro de un punto
+        const DENSIDAD_LOD = 2;
+        const NIVEL_MAX_LOD = Math.min(14, Math.ceil(Math.log2(Math.sqrt(puntos.length) + 1)) + 1);
+        const usarLOD = puntos.length > 0 && new URLSearchParams(window.location.search).get('lod') !== '0';
+
+        // Radix LSD estable por color, columna y fila: entradas ordenadas por celda
+        function ordenarEntradas(e, n, nColores, cols, filas, orden, aux) {
+            for (let k = 0; k < n; k++) orden[k] = k;
+            for (const [clave, rango] of [[e.color, nColores], [e.col, cols], [e.fila, filas]]) {
+                const cuenta = new Uint32Array(rango + 1);
+                for (let k = 0; k < n; k++) cuenta[clave[k] + 1]++;
+                for (let c = 0; c < rango; c++) cuenta[c + 1] += cuenta[c];
+                for (let k = 0; k < n; k++) { const j = orden[k]; aux[cuenta[clave[j]]++] = j; }
+                [orden, aux] = [aux, orden];
+            }
+            return orden;
+        }
+
+        function entradasVacias(n) {
+            return { col: new Uint32Array(n), fila: new Uint32Array(n), color: new Uint16Array(n),
+                     cantidad: new Uint32Array(n), sx: new Float64Array(n), sy: new Float64Array(n) };
+        }
+
+        // Entradas (celda, color, cantidad, suma de x/y) de `e` -> celdas del nivel; en `s`
+        // quedan las entradas fusionadas por (celda, color) que alimentan el nivel siguiente
+        function fusionarCeldas(e, n, s, nColores, cols, filas, orden, aux) {
+            orden = ordenarEntradas(e, n, nColores, cols, filas, orden, aux);
+            let m = 0, celdas = 0;
+            for (let k = 0; k < n; k++) {
+                const j = orden[k], t = m - 1;
+                if (t >= 0 && s.col[t] === e.col[j] && s.fila[t] === e.fila[j]) {
+                    if (s.color[t] === e.color[j]) {
+                        s.cantidad[t] += e.cantidad[j]; s.sx[t] += e.sx[j]; s.sy[t] += e.sy[j];
+                        continue;
+                    }
+                } else {
+                    celdas++;
+                }
+                s.col[m] = e.col[j]; s.fila[m] = e.fila[j]; s.color[m] = e.color[j];
+                s.cantidad[m] = e.cantidad[j]; s.sx[m] = e.sx[j]; s.sy[m] = e.sy[j];
+                m++;
+            }
+
+            const col = new Uint32Array(celdas), cantidad = new Uint32Array(celdas), color = new Uint16Array(celdas);
+            const cx = new Float32Array(celdas), cy = new Float32Array(celdas), mayor = new Uint32Array(celdas);
+            const inicioFila = new Uint32Array(filas + 1);
+            let c = -1, sx = 0, sy = 0;
+            for (let t = 0; t < m; t++) {
+                if (c === -1 || s.col[t] !== s.col[t - 1] || s.fila[t] !== s.fila[t - 1]) {
+                    if (c !== -1) { cx[c] = sx / cantidad[c]; cy[c] = sy / cantidad[c]; }
+                    c++; sx = 0; sy = 0;
+                    col[c] = s.col[t];
+                    inicioFila[s.fila[t] + 1]++;
+                }
+                cantidad[c] += s.cantidad[t]; sx += s.sx[t]; sy += s.sy[t];
+                // Dominante: el color con más piezas en la celda (a igualdad, el primer código)
+                if (s.cantidad[t] > mayor[c]) { mayor[c] = s.cantidad[t]; color[c] = s.color[t]; }
+            }
+            if (c !== -1) { cx[c] = sx / cantidad[c]; cy[c] = sy / cantidad[c]; }
+            for (let f = 0; f < filas; f++) inicioFila[f + 1] += inicioFila[f];
+            return { nivel: { cols, filas, inicioFila, col, cantidad, color, cx, cy }, m };
+        }
+
+        function construirPiramide(ft, fc) {
+            const { minX, minY } = indiceEspacial;
+            const total = puntos.length;
+            let maxX = minX, maxY = minY;
+            for (let i = 0; i < total; i++) { if (ptsX[i] > maxX) maxX = ptsX[i]; if (ptsY[i] > maxY) maxY = ptsY[i]; }
+
+            // Nivel más fino: una entrada por pieza que pasa el filtro. Dos juegos de
+            // buffers que se alternan entre niveles.
+            let e = entradasVacias(total), s = entradasVacias(total);
+            const orden = new Uint32Array(total), aux = new Uint32Array(total);
+            const f = Math.pow(2, NIVEL_MAX_LOD);
+            let n = 0;
+            for (let i = 0; i < total; i++) {
+                if ((ft !== -1 && codTipo.cod[i] !== ft) || (fc !== -1 && codColor.cod[i] !== fc)) continue;
+                e.col[n] = Math.floor((ptsX[i] - minX) * f);
+                e.fila[n] = Math.floor((ptsY[i] - minY) * f);
+                e.color[n] = codPlot.cod[i];
+                e.cantidad[n] = 1; e.sx[n] = ptsX[i]; e.sy[n] = ptsY[i];
+                n++;
+            }
+
+            // Cada nivel sale del anterior: floor(v * 2^L) = floor(v * 2^(L+1)) >> 1
+            const niveles = new Array(NIVEL_MAX_LOD + 1);
+            for (let L = NIVEL_MAX_LOD; L >= 0; L--) {
+                if (L < NIVEL_MAX_LOD) {
+                    for (let k = 0; k < n; k++) { e.col[k] >>>= 1; e.fila[k] >>>= 1; }
+                }
+                const p = Math.pow(2, L);
+                const r = fusionarCeldas(e, n, s, codPlot.valores.length, Math.floor((maxX - minX) * p) + 1, Math.floor((maxY - minY) * p) + 1, orden, aux);
+                niveles[L] = r.nivel;
+                n = r.m;
+                [e, s] = [s, e];
+            }
+            return { minX, minY, niveles };
+        }
+
+        // La pirámide sin filtro se arma al cargar; con filtro, la primera vez que se pide
+        // (se conserva solo la del último filtro)
+        const piramides = new Map();
+        function piramideLOD(ft, fc) {
+            const clave = ft + '|' + fc;
+            let p = piramides.get(clave);
+            if (!p) {
+                for (const k of piramides.keys()) if (k !== '-1|-1') piramides.delete(k);
+                p = construirPiramide(ft, fc);
+                piramides.set(clave, p);
+            }
+            return p;
+        }
+        if (usarLOD) piramideLOD(-1, -1);
+
+        // Celdas del nivel dentro de [x0, x1] x [y0, y1] -> `visibles`; devuelve
+        // { n: celdas, piezas } o null si a este zoom no hace falta agregar
+        function celdasVisibles(piramide, escala, x0, x1, y0, y1) {
+            const L = Math.max(0, Math.ceil(Math.log2(escala / CELDA_LOD)));
+            if (L > NIVEL_MAX_LOD) return null;
+            const nivel = piramide.niveles[L], f = Math.pow(2, L);
+            const c0 = Math.max(0, Math.floor((x0 - piramide.minX) * f)), c1 = Math.min(nivel.cols - 1, Math.floor((x1 - piramide.minX) * f));
+            const f0 = Math.max(0, Math.floor((y0 - piramide.minY) * f)), f1 = Math.min(nivel.filas - 1, Math.floor((y1 - piramide.minY) * f));
+            let n = 0, piezas = 0;
+            for (let fila = f0; fila <= f1; fila++) {
+                // Primera celda de la fila con columna >= c0 (búsqueda binaria)
+                let lo = nivel.inicioFila[fila], hi = nivel.inicioFila[fila + 1];
+                while (lo < hi) { const m = (lo + hi) >>> 1; if (nivel.col[m] < c0) lo = m + 1; else hi = m; }
+                for (let k = lo; k < nivel.inicioFila[fila + 1] && nivel.col[k] <= c1; k++) {
+                    visibles[n++] = k;
+                    piezas += nivel.cantidad[k];
+                }
+            }
+            return { nivel, n, piezas };
+        }
+
+        // Una marca por celda en su centroide, con el color dominante; un path por color
+        function dibujarAgregados(ctx, vista, b, escala, baseRadius) {
+            const { nivel, n } = vista;
+            inicioColor.fill(0);
+            for (let k = 0; k < n; k++) inicioColor[nivel.color[visibles[k]] + 1]++;
+            for (let c = 0; c < codPlot.valores.length; c++) inicioColor[c + 1] += inicioColor[c];
+            const cursor = inicioColor.slice(0, codPlot.valores.length);
+            for (let k = 0; k < n; k++) porColor[cursor[nivel.color[visibles[k]]]++] = visibles[k];
+
+            ctx.globalAlpha = diagramMode ? 0.20 : 0.85;
+            for (let c = 0; c < codPlot.valores.length; c++) {
+                if (inicioColor[c] === inicioColor[c + 1]) continue;
+                ctx.beginPath();
+                for (let k = inicioColor[c]; k < inicioColor[c + 1]; k++) {
+                    const j = porColor[k];
+                    const px = (nivel.cx[j] - b.x) * escala, py = (nivel.cy[j] - b.y) * escala;
+                    ctx.moveTo(px + baseRadius, py);
+                    ctx.arc(px, py, baseRadius, 0, 2*Math.PI);
+                }
+                ctx.fillStyle = codPlot.valores[c];
+                ctx.fill();
+            }
+        }
+
+        function renderCanvas() {
+            const w = viewer.canvas.clientWidth;
+            const h = viewer.canvas.clientHeight;
+            const dpr = window.devicePixelRatio || 1;
+            const ctx = ajustarCanvas(w, h, dpr);
+            if (capaGL) capaGL.limpiar(w, h, dpr);
+
+            if (filterT === 'none') {
+                cuadro.modo = 'oculto'; cuadro.dibujados = 0; cuadro.etiquetas = 0;
+                return;
+            }
+
+            const baseRadius = 9;
+            const margenPx = 20;
+
+            // Transformación lineal imagen -> pantalla, calculada una vez por cuadro
+            const b = viewer.viewport.getBounds(true);
+            const escala = viewer.viewport.getContainerSize().x / b.width;
+            const margen = margenPx / escala;
+            const x0 = b.x - margen, x1 = b.x + b.width + margen;
+            const y0 = b.y - margen, y1 = b.y + b.height + margen;
+
+            const ft = codigoFiltro(codTipo, filterT);
+            const fc = codigoFiltro(codColor, filterC);
+            const selIdx = lastSelected ? idxSeleccionado : -1;
+
+            const vistaLOD = usarLOD ? celdasVisibles(piramideLOD(ft, fc), escala, x0, x1, y0, y1) : null;
+            if (vistaLOD && vistaLOD.n && vistaLOD.piezas >= DENSIDAD_LOD * vistaLOD.n) {
+                dibujarAgregados(ctx, vistaLOD, b, escala, baseRadius);
+                cuadro.modo = 'lod'; cuadro.dibujados = vistaLOD.n;
+            } else if (capaGL) {
+                // El recorte lo hace la GPU: no se cuenta en el hilo principal
+                capaGL.dibujar(b, escala, w, h, dpr, ft, fc, selIdx, diagramMode ? 0.20 : 0.85, baseRadius);
+                cuadro.modo = 'webgl'; cuadro.dibujados = -1;
+            } else {
+                cuadro.modo = '2d'; cuadro.dibujados = dibujarPuntos2D(ctx, b, escala, x0, x1, y0, y1, ft, fc, selIdx, baseRadius);
+            }
+
+            // El seleccionado va después, más grande y con halo
+            const selX = selIdx === -1 ? 0 : (ptsX[selIdx] - b.x) * escala, selY = selIdx === -1 ? 0 : (ptsY[selIdx] - b.y) * escala;
+            if (selIdx !== -1 && pasaFiltro(lastSelected) &&
+                selX >= -margenPx && selX <= w + margenPx && selY >= -margenPx && selY <= h + margenPx) {
+                const px = selX, py = selY;
+                ctx.beginPath();
+                ctx.arc(px, py, baseRadius * 1.6, 0, 2*Math.PI);
+                ctx.fillStyle = lastSelected.color_plot;
+                ctx.globalAlpha = diagramMode ? 0.20 : 0.85;
+                ctx.fill();
+                ctx.globalAlpha = 1.0;
+                ctx.lineWidth = 3;
+                ctx.strokeStyle = '#ffffff';
+                ctx.shadowColor = '#ffffff';
+                ctx.shadowBlur = 10;
+                ctx.stroke();
+                ctx.shadowBlur = 0;
+            }
+
+            cuadro.etiquetas = etiquetasDiagrama.length ? dibujarEtiquetasDiagrama(ctx, b, escala, w, h) : 0;
+        }
+
+        // 'update-viewport' se emite en cada redibujado del visor, animaciones
+        // incluidas; escuchar también 'animation' dibujaba dos veces por cuadro.
+        viewer.addHandler('update-viewport', renderCanvas);
+
+        // =======================================================
+        // SISTEMA DE CLICK NATIVO Y A PRUEBA DE ERRORES (CORREGIDO)
+        // =======================================================
+        viewer.addHandler('canvas-click', function(event) {
+            if (filterT === 'none') return;
+            
+            // Click -> coordenadas de imagen; sólo se revisan las celdas cercanas
+            const clickPoint = viewer.viewport.pointFromPixel(event.position, true);
+            // 25 pixeles de tolerancia para dedos o ratón
+            const radio = viewer.viewport.deltaPointsFromPixels(new OpenSeadragon.Point(25, 0), true).x;
+            const idx = puntoMasCercano(indiceEspacial, clickPoint.x, clickPoint.y, radio, pasaFiltro);
+            const bestP = idx >= 0 ? puntos[idx] : null;
+
+            const bar = document.getElementById('info-bar');
+
+            if (bestP) {
+                lastSelected = bestP;
+                idxSeleccionado = idx;
+                bar.style.backgroundColor = bestP.color_plot;
+                bar.style.color = getContrastColor(bestP.color_plot);
+                bar.innerHTML = "SELECCIONADO: " + bestP.tipo.toUpperCase() + " | " + bestP.color_norm.replace(/_/g, ' ').toUpperCase() + " (" + bestP.tamaño + ")";
+                
+                event.preventDefaultAction = true; // Evitar que OpenSeadragon haga zoom al clicar el punto
+            } else {
+                // Si hace click en una zona vacía, deseleccionamos
+                if(lastSelected) {
+                    lastSelected = null;
+                    idxSeleccionado = -1;
+                    bar.style.backgroundColor = "#f8f9fa"; 
+                    bar.style.color = "#2c3e50";
+                    bar.innerHTML = "Selecciona un punto para ver su detalle";
+                }
+            }
+            
+            // Repintar el lienzo y/o el diagrama
+            if (diagramMode) {
+                updateDataAndDiagram();
+            } else {
+                renderCanvas();
+            }
+        });
+
+        document.getElementById('sensitivity-slider').addEventListener('input', function(e) {
+            DISTANCE_THRESHOLD = e.target.value / 100.0;
+            if (diagramMode) {
+                clearTimeout(sliderTimeout);
+                // Con el worker las solicitudes viejas se descartan solas: no hace falta esperar
+                sliderTimeout = setTimeout(updateDataAndDiagram, trabajadorDiagrama ? 0 : 100); 
+            }
+        });
+
+        document.addEventListener('fullscreenchange', () => {
+            if (!document.fullscreenElement) {
+                document.getElementById('fs-sidebar').classList.remove('active');
+            }
+            setTimeout(() => { viewer.viewport.goHome(); }, 100);
+        });
+
+        function toggleFsSidebar() {
+            document.getElementById('fs-sidebar').classList.toggle('active');
+        }
+
+        function resetSelection() {
+            lastSelected = null;
+            idxSeleccionado = -1;
+            const bar = document.getElementById('info-bar');
+            bar.style.backgroundColor = "#f8f9fa"; 
+            bar.style.color = "#2c3e50";
+            bar.innerHTML = "Selecciona un punto para ver su detalle";
+        }
+
+        function syncAndFilter(mode, value, btn) {
+            resetSelection(); // Limpiamos la selección si cambiamos de filtro
+            
+            if (mode === 'tipo') {
+                filterT = value;
+                const activeMainT = (value === 'none') ? 'btn-custom-active-none' : 'btn-custom-active-tipo';
+                highlightMainButtons('group-tipo-main', value, activeMainT);
+                const activeFsT = (value === 'none') ? 'btn-secondary' : 'btn-primary';
+                const outlineFsT = (value === 'none') ? 'btn-outline-secondary' : 'btn-outline-light';
+                highlightFsButtons('group-tipo-fs', value, activeFsT, outlineFsT);
+            } else {
+                filterC = value;
+                highlightMainButtons('group-color-main', value, 'btn-custom-active-color');
+                highlightFsButtons('group-color-fs', value, 'btn-success', 'btn-outline-light');
+            }
+            updateDataAndDiagram();
+        }
+
+        function highlightMainButtons(groupId, value, activeClass) {
+            const container = document.getElementById(groupId);
+            container.querySelectorAll('.btn-custom-filter').forEach(btn => {
+                btn.className = 'btn-custom-filter'; 
+                if (btn.getAttribute('data-val') === value) {
+                    btn.classList.add(activeClass);
+                }
+            });
+        }
+
+        function highlightFsButtons(groupId, value, activeClass, outlineClass) {
+            const container = document.getElementById(groupId);
+            container.querySelectorAll('.btn-filter-fs').forEach(btn => {
+                const btnVal = btn.getAttribute('data-val');
+                if (btnVal === value) {
+                    btn.className = 'btn btn-sm ' + activeClass + ' btn-filter-fs';
+                } else {
+                    btn.className = 'btn btn-sm ' + outlineClass + ' btn-filter-fs';
+                }
+            });
+        }
+
+        function updateFilters(mode, value, btn) { syncAndFilter(mode, value, btn); }
+
+        function getContrastColor(hex) {
+            if (hex.indexOf('#') === 0) hex = hex.slice(1);
+            const cssColors = { 'purple': '800080', 'black': '000000', 'royalblue': '4169E1', 'crimson': 'DC143C', 'gray': '808080' };
+            if (cssColors[hex]) hex = cssColors[hex];
+            if (hex.length === 3) hex = hex[0]+hex[0]+hex[1]+hex[1]+hex[2]+hex[2];
+            if (hex.length !== 6) return '#2c3e50';
+            const r = parseInt(hex.slice(0, 2), 16);
+            const g = parseInt(hex.slice(2, 4), 16);
+            const b = parseInt(hex.slice(4, 6), 16);
+            const yiq = ((r * 299) + (g * 587) + (b * 114)) / 1000;
+            return (yiq >= 128) ? '#2c3e50' : '#ffffff';
+        }
+
+        viewer.addHandler('open', updateDataAndDiagram);
+
+        // =======================================================
+        // AGRUPAMIENTO POR DISTANCIA EN GRILLA (MODO DIAGRAMA)
+        // =======================================================
+        // Misma regla que el recorrido original: cada punto, en orden, se suma al
+        // grupo más antiguo que tenga algún punto a menos de `umbral`; si no hay
+        // ninguno abre un grupo nuevo. Con celdas de lado `umbral` solo se revisan
+        // las 9 celdas vecinas, y dentro de ellas los grupos de menor a mayor
+        // hasta el primer punto cercano.
+        function agruparPorDistancia(xs, ys, umbral) {
+            const n = xs.length;
+            const grupoDe = new Int32Array(n);
+            let minX = Infinity, minY = Infinity, maxX = -Infinity;
+            for (let i = 0; i < n; i++) {
+                if (xs[i] < minX) minX = xs[i];
+                if (xs[i] > maxX) maxX = xs[i];
+                if (ys[i] < minY) minY = ys[i];
+            }
+            // Columna extra a cada lado para que los vecinos -1/+1 no se pisen entre filas
+            const cols = Math.floor((maxX - minX) / umbral) + 3;
+            // celda -> { grupos: ids ascendentes, miembros: índices de cada grupo en la celda }
+            const celdas = new Map();
+            const vecinos = [0, -1, 1, -cols, cols, -cols - 1, -cols + 1, cols - 1, cols + 1];
+            let grupos = 0;
+
+            for (let i = 0; i < n; i++) {
+                const clave = (Math.floor((ys[i] - minY) / umbral) + 1) * cols + Math.floor((xs[i] - minX) / umbral) + 1;
+                let grupo = Infinity;
+                for (let v = 0; v < 9; v++) {
+                    const celda = celdas.get(clave + vecinos[v]);
+                    if (!celda) continue;
+                    // Solo interesan grupos más antiguos que el mejor encontrado hasta ahora
+                    for (let k = 0; k < celda.grupos.length && celda.grupos[k] < grupo; k++) {
+                        const miembros = celda.miembros[k];
+                        let cerca = false;
+                        for (let m = 0; m < miembros.length; m++) {
+                            const ddx = xs[i] - xs[miembros[m]], ddy = ys[i] - ys[miembros[m]];
+                            if (Math.sqrt(ddx * ddx + ddy * ddy) < umbral) { cerca = true; break; }
+                        }
+                        if (cerca) { grupo = celda.grupos[k]; break; }
+                    }
+                }
+                if (grupo === Infinity) grupo = grupos++;
+                grupoDe[i] = grupo;
+
+                let celda = celdas.get(clave);
+                if (!celda) celdas.set(clave, celda = { grupos: [], miembros: [] });
+                let k = 0;
+                while (k < celda.grupos.length && celda.grupos[k] < grupo) k++;
+                if (celda.grupos[k] !== grupo) {
+                    celda.grupos.splice(k, 0, grupo);
+                    celda.miembros.splice(k, 0, []);
+                }
+                celda.miembros[k].push(i);
+            }
+            return { grupoDe, grupos };
+        }
+
+        // =======================================================
+        // CÁLCULO DEL DIAGRAMA (WEB WORKER O HILO PRINCIPAL)
+        // =======================================================
+        // Funciones puras sobre arreglos tipados: se usan tal cual en el hilo
+        // principal y, vía toString(), dentro del worker.
+
+        // Cúmulos de un grupo (idx: índices globales de sus puntos, en orden):
+        // [posición en el grupo del punto más cercano al centroide, cantidad, ...]
+        function representantes(xs, ys, idx, umbral) {
+            const gx = Float64Array.from(idx, i => xs[i]);
+            const gy = Float64Array.from(idx, i => ys[i]);
+            const { grupoDe, grupos } = agruparPorDistancia(gx, gy, umbral);
+
+            let clusters = [];
+            for (let g = 0; g < grupos; g++) clusters.push([]);
+            for (let i = 0; i < idx.length; i++) clusters[grupoDe[i]].push(i);
+
+            const reps = [];
+            clusters.forEach(cluster => {
+                let count = cluster.length;
+                let sumX = 0, sumY = 0;
+                cluster.forEach(i => { sumX += gx[i]; sumY += gy[i]; });
+                let centroidX = sumX / count;
+                let centroidY = sumY / count;
+
+                let best = cluster[0];
+                let minDist = Infinity;
+                cluster.forEach(i => {
+                    let d = Math.sqrt(Math.pow(gx[i] - centroidX, 2) + Math.pow(gy[i] - centroidY, 2));
+                    if (d < minDist) {
+                        minDist = d;
+                        best = i;
+                    }
+                });
+                reps.push(best, count);
+            });
+            return reps;
+        }
+
+        function spreadLabels(labels) {
+            if (labels.length === 0) return;
+            labels.sort((a, b) => a.cY - b.cY);
+            const MIN_GAP = Math.min(0.045, 0.95 / labels.length); 
+            
+            for(let iter = 0; iter < 20; iter++) {
+                for (let i = 0; i < labels.length - 1; i++) {
+                    let overlap = MIN_GAP - (labels[i+1].adjY - labels[i].adjY);
+                    if (overlap > 0) {
+                        labels[i].adjY -= overlap * 0.5;
+                        labels[i+1].adjY += overlap * 0.5;
+                    }
+                }
+            }
+            
+            let topOverflow = 0.02 - labels[0].adjY;
+            if (topOverflow > 0) labels.forEach(l => l.adjY += topOverflow);
+            
+            let bottomOverflow = labels[labels.length-1].adjY - 0.98;
+            if (bottomOverflow > 0) labels.forEach(l => l.adjY -= bottomOverflow);
+        }
+
+        // datos: { xs, ys (x/imgW, y/imgW), grupoDe (código de grupo por punto), claves }
+        // indices: puntos filtrados en orden. Devuelve las etiquetas (izquierda y luego
+        // derecha, ya repartidas) como arreglos tipados transferibles, y el tiempo de
+        // agrupar y de repartir (para el HUD de ?perf=1).
+        function calcularEtiquetas(datos, indices, umbral) {
+            const t0 = performance.now();
+            const porGrupo = new Map();
+            for (let n = 0; n < indices.length; n++) {
+                const i = indices[n];
+                let idx = porGrupo.get(datos.grupoDe[i]);
+                if (!idx) porGrupo.set(datos.grupoDe[i], idx = []);
+                idx.push(i);
+            }
+
+            let leftLabels = [];
+            let rightLabels = [];
+            porGrupo.forEach((idx, g) => {
+                const reps = representantes(datos.xs, datos.ys, idx, umbral);
+                for (let r = 0; r < reps.length; r += 2) {
+                    const i = idx[reps[r]];
+                    const obj = { punto: i, count: reps[r + 1], cY: datos.ys[i], adjY: datos.ys[i] };
+                    if (datos.xs[i] < 0.5) leftLabels.push(obj); else rightLabels.push(obj);
+                }
+            });
+
+            const t1 = performance.now();
+            spreadLabels(leftLabels);
+            spreadLabels(rightLabels);
+            const t2 = performance.now();
+
+            const todas = leftLabels.concat(rightLabels);
+            const punto = new Uint32Array(todas.length), cantidad = new Uint32Array(todas.length), adjY = new Float64Array(todas.length);
+            todas.forEach((l, e) => { punto[e] = l.punto; cantidad[e] = l.count; adjY[e] = l.adjY; });
+            return { punto, cantidad, adjY, msAgrupar: t1 - t0, msRepartir: t2 - t1 };
+        }
+
+        // Datos de los puntos para el diagrama, armados una sola vez
+        const datosDiagrama = (() => {
+            const claves = [], codigos = new Map(), grupoDe = new Uint32Array(puntos.length);
+            puntos.forEach((p, i) => {
+                const key = p.tipo.toUpperCase() + " " + p.color_norm.replace(/_/g, ' ').toUpperCase() + " " + p.tamaño;
+                let c = codigos.get(key);
+                if (c === undefined) { c = claves.length; codigos.set(key, c); claves.push(key); }
+                grupoDe[i] = c;
+            });
+            return {
+                xs: Float64Array.from(puntos, p => p.x / imgW), ys: Float64Array.from(puntos, p => p.y / imgW),
+                grupoDe, claves
+            };
+        })();
+
+        // Cuerpo del worker: atiende solo la solicitud más reciente; las que
+        // llegaron mientras calculaba quedan descartadas.
+        function cuerpoTrabajador() {
+            let datos = null, pendiente = null;
+            self.onmessage = (e) => {
+                if (e.data.tipo === 'datos') { datos = e.data; return; }
+                if (pendiente === null) {
+                    setTimeout(() => {
+                        const s = pendiente;
+                        pendiente = null;
+                        const r = calcularEtiquetas(datos, s.indices, s.umbral);
+                        self.postMessage({ id: s.id, punto: r.punto, cantidad: r.cantidad, adjY: r.adjY, msAgrupar: r.msAgrupar, msRepartir: r.msRepartir },
+                                         [r.punto.buffer, r.cantidad.buffer, r.adjY.buffer]);
+                    }, 0);
+                }
+                pendiente = e.data;
+            };
+        }
+
+        function crearTrabajadorDiagrama() {
+            if (typeof Worker === 'undefined' || typeof Blob === 'undefined') return null;
+            try {
+                const fuente = [agruparPorDistancia, representantes, spreadLabels, calcularEtiquetas]
+                    .map(f => f.toString()).join(';') + ';(' + cuerpoTrabajador.toString() + ')();';
+                const url = URL.createObjectURL(new Blob([fuente], { type: 'application/javascript' }));
+                const trabajador = new Worker(url);
+                trabajador.postMessage({ tipo: 'datos', ...datosDiagrama });
+                trabajador.onmessage = (e) => {
+                    // Respuestas de solicitudes viejas (filtro o slider ya cambiaron) se ignoran
+                    if (perf) perf.etiquetas(e.data, 'worker');
+                    if (e.data.id !== solicitudDiagrama || !diagramMode || filterT === 'none') return;
+                    dibujarDiagrama(e.data);
+                    renderCanvas();
+                };
+                trabajador.onerror = () => {
+                    trabajadorDiagrama = null;
+                    updateDataAndDiagram();
+                };
+                return trabajador;
+            } catch (e) {
+                return null;
+            }
+        }
+
+        let trabajadorDiagrama = crearTrabajadorDiagrama();
+        let solicitudDiagrama = 0;
+
+        // Copia nueva en cada llamada: se transfiere al worker
+        function indicesFiltrados() {
+            const ft = codigoFiltro(codTipo, filterT), fc = codigoFiltro(codColor, filterC);
+            if (ft === codTipo.valores.length || fc === codColor.valores.length) return new Uint32Array(0);
+            if (ft === -1 && fc === -1) return Uint32Array.from(puntos, (p, i) => i);
+            const porTipo = ft === -1 ? null : indiceTipo.items.subarray(indiceTipo.inicio[ft], indiceTipo.inicio[ft + 1]);
+            const porColor = fc === -1 ? null : indiceColor.items.subarray(indiceColor.inicio[fc], indiceColor.inicio[fc + 1]);
+            if (!porTipo || !porColor) return (porTipo || porColor).slice();
+            // Intersección: se recorre la lista más corta y se mira el código del otro filtro
+            const [lista, cod, valor] = porTipo.length <= porColor.length ? [porTipo, codColor.cod, fc] : [porColor, codTipo.cod, ft];
+            const indices = new Uint32Array(lista.length);
+            let n = 0;
+            for (let k = 0; k < lista.length; k++) if (cod[lista[k]] === valor) indices[n++] = lista[k];
+            return indices.slice(0, n);
+        }
+
+        // =======================================================
+        // DIAGRAMA DIBUJADO EN EL CANVAS (SIN OVERLAYS DEL DOM)
+        // =======================================================
+        // Líneas guía, punto ancla y recuadro de cada cúmulo se dibujan en el mismo
+        // canvas que los puntos, en cada cuadro; los anchos de texto se miden una vez.
+        let etiquetasDiagrama = [];
+        const anchosTexto = new Map();
+        const FUENTE_ETIQUETA = 'bold 12px monospace';
+        const FUENTE_VIÑETA = 'bold 14px monospace';
+        const ALTO_ETIQUETA = 35;  // 17px de línea + padding 6px + bordes de 3px arriba y abajo
+
+        function anchoTexto(ctx, fuente, texto) {
+            const clave = fuente + '|' + texto;
+            let ancho = anchosTexto.get(clave);
+            if (ancho === undefined) {
+                ctx.font = fuente;
+                ancho = ctx.measureText(texto).width;
+                anchosTexto.set(clave, ancho);
+            }
+            return ancho;
+        }
+
+        function dibujarDiagrama(res) {
+            etiquetasDiagrama = [];
+            for (let e = 0; e < res.punto.length; e++) {
+                const bestP = puntos[res.punto[e]];
+                let cX = bestP.x / imgW;
+                let cY = bestP.y / imgW;
+                let isLeft = cX < 0.5;
+                let edgeX = isLeft ? 0.05 : 0.95;
+                let k = datosDiagrama.claves[datosDiagrama.grupoDe[res.punto[e]]];
+                etiquetasDiagrama.push({
+                    cX, cY, adjY: res.adjY[e], edgeX, midX: cX + (edgeX - cX) * 0.5, isLeft,
+                    color: bestP.color_plot, texto: `${res.cantidad[e]} ${k}`
+                });
+            }
+        }
+
+        function dibujarEtiquetasDiagrama(ctx, b, escala, w, h) {
+            const ctxMedida = canvasOverlay.getContext('2d');
+            ctx.save();
+            ctx.lineWidth = 2;
+            ctx.textBaseline = 'middle';
+            let dibujadas = 0;
+            for (const et of etiquetasDiagrama) {
+                const ax = (et.cX - b.x) * escala, ay = (et.cY - b.y) * escala;
+                const mx = (et.midX - b.x) * escala, ex = (et.edgeX - b.x) * escala, ey = (et.adjY - b.y) * escala;
+
+                const anchoViñeta = anchoTexto(ctxMedida, FUENTE_VIÑETA, '●');
+                const anchoEspacio = anchoTexto(ctxMedida, FUENTE_ETIQUETA, ' ');
+                const anchoCaja = 6 + 12 + anchoViñeta + anchoEspacio + anchoTexto(ctxMedida, FUENTE_ETIQUETA, et.texto) + 12;
+                // placement LEFT/RIGHT de OpenSeadragon: el recuadro arranca o termina en edgeX
+                const cajaX = et.isLeft ? ex : ex - anchoCaja, cajaY = ey - ALTO_ETIQUETA / 2;
+
+                const minX = Math.min(ax - 10, mx, cajaX), maxX = Math.max(ax + 10, mx, cajaX + anchoCaja);
+                const minY = Math.min(ay - 10, cajaY), maxY = Math.max(ay + 10, cajaY + ALTO_ETIQUETA);
+                if (maxX < 0 || minX > w || maxY < 0 || minY > h) continue;
+                dibujadas++;
+
+                // Líneas guía punteadas
+                ctx.globalAlpha = 0.6;
+                ctx.strokeStyle = et.color;
+                ctx.setLineDash([6, 4]);
+                ctx.beginPath();
+                ctx.moveTo(ax, ay + 1);
+                ctx.lineTo(mx, ay + 1);
+                if (Math.abs(et.adjY - et.cY) > 0.001) {
+                    ctx.moveTo(mx + 1, ay);
+                    ctx.lineTo(mx + 1, ey);
+                }
+                ctx.moveTo(mx, ey + 1);
+                ctx.lineTo(ex, ey + 1);
+                ctx.stroke();
+                ctx.setLineDash([]);
+
+                // Punto ancla con borde blanco
+                ctx.globalAlpha = 1.0;
+                ctx.shadowColor = 'black';
+                ctx.shadowBlur = 4;
+                ctx.fillStyle = '#ffffff';
+                ctx.beginPath();
+                ctx.arc(ax, ay, 8, 0, 2*Math.PI);
+                ctx.fill();
+                ctx.shadowBlur = 0;
+                ctx.fillStyle = et.color;
+                ctx.beginPath();
+                ctx.arc(ax, ay, 6, 0, 2*Math.PI);
+                ctx.fill();
+
+                // Recuadro: fondo, bordes (3px arriba/abajo, 6px de color del lado del punto) y texto
+                ctx.beginPath();
+                if (ctx.roundRect) ctx.roundRect(cajaX, cajaY, anchoCaja, ALTO_ETIQUETA, 6);
+                else ctx.rect(cajaX, cajaY, anchoCaja, ALTO_ETIQUETA);
+                ctx.shadowColor = 'rgba(0,0,0,0.4)';
+                ctx.shadowBlur = 12;
+                ctx.shadowOffsetY = 4;
+                ctx.fillStyle = 'rgba(255, 255, 255, 0.90)';
+                ctx.fill();
+                ctx.shadowBlur = 0;
+                ctx.shadowOffsetY = 0;
+                ctx.save();
+                ctx.clip();
+                ctx.fillStyle = '#2c3e50';
+                ctx.fillRect(cajaX, cajaY, anchoCaja, 3);
+                ctx.fillRect(cajaX, cajaY + ALTO_ETIQUETA - 3, anchoCaja, 3);
+                ctx.fillStyle = et.color;
+                ctx.fillRect(et.isLeft ? cajaX : cajaX + anchoCaja - 6, cajaY, 6, ALTO_ETIQUETA);
+                ctx.restore();
+
+                let tx = cajaX + (et.isLeft ? 6 : 0) + 12;
+                ctx.font = FUENTE_VIÑETA;
+                ctx.fillStyle = et.color;
+                ctx.fillText('●', tx, ey);
+                tx += anchoViñeta + anchoEspacio;
+                ctx.font = FUENTE_ETIQUETA;
+                ctx.fillStyle = '#2c3e50';
+                ctx.fillText(et.texto, tx, ey);
+            }
+            ctx.restore();
+            return dibujadas;
+        }
+
+        function updateDataAndDiagram() {
+            const solicitud = ++solicitudDiagrama;
+            const bar = document.getElementById('info-bar');
+            
+            if (filterT === 'none') {
+                etiquetasDiagrama = [];
+                bar.innerHTML = "MODO DE INSPECCIÓN: PUNTOS OCULTOS";
+                bar.style.backgroundColor = "#f8f9fa"; bar.style.color = "#2c3e50";
+                renderSummary(); 
+                renderCanvas();
+                return;
+            }
+            
+            if (!lastSelected) {
+                bar.innerHTML = "Selecciona un punto para ver su detalle";
+                bar.style.backgroundColor = "#f8f9fa"; bar.style.color = "#2c3e50";
+            }
+
+            if (!diagramMode) {
+                etiquetasDiagrama = [];
+            } else if (trabajadorDiagrama) {
+                const indices = indicesFiltrados();
+                trabajadorDiagrama.postMessage({ id: solicitud, umbral: DISTANCE_THRESHOLD, indices }, [indices.buffer]);
+            } else {
+                const res = calcularEtiquetas(datosDiagrama, indicesFiltrados(), DISTANCE_THRESHOLD);
+                if (perf) perf.etiquetas(res, 'principal');
+                dibujarDiagrama(res);
+            }
+
+            renderSummary();
+            renderCanvas(); 
+        }
+
+        // Tabla del resumen armada una vez por estado de filtro; tipos y filas en el
+        // orden en que aparecen por primera vez entre los puntos filtrados
+        const tablasResumen = new Map();
+        let resumenMostrado = null;
+
+        function htmlResumen(ft, fc) {
+            const { nT, nC, nS, cantidad, primero } = cubo;
+            const groups = new Map(); let totalGral = 0;
+            for (let t = 0; t < nT; t++) {
+                if (ft !== -1 && t !== ft) continue;
+                for (let c = 0; c < nC; c++) {
+                    if (fc !== -1 && c !== fc) continue;
+                    for (let s = 0; s < nS; s++) {
+                        const k = (t * nC + c) * nS + s;
+                        if (!cantidad[k]) continue;
+                        totalGral += cantidad[k];
+                        let g = groups.get(t);
+                        if (!g) { g = { primero: primero[k], subtotal: 0, filas: new Map() }; groups.set(t, g); }
+                        g.primero = Math.min(g.primero, primero[k]);
+                        g.subtotal += cantidad[k];
+                        const key = codColor.valores[c].replace(/_/g, ' ').toUpperCase() + " (" + codTamaño.valores[s] + ")";
+                        const fila = g.filas.get(key);
+                        if (fila) { fila.n += cantidad[k]; fila.primero = Math.min(fila.primero, primero[k]); }
+                        else g.filas.set(key, { n: cantidad[k], primero: primero[k] });
+                    }
+                }
+            }
+            const porAparicion = (a, b) => a[1].primero - b[1].primero;
+            let html = '<h4 class="fw-bold mb-4" style="font-family:Montserrat, sans-serif;">RESUMEN DE COMPONENTES</h4>';
+            for (const [t, g] of [...groups].sort(porAparicion)) {
+                html += '<div class="category-row"><span>' + codTipo.valores[t].toUpperCase() + '</span><span class="badge bg-primary">' + g.subtotal + ' pz</span></div><table class="item-table"><tbody>';
+                for (const [k, fila] of [...g.filas].sort(porAparicion)) html += '<tr><td>' + k + '</td><td class="text-end fw-bold">' + fila.n + ' pz</td></tr>';
+                html += '</tbody></table>';
+            }
+            html += '<div class="total-banner">CANTIDAD TOTAL: ' + totalGral + ' PIEZAS</div>';
+            return html;
+        }
+
+        function renderSummary() {
+            // Con los puntos ocultos el resumen muestra todo el mosaico
+            const ft = filterT === 'none' ? -1 : codigoFiltro(codTipo, filterT);
+            const fc = filterT === 'none' ? -1 : codigoFiltro(codColor, filterC);
+            const clave = ft + '|' + fc;
+            if (clave === resumenMostrado) return;
+            if (!tablasResumen.has(clave)) tablasResumen.set(clave, htmlResumen(ft, fc));
+            document.getElementById('tables-output').innerHTML = tablasResumen.get(clave);
+            resumenMostrado = clave;
+        }
+
+        function toggleFS() {
+            const el = document.getElementById("workspace");
+            
+            if (!document.fullscreenElement) {
+                let fsPromise = el.requestFullscreen ? el.requestFullscreen() : (el.webkitRequestFullscreen ? el.webkitRequestFullscreen() : null);
+                
+                if (fsPromise) {
+                    fsPromise.then(() => {
+                        if (screen.orientation && screen.orientation.unlock) screen.orientation.unlock();
+                    }).catch(err => console.log("Error al entrar a fullscreen:", err));
+                } else if (el.webkitRequestFullscreen) {
+                    el.webkitRequestFullscreen();
+                    if (screen.orientation && screen.orientation.unlock) screen.orientation.unlock();
+                }
+            } else {
+                let exitPromise = document.exitFullscreen ? document.exitFullscreen() : (document.webkitExitFullscreen ? document.webkitExitFullscreen() : null);
+                
+                if (exitPromise) {
+                    exitPromise.then(() => {
+                        if (screen.orientation && screen.orientation.unlock) screen.orientation.unlock();
+                    }).catch(err => console.log("Error al salir de fullscreen:", err));
+                } else if (document.webkitExitFullscreen) { 
+                    document.webkitExitFullscreen();
+                }
+            }
+        }
+
+        document.getElementById('btn-in').onclick = () => viewer.viewport.zoomBy(1.4);
+        document.getElementById('btn-out').onclick = () => viewer.viewport.zoomBy(0.7);
+        document.getElementById('btn-home').onclick = () => viewer.viewport.goHome();
+        
+        document.getElementById('btn-diagrama').onclick = () => {
+            diagramMode = !diagramMode;
+            document.getElementById('btn-diagrama').style.background = diagramMode ? '#e74c3c' : '#f39c12';
+            updateDataAndDiagram();
+        };
+
+        if (perf) perf.registrar('script', inicioScript, performance.now() - inicioScript);
+    </script>
+</body>
+</html>
+"""
+
+# =========================================================
+# PLANTILLA COMPILADA
+# =========================================================
+# La plantilla se corta una sola vez en tramos fijos y marcadores; el reporte
+# se arma con un único join (o escribiendo tramo a tramo en el destino) en
+# lugar de diez str.replace que copian el HTML completo cada vez.
+CAMPOS = (
+    "TITULO_FINAL", "LOGO_URI", "MOSTRAR_LOGO",
+    "BTN_TIPO_MAIN", "BTN_COLOR_MAIN", "BTN_TIPO_FS", "BTN_COLOR_FS",
+    "PUNTOS_JSON", "WIDTH", "TILE_SOURCES",
+)
+
+class PlantillaCompilada:
+    def __init__(self, texto, campos=CAMPOS):
+        patron = "|".join(re.escape(f"__{c}__") for c in campos)
+        partes = re.split(f"({patron})", texto)
+        self.fijos = [p.encode("utf-8") for p in partes[0::2]]
+        self.campos = [p[2:-2] for p in partes[1::2]]
+
+    def _tramos(self, valores):
+        for fijo, campo in zip(self.fijos, self.campos):
+            yield fijo
+            valor = valores[campo]
+            # Un valor puede venir en varias piezas (p. ej. una data URI que no se copia)
+            for pieza in (valor if isinstance(valor, (tuple, list)) else (valor,)):
+                yield pieza if isinstance(pieza, (bytes, memoryview)) else str(pieza).encode("utf-8")
+        yield self.fijos[-1]
+
+    def render(self, valores):
+        return b"".join(self._tramos(valores))
+
+    def escribir(self, destino, valores):
+        for tramo in self._tramos(valores):
+            destino.write(tramo)
+
+PLANTILLA = PlantillaCompilada(HTML_TEMPLATE)
+
+# =========================================================
+# VISOR COMPARTIDO (EXPORTACIÓN COMO BIBLIOTECA)
+# =========================================================
+# Los estilos y el último <script> no llevan marcadores: son el mismo texto en
+# todos los reportes y se pueden servir como archivos aparte.
+def _bloque(texto, apertura, cierre):
+    inicio = texto.rindex(apertura) + len(apertura)
+    return texto[inicio:texto.index(cierre, inicio)]
+
+CSS_VISOR = _bloque(HTML_TEMPLATE, "    <style>\n", "    </style>\n")
+JS_VISOR = _bloque(HTML_TEMPLATE, "    <script>\n", "    </script>\n")
+
+def plantilla_con_assets(url_css, url_js):
+    # La misma plantilla con el visor referenciado en lugar de embebido
+    texto = HTML_TEMPLATE.replace(f"    <style>\n{CSS_VISOR}    </style>\n", f'    <link href="{url_css}" rel="stylesheet">\n')
+    texto = texto.replace(f"    <script>\n{JS_VISOR}    </script>\n", f'    <script src="{url_js}"></script>\n')
+    return PlantillaCompilada(texto)
+
+def botones_filtro(tipos_unicos, colores_unicos):
+    return {
+        "BTN_TIPO_MAIN": ' '.join([f'<button class="btn-custom-filter" data-val="{t}" onclick="updateFilters(\'tipo\', \'{t}\', this)">{t.upper()}</button>' for t in tipos_unicos]),
+        "BTN_COLOR_MAIN": ' '.join([f'<button class="btn-custom-filter" data-val="{c}" onclick="updateFilters(\'color\', \'{c}\', this)">{c.replace("_", " ").upper()}</button>' for c in colores_unicos]),
+        "BTN_TIPO_FS": ' '.join([f'<button class="btn btn-outline-light btn-sm btn-filter-fs" data-val="{t}" onclick="syncAndFilter(\'tipo\', \'{t}\', this)">{t.upper()}</button>' for t in tipos_unicos]),
+        "BTN_COLOR_FS": ' '.join([f'<button class="btn btn-outline-light btn-sm btn-filter-fs" style="text-align: left;" data-val="{c}" onclick="syncAndFilter(\'color\', \'{c}\', this)"><span style="display:inline-block;width:10px;height:10px;background:{COLOR_CATALOG.get(c, "gray")};margin-right:8px;border-radius:50%"></span>{c.replace("_", " ").upper()}</button>' for c in colores_unicos]),
+    }
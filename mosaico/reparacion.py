@@ -0,0 +1,107 @@
+import threading
+from dataclasses import dataclass
+
+from .biblioteca import Biblioteca
+from .compacto import leer_puntos, puntos_compactos_json
+from .extraccion import extraer_datos_reporte
+from .instrumentacion import SIN_MEDIDOR, Medidor
+from .limpieza import mascara_coordenadas_unicas
+from .paralelo import MAX_PROCESOS, mapear_en_procesos, procesos_para
+from .plantilla import PLANTILLA, botones_filtro
+from .teselas import tile_sources_imagen
+
+# =========================================================
+# REPARACIÓN DE REPORTES HTML (PESTAÑA 2)
+# =========================================================
+@dataclass
+class ResultadoReparacion:
+    nombre: str
+    estado: str              # "ok" | "incompleto" | "error"
+    archivo: str = None
+    html: bytes = None
+    bytes_imagen: int = 0
+    error: str = None
+    mediciones: list = None
+    assets: dict = None      # exportación como biblioteca: ruta en el ZIP -> bytes, sólo los nuevos
+
+class _Trabajador(threading.local):
+    # Logo y biblioteca de quien repara: cada proceso del pool o, con el lote en
+    # línea, el hilo de la sesión de Streamlit (dos sesiones no se pisan)
+    def __init__(self):
+        self.logo = {"LOGO_URI": "", "MOSTRAR_LOGO": "none"}
+        self.biblioteca = None
+
+_trabajador = _Trabajador()
+
+def _inicializar_trabajador(logo_uri, mostrar_logo, como_biblioteca=False):
+    _trabajador.logo = {"LOGO_URI": logo_uri, "MOSTRAR_LOGO": mostrar_logo}
+    # Una por proceso: el visor y el logo viajan sólo con el primer resultado de cada uno
+    _trabajador.biblioteca = Biblioteca() if como_biblioteca else None
+
+def reparar_reporte(nombre, contenido):
+    medidor = Medidor("tab2", archivo=nombre)
+    resultado = _reparar(nombre, contenido, medidor)
+    resultado.mediciones = medidor.mediciones
+    return resultado
+
+def _reparar(nombre, contenido, medidor):
+    with medidor.etapa("extraccion"):
+        datos = extraer_datos_reporte(contenido)
+    if datos.puntos is None or datos.img_w is None or datos.data_uri is None:
+        return ResultadoReparacion(nombre, "incompleto")
+    try:
+        # Acepta el arreglo de objetos anterior o el formato columnar; se reescribe columnar
+        with medidor.etapa("lectura_puntos"):
+            df_clean = leer_puntos(datos.puntos)
+        with medidor.etapa("duplicados"):
+            x, y = df_clean["x"].astype(float), df_clean["y"].astype(float)
+            df_clean = df_clean[mascara_coordenadas_unicas(x, y)].reset_index(drop=True)
+
+        with medidor.etapa("codificacion_puntos"):
+            puntos_json_limpio = puntos_compactos_json(df_clean)
+
+        tipos_unicos = sorted(df_clean["tipo"].unique().tolist()) if "tipo" in df_clean.columns else []
+        colores_unicos = sorted(df_clean["color_norm"].unique().tolist()) if "color_norm" in df_clean.columns else []
+
+        if datos.titulo is not None:
+            titulo_interior = datos.titulo
+            if not titulo_interior.lower().startswith("componentes"):
+                titulo_interior = f"Componentes {titulo_interior}"
+            modelo_puro = datos.titulo.replace("Componentes ", "").replace("Componentes", "").strip()
+        else:
+            titulo_interior = "Componentes"
+            modelo_puro = nombre.replace(".html", "").replace("Componentes ", "").replace("Corregido_", "").replace("Actualizado_", "")
+
+        biblioteca = _trabajador.biblioteca
+        with medidor.etapa("plantilla"):
+            if biblioteca is None:
+                plantilla, tile_sources, logo = PLANTILLA, tile_sources_imagen(datos.data_uri), _trabajador.logo
+            else:
+                # La imagen sale de la data URI a un archivo de assets/
+                plantilla, tile_sources = biblioteca.plantilla(), biblioteca.imagen_data_uri(datos.data_uri)
+                logo = dict(zip(("LOGO_URI", "MOSTRAR_LOGO"), biblioteca.logo(_trabajador.logo["LOGO_URI"], _trabajador.logo["MOSTRAR_LOGO"])))
+            html = plantilla.render({
+                "TITULO_FINAL": titulo_interior, "PUNTOS_JSON": puntos_json_limpio, "WIDTH": datos.img_w,
+                "TILE_SOURCES": tile_sources, **logo,
+                **botones_filtro(tipos_unicos, colores_unicos),
+            })
+        if biblioteca is None:
+            return ResultadoReparacion(nombre, "ok", archivo=f"{modelo_puro}.html", html=html, bytes_imagen=len(datos.data_uri))
+        return ResultadoReparacion(nombre, "ok", archivo=f"{modelo_puro}.html", html=html, assets=biblioteca.tomar_pendientes())
+    except Exception as e:
+        return ResultadoReparacion(nombre, "error", error=str(e))
+
+def reparar_en_lote(archivos, logo_uri="", mostrar_logo="none", max_procesos=MAX_PROCESOS, medidor=SIN_MEDIDOR,
+                    como_biblioteca=False, tamaño_total=0):
+    # archivos: lista de (nombre, función que devuelve los bytes); cada archivo
+    # se lee recién al enviarlo a un proceso. tamaño_total (bytes de todo el lote)
+    # decide cuántos procesos usar; por defecto se repara en línea (procesos_para).
+    # Las mediciones de cada proceso vuelven con el resultado y se suman a `medidor`. Con como_biblioteca cada
+    # resultado trae además los assets que su proceso todavía no había entregado
+    # (el llamador descarta los que ya tiene de otro proceso).
+    tareas = ((nombre, leer()) for nombre, leer in archivos)
+    for resultado in mapear_en_procesos(reparar_reporte, tareas, procesos_para(len(archivos), tamaño_total, max_procesos),
+                                        initializer=_inicializar_trabajador,
+                                        initargs=(logo_uri, mostrar_logo, como_biblioteca)):
+        medidor.agregar(resultado.mediciones)
+        yield resultado
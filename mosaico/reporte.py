@@ -0,0 +1,93 @@
+import base64
+import os
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image
+
+from .compacto import puntos_compactos_json
+from .imagen import (OPCIONES_ORIGINAL, SIN_ESCALA, codificar_imagen, escalar_puntos, extension_imagen, mime_imagen,
+                     preparar_imagen)
+from .instrumentacion import SIN_MEDIDOR
+from .limpieza import limpiar_puntos
+from .parser_xml import parsear_cvat_xml
+from .plantilla import PLANTILLA, botones_filtro
+from .teselas import descriptor_dzi, generar_teselas
+
+LOGO_PREDETERMINADO = "banner_mosaico.png"
+
+# =========================================================
+# ETAPAS DEL GENERADOR DE REPORTES (PESTAÑA 1)
+# =========================================================
+def leer_puntos(xml_bytes, medidor=SIN_MEDIDOR):
+    # Puntos limpios en coordenadas del XML y el tamaño de imagen que declara (o None)
+    with medidor.etapa("parseo_xml"):
+        puntos = parsear_cvat_xml(BytesIO(xml_bytes))
+        df = puntos.a_dataframe()
+    return limpiar_puntos(df, medidor), puntos.tamaño_imagen
+
+def codificar_puntos(df, escala=SIN_ESCALA, medidor=SIN_MEDIDOR):
+    # escala: la que devuelven imagen_a_data_uri / imagen_a_teselas, para que los
+    # puntos queden en píxeles de la imagen embebida (imgW en el visor)
+    df = escalar_puntos(df, escala)
+    with medidor.etapa("codificacion_puntos"):
+        return df, puntos_compactos_json(df)
+
+def imagen_a_archivo(img_bytes, medidor=SIN_MEDIDOR, opciones=OPCIONES_ORIGINAL, tamaño_anotado=None):
+    # La imagen codificada tal cual (para escribirla como archivo aparte)
+    imagen = codificar_imagen(preparar_imagen(img_bytes, opciones, tamaño_anotado, medidor), opciones, medidor)
+    return imagen.img.width, imagen.img.height, imagen.datos, imagen.escala
+
+def imagen_a_data_uri(img_bytes, medidor=SIN_MEDIDOR, opciones=OPCIONES_ORIGINAL, tamaño_anotado=None):
+    width, height, datos, escala = imagen_a_archivo(img_bytes, medidor, opciones, tamaño_anotado)
+    with medidor.etapa("base64"):
+        img_base64 = base64.b64encode(datos).decode()
+    return width, height, f"data:{mime_imagen(opciones.formato)};base64,{img_base64}", escala
+
+def imagen_a_teselas(img_bytes, medidor=SIN_MEDIDOR, opciones=OPCIONES_ORIGINAL, tamaño_anotado=None):
+    imagen = preparar_imagen(img_bytes, opciones, tamaño_anotado, medidor)
+    with medidor.etapa("teselas"):
+        return imagen.img.width, imagen.img.height, list(generar_teselas(imagen.img, opciones=opciones)), imagen.escala
+
+def logo_data_uri(ruta=LOGO_PREDETERMINADO):
+    # (LOGO_URI, MOSTRAR_LOGO); sin archivo de logo el encabezado lo oculta.
+    # Se codifica una vez por proceso y de nuevo sólo si el archivo cambia
+    try:
+        modificado = os.stat(ruta).st_mtime_ns
+    except OSError:
+        return "", "none"
+    return _codificar_logo(ruta, modificado)
+
+@lru_cache(maxsize=4)
+def _codificar_logo(ruta, modificado):
+    try:
+        logo_img = Image.open(ruta)
+        buffered_logo = BytesIO()
+        logo_img.save(buffered_logo, format="PNG")
+        logo_base64 = base64.b64encode(buffered_logo.getvalue()).decode()
+        return f"data:image/png;base64,{logo_base64}", "inline-block"
+    except Exception:
+        return "", "none"
+
+def nombre_limpio_modelo(nombre_modelo):
+    return str(nombre_modelo).replace("Componentes ", "").replace("Componentes", "").strip() if nombre_modelo else "Modelo_Sin_Nombre"
+
+def valores_reporte(nombre_modelo, df, puntos_json, width, tile_sources, logo_uri="", mostrar_logo="none"):
+    tipos_unicos = sorted(df["tipo"].unique().tolist())
+    colores_unicos = sorted(df["color_norm"].unique().tolist())
+    titulo_final = f"Componentes {nombre_modelo}" if nombre_modelo else "Componentes"
+    return {
+        "TITULO_FINAL": titulo_final, "PUNTOS_JSON": puntos_json, "WIDTH": width,
+        "TILE_SOURCES": tile_sources, "LOGO_URI": logo_uri, "MOSTRAR_LOGO": mostrar_logo,
+        **botones_filtro(tipos_unicos, colores_unicos),
+    }
+
+def escribir_paquete_teselas(destino, nombre_limpio, valores, width, height, teselas, opciones=OPCIONES_ORIGINAL):
+    # Las teselas ya vienen comprimidas: se guardan sin deflate
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        with zip_file.open(f"{nombre_limpio}.html", "w") as html:
+            PLANTILLA.escribir(html, valores)
+        zip_file.writestr(f"{nombre_limpio}.dzi", descriptor_dzi(width, height, formato=extension_imagen(opciones.formato)))
+        for ruta, tesela in teselas:
+            zip_file.writestr(f"{nombre_limpio}_files/{ruta}", tesela, compress_type=zipfile.ZIP_STORED)
@@ -0,0 +1,81 @@
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from .compacto import contar_tipo_color
+from .extraccion import buscar_puntos, buscar_puntos_compactos, buscar_titulo
+from .instrumentacion import SIN_MEDIDOR
+
+# =========================================================
+# RESUMEN RÁPIDO DE REPORTES (PESTAÑA 3)
+# =========================================================
+# Se cuentan los registros directamente sobre los bytes del arreglo de puntos,
+# sin json.loads: cada punto abre con {"x" y trae "tipo" seguido de "color_norm"
+# (así escribían df.to_json y el json.dumps de la pestaña 2). En el formato
+# columnar los conteos salen directo de los códigos de grupo.
+APERTURA_PUNTO = b'{"x"'
+_TIPO_COLOR = re.compile(rb'"tipo":\s*"((?:[^"\\]|\\.)*)",\s*"color_norm":\s*"((?:[^"\\]|\\.)*)"')
+
+@dataclass
+class ResumenReporte:
+    nombre_modelo: str
+    cantidad: int = 0
+    por_tipo: Counter = field(default_factory=Counter)
+    por_color: Counter = field(default_factory=Counter)
+
+def _texto_json(crudo):
+    # Los valores pueden venir con escapes JSON (to_json escapa los no ASCII)
+    return json.loads(b'"' + crudo + b'"') if b"\\" in crudo else crudo.decode("utf-8")
+
+def resumir_reporte(nombre, contenido):
+    resumen = ResumenReporte(nombre.replace(".html", "").replace("Corregido_", "").replace("Actualizado_", ""))
+    titulo = buscar_titulo(contenido)
+    if titulo is not None:
+        resumen.nombre_modelo = titulo.replace("Componentes ", "").strip()
+
+    tramo = buscar_puntos(contenido)
+    if tramo:
+        puntos = memoryview(contenido)[tramo[0]:tramo[1]]
+        resumen.cantidad = contenido.count(APERTURA_PUNTO, tramo[0], tramo[1])
+        for (tipo, color), n in Counter(_TIPO_COLOR.findall(puntos)).items():
+            resumen.por_tipo[_texto_json(tipo)] += n
+            resumen.por_color[_texto_json(color)] += n
+        return resumen
+
+    tramo = buscar_puntos_compactos(contenido)
+    if tramo:
+        try:
+            datos = json.loads(contenido[tramo[0]:tramo[1]])
+            cantidad, conteos = datos["n"], list(contar_tipo_color(datos))
+        except (ValueError, KeyError, IndexError, TypeError):
+            # Reporte truncado o editado a mano: cuenta 0, como uno sin puntos,
+            # en lugar de tirar abajo el lote entero
+            return resumen
+        resumen.cantidad = cantidad
+        for tipo, color, n in conteos:
+            resumen.por_tipo[tipo] += n
+            resumen.por_color[color] += n
+    return resumen
+
+def resumir_en_lote(archivos, medidor=SIN_MEDIDOR):
+    # archivos: lista de (nombre, función que devuelve los bytes), en orden de subida.
+    # Va en serie en este mismo proceso: el conteo recorre los bytes con búsquedas
+    # de memchr y tarda menos que levantar un pool, que Streamlit repetiría en
+    # cada interacción. Cada archivo se lee recién al resumirlo.
+    resumenes = []
+    for nombre, leer in archivos:
+        with medidor.etapa("resumen", archivo=nombre):
+            resumenes.append(resumir_reporte(nombre, leer()))
+    return resumenes
+
+def filas_tabla(resumenes):
+    tipos = sorted(set().union(*(r.por_tipo for r in resumenes)))
+    colores = sorted(set().union(*(r.por_color for r in resumenes)))
+    filas = []
+    for r in resumenes:
+        fila = {"Nombre del Modelo": r.nombre_modelo, "Cantidad Total de Piezas": r.cantidad}
+        fila.update({f"Tipo: {t.upper()}": r.por_tipo[t] for t in tipos})
+        fila.update({f"Color: {c.replace('_', ' ').upper()}": r.por_color[c] for c in colores})
+        filas.append(fila)
+    return filas
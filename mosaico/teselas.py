@@ -0,0 +1,63 @@
+import json
+import math
+from urllib.parse import quote
+
+from PIL import Image
+
+from .imagen import OPCIONES_ORIGINAL, convertir_modo, extension_imagen, guardar_imagen
+
+# =========================================================
+# PIRÁMIDE DE TESELAS DEEP ZOOM (DZI)
+# =========================================================
+# Cada nivel es la mitad del anterior hasta llegar a 1x1 px; OpenSeadragon
+# sólo descarga las teselas visibles en el zoom actual. Las teselas usan el
+# formato y la calidad de OpcionesImagen (el presupuesto de peso no aplica).
+TAMAÑO_TESELA = 254
+SOLAPE = 1
+FORMATO_TESELA = "jpg"  # extensión de las teselas (y Format del .dzi)
+
+def niveles_dzi(ancho, alto):
+    return math.ceil(math.log2(max(ancho, alto, 1))) + 1
+
+def generar_teselas(img, tamaño=TAMAÑO_TESELA, solape=SOLAPE, opciones=OPCIONES_ORIGINAL):
+    # Devuelve (ruta relativa "nivel/col_fila.jpg", bytes) para cada tesela
+    img = convertir_modo(img, opciones.formato)
+    extension = extension_imagen(opciones.formato)
+    niveles = niveles_dzi(*img.size)
+    nivel_img = img
+    for nivel in range(niveles - 1, -1, -1):
+        if nivel < niveles - 1:
+            w, h = nivel_img.size
+            nivel_img = nivel_img.resize((math.ceil(w / 2), math.ceil(h / 2)), Image.Resampling.LANCZOS)
+        w, h = nivel_img.size
+        for col in range(math.ceil(w / tamaño)):
+            for fila in range(math.ceil(h / tamaño)):
+                x0 = max(col * tamaño - solape, 0)
+                y0 = max(fila * tamaño - solape, 0)
+                x1 = min((col + 1) * tamaño + solape, w)
+                y1 = min((fila + 1) * tamaño + solape, h)
+                yield f"{nivel}/{col}_{fila}.{extension}", guardar_imagen(nivel_img.crop((x0, y0, x1, y1)), opciones)
+
+def descriptor_dzi(ancho, alto, tamaño=TAMAÑO_TESELA, solape=SOLAPE, formato=FORMATO_TESELA):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="{formato}" '
+        f'Overlap="{solape}" TileSize="{tamaño}">\n'
+        f'    <Size Width="{ancho}" Height="{alto}"/>\n'
+        '</Image>\n'
+    )
+
+def tile_sources_imagen(data_uri):
+    # En piezas para que la data URI (str, bytes o memoryview) no se copie
+    return ("{ type: 'image', url: '", data_uri, "' }")
+
+def tile_sources_dzi(carpeta, ancho, alto, tamaño=TAMAÑO_TESELA, solape=SOLAPE, formato=FORMATO_TESELA):
+    # Descriptor en línea: el visor no tiene que pedir el .dzi (falla en file://)
+    return json.dumps({"Image": {
+        "xmlns": "http://schemas.microsoft.com/deepzoom/2008",
+        "Url": quote(carpeta) + "/",
+        "Format": formato,
+        "Overlap": str(solape),
+        "TileSize": str(tamaño),
+        "Size": {"Width": str(ancho), "Height": str(alto)},
+    }})